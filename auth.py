@@ -1,16 +1,23 @@
+import asyncio
 import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import models
 import schemas
-from database import get_db
+from database import get_async_db
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
@@ -21,15 +28,24 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
 pwd_context = CryptContext(
     schemes=["bcrypt"], 
-    bcrypt__default_rounds=12,
-    bcrypt__min_rounds=4,
-    bcrypt__max_rounds=31,
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    # Hashes at any other cost are flagged by verify_and_update and rehashed on login
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
     deprecated="auto"
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login", auto_error=False)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -37,6 +53,92 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# ====================== Password hashing pool ======================
+BUSY_DETAIL = "Too many password operations in progress, please retry"
+
+class PasswordHashingPool:
+    """Bounded thread pool that keeps bcrypt off the event loop
+
+    bcrypt releases the GIL, so a few workers hash in parallel while the loop
+    keeps serving other requests. Once ``max_pending`` operations are queued
+    or running, new ones are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int, history_size: int = 1000):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_ms: deque = deque(maxlen=history_size)
+        self._run_ms: deque = deque(maxlen=history_size)
+
+    async def run(self, func: Callable, *args, busy_detail: str = BUSY_DETAIL):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=busy_detail,
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            try:
+                return func(*args)
+            finally:
+                finished_at = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self.completed += 1
+                    self._wait_ms.append((started_at - submitted_at) * 1000)
+                    self._run_ms.append((finished_at - started_at) * 1000)
+
+        return await asyncio.wrap_future(self._executor.submit(job))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            wait_ms = sorted(self._wait_ms)
+            run_ms = sorted(self._run_ms)
+            result = {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+        for name, values in (("queue_wait_ms", wait_ms), ("hash_ms", run_ms)):
+            if values:
+                result[name] = {
+                    "p50": round(values[len(values) // 2], 2),
+                    "p99": round(values[min(len(values) - 1, int(len(values) * 0.99))], 2),
+                }
+        return result
+
+password_pool = PasswordHashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+async def verify_password_async(plain_password, hashed_password,
+                                busy_detail: str = BUSY_DETAIL) -> Tuple[bool, Optional[str]]:
+    """Verify off the event loop; also returns a new hash if the stored one uses outdated rounds"""
+    return await password_pool.run(pwd_context.verify_and_update, plain_password, hashed_password,
+                                   busy_detail=busy_detail)
+
+async def get_password_hash_async(password, busy_detail: str = BUSY_DETAIL) -> str:
+    return await password_pool.run(pwd_context.hash, password, busy_detail=busy_detail)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -56,9 +158,95 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(
+@dataclass(frozen=True)
+class CurrentUser:
+    """Detached snapshot of the user fields endpoints read from the principal"""
+    user_id: int
+    email: str
+    fullname: str
+    role_id: int
+    is_seeded: bool = False
+
+    @classmethod
+    def from_orm(cls, user: models.User) -> "CurrentUser":
+        return cls(
+            user_id=user.user_id,
+            email=user.email,
+            fullname=user.fullname,
+            role_id=user.role_id,
+            is_seeded=bool(user.is_seeded),
+        )
+
+class UserPrincipalCache:
+    """Short-TTL, size-bounded LRU of resolved principals keyed by token subject"""
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get(self, subject: str) -> Optional[CurrentUser]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, subject: str, principal: CurrentUser):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *subjects: Optional[str]):
+        with self._lock:
+            for subject in subjects:
+                if subject is not None and self._entries.pop(subject, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+user_cache = UserPrincipalCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_SIZE)
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -88,12 +276,27 @@ def get_current_user(
         print(f"Token: {token}")
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    cached_user = user_cache.get(token_data.email)
+    if cached_user is not None:
+        return cached_user
+
+    user = await db.scalar(select(models.User).where(models.User.email == token_data.email))
     if user is None:
         print(f"No user found with email: {token_data.email}")
         raise credentials_exception
     
-    return user
+    principal = CurrentUser.from_orm(user)
+    user_cache.set(token_data.email, principal)
+    return principal
+
+async def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)):
+    return current_user
 
-def get_current_active_user(current_user: models.User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+async def get_optional_current_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[CurrentUser]:
+    """Current user for endpoints that also serve anonymous callers"""
+    if token is None:
+        return None
+    return await get_current_user(token, db)
@@ -0,0 +1,124 @@
+"""
+Cooperative cancellation for generation work running in worker threads.
+
+Threads cannot be interrupted from outside, so long-running steps check a
+CancellationToken between units of work (before retrieval, between Gemini
+stream chunks, during retry backoff) and raise GenerationCancelled. The
+stage at which a generation stopped is counted, which shows how much work
+cancellation saved.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+DISCONNECT_POLL_SECONDS = 0.25
+
+# Stages before the Gemini response was received: stopping there saves the LLM call
+LLM_SAVING_STAGES = ("queued", "retrieval", "before_llm", "retry_backoff")
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation when its token has been cancelled"""
+
+class CancellationStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.client_disconnects = 0
+        self.cancelled = 0
+        self.by_stage: Dict[str, int] = {}
+
+    def record_disconnect(self):
+        with self._lock:
+            self.client_disconnects += 1
+
+    def record_stop(self, stage: str):
+        with self._lock:
+            self.cancelled += 1
+            self.by_stage[stage] = self.by_stage.get(stage, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "client_disconnects": self.client_disconnects,
+                "cancelled_generations": self.cancelled,
+                "stopped_at_stage": dict(self.by_stage),
+                "llm_calls_avoided": sum(self.by_stage.get(stage, 0) for stage in LLM_SAVING_STAGES),
+                "llm_streams_cut": self.by_stage.get("llm_stream", 0),
+                "post_processing_skipped": self.by_stage.get("post_processing", 0),
+            }
+
+cancellation_stats = CancellationStats()
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self.reason: Optional[str] = None
+        self.stopped_at: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def _stop(self, stage: str):
+        with self._lock:
+            first = self.stopped_at is None
+            if first:
+                self.stopped_at = stage
+        if first:
+            cancellation_stats.record_stop(stage)
+            logger.info(f"Generation cancelled at {stage}: {self.reason}")
+        raise GenerationCancelled(self.reason)
+
+    def raise_if_cancelled(self, stage: str = "unknown"):
+        if self._event.is_set():
+            self._stop(stage)
+
+    def sleep(self, seconds: float, stage: str = "retry_backoff"):
+        """time.sleep that wakes up and raises as soon as the token is cancelled"""
+        if self._event.wait(seconds):
+            self._stop(stage)
+
+def check_cancelled(token: Optional[CancellationToken], stage: str = "unknown"):
+    if token is not None:
+        token.raise_if_cancelled(stage)
+
+async def run_until_disconnected(request: Request, func: Callable, *args, **kwargs):
+    """Run func(*args, cancel_token=..., **kwargs) in the thread pool, cancelling it if the client goes away
+
+    Raises GenerationCancelled once the client has disconnected; the worker
+    thread stops at its next checkpoint.
+    """
+    token = CancellationToken()
+    work = asyncio.ensure_future(run_in_threadpool(func, *args, cancel_token=token, **kwargs))
+
+    async def watch():
+        while not await request.is_disconnected():
+            await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+
+    if work.done():
+        return work.result()
+
+    cancellation_stats.record_disconnect()
+    token.cancel("client disconnected")
+    # The thread cannot be interrupted; stop awaiting it and let it unwind on its own
+    work.add_done_callback(lambda task: task.exception() if not task.cancelled() else None)
+    work.cancel()
+    raise GenerationCancelled(token.reason)
@@ -0,0 +1,155 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+class _PendingRequest:
+    """Texts from one caller waiting for their batch"""
+
+    __slots__ = ("texts", "enqueued_at", "done", "vectors", "error")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.vectors: Optional[List[List[float]]] = None
+        self.error: Optional[BaseException] = None
+
+class MicroBatchEmbeddings(Embeddings):
+    """Coalesce concurrent embed_query calls into one batched forward pass
+
+    A background thread takes the first waiting request, keeps collecting for
+    up to ``max_wait_ms`` or until ``max_batch_size`` texts are queued, embeds
+    them together and wakes every caller with its own vectors.
+    embed_documents is already batched and goes straight to the backend;
+    embed_small_batch lets callers with a few texts (e.g. the embedding
+    server) join the shared batch too.
+    """
+
+    def __init__(self, backend: Embeddings, max_wait_ms: float = 5.0,
+                 max_batch_size: int = 32, history_size: int = 1000):
+        self.backend = backend
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._batch_sizes: deque = deque(maxlen=history_size)
+        self._latencies: deque = deque(maxlen=history_size)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.backend.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_small_batch([text])[0]
+
+    def embed_small_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a handful of texts as part of the next shared batch"""
+        if len(texts) >= self.max_batch_size:
+            return self.backend.embed_documents(texts)
+
+        self._ensure_worker()
+        pending = _PendingRequest(texts)
+        self._queue.put(pending)
+        pending.done.wait()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.vectors
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> List[_PendingRequest]:
+        """Block for the first request, then gather more until the window closes"""
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.perf_counter() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending.texts)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                texts = [text for pending in batch for text in pending.texts]
+                vectors = self.backend.embed_documents(texts)
+                offset = 0
+                for pending in batch:
+                    pending.vectors = vectors[offset:offset + len(pending.texts)]
+                    offset += len(pending.texts)
+            except BaseException as e:
+                logger.error(f"Batched query embedding failed: {e}")
+                for pending in batch:
+                    pending.error = e
+            finally:
+                self._record(batch)
+                for pending in batch:
+                    pending.done.set()
+
+    def _record(self, batch: List[_PendingRequest]):
+        now = time.perf_counter()
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._batches += 1
+            if any(pending.error is not None for pending in batch):
+                self._errors += 1
+            self._batch_sizes.append(sum(len(pending.texts) for pending in batch))
+            self._latencies.extend((now - pending.enqueued_at) * 1000 for pending in batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency and batch-size metrics over the most recent requests"""
+        with self._stats_lock:
+            batch_sizes = np.array(self._batch_sizes, dtype=np.float64)
+            latencies = np.array(self._latencies, dtype=np.float64)
+            result = {
+                "requests": self._requests,
+                "batches": self._batches,
+                "failed_batches": self._errors,
+                "queue_depth": self._queue.qsize(),
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch_size": self.max_batch_size,
+            }
+
+        if batch_sizes.size:
+            result["avg_batch_size"] = round(float(batch_sizes.mean()), 2)
+            result["largest_batch"] = int(batch_sizes.max())
+        if latencies.size:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            result["latency_ms"] = {
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "p99": round(float(p99), 2),
+            }
+        return result
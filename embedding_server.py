@@ -0,0 +1,190 @@
+"""
+Local embedding server shared by every web worker and ingestion task.
+
+The server process owns the only copy of the sentence-transformer model and
+answers embed requests over a Unix socket. Small requests from all clients
+are coalesced by MicroBatchEmbeddings, so concurrent queries from different
+uvicorn workers share one forward pass. Clients use RemoteEmbeddings, which
+implements the LangChain Embeddings interface; get_embedding_function returns
+it whenever EMBEDDING_SERVER_SOCKET is set.
+
+Wire format (both directions): 4-byte big-endian header length, a JSON header,
+then for successful embed responses n * dim little-endian float32 values.
+
+Usage:
+    python embedding_server.py --socket /tmp/soalify-embedding.sock
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from var import EMBEDDING_SERVER_SOCKET, EMBEDDING_MAX_WAIT_MS, EMBEDDING_MAX_BATCH
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">I")
+CLIENT_CHUNK_SIZE = 256
+
+# ====================== Framing ======================
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+def _send_message(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    encoded = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded + payload)
+
+def _recv_header(sock: socket.socket) -> Dict[str, Any]:
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, length).decode("utf-8"))
+
+# ====================== Server ======================
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    """Serve requests from one client connection until it disconnects"""
+
+    def handle(self):
+        while True:
+            try:
+                request = _recv_header(self.request)
+            except (ConnectionError, struct.error):
+                return
+
+            try:
+                op = request.get("op")
+                if op == "embed":
+                    vectors = self._embed(request["texts"])
+                    _send_message(self.request, {"ok": True, "n": vectors.shape[0], "dim": vectors.shape[1]},
+                                  vectors.astype("<f4").tobytes())
+                elif op == "stats":
+                    _send_message(self.request, {"ok": True, "stats": self.server.embedder.stats()})
+                else:
+                    _send_message(self.request, {"ok": False, "error": f"Unknown op '{op}'"})
+            except Exception as e:
+                logger.error(f"Embedding request failed: {e}")
+                _send_message(self.request, {"ok": False, "error": str(e)})
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = self.server.embedder.embed_small_batch(texts)
+        return np.asarray(vectors, dtype=np.float32)
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, socket_path: str, embedder):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+        os.chmod(socket_path, 0o600)
+        self.embedder = embedder
+
+def serve(socket_path: str, max_wait_ms: float, max_batch_size: int):
+    from get_embedding_function import CPUEmbeddings
+    from embedding_batcher import MicroBatchEmbeddings
+
+    backend = CPUEmbeddings()
+    backend.client  # load the model before accepting connections
+    embedder = MicroBatchEmbeddings(backend, max_wait_ms=max_wait_ms, max_batch_size=max_batch_size)
+
+    with EmbeddingServer(socket_path, embedder) as server:
+        logger.info(f"Embedding server listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+# ====================== Client ======================
+class RemoteEmbeddings(Embeddings):
+    """LangChain Embeddings client for the local embedding server"""
+
+    def __init__(self, socket_path: str, timeout: float = 120.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Connect in blocking mode: with a timeout set, a full accept backlog
+            # fails immediately with EAGAIN on Unix sockets instead of waiting
+            sock.connect(self.socket_path)
+            sock.settimeout(self.timeout)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            finally:
+                self._local.sock = None
+
+    def _call(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        """Send one request, reconnecting once if the server was restarted"""
+        for attempt in range(2):
+            try:
+                sock = self._connect()
+                _send_message(sock, request)
+                header = _recv_header(sock)
+                payload = b""
+                if header.get("ok") and "n" in header:
+                    payload = _recv_exact(sock, header["n"] * header["dim"] * 4)
+                break
+            except (ConnectionError, OSError):
+                self._close()
+                if attempt == 1:
+                    raise
+
+        if not header.get("ok"):
+            raise RuntimeError(f"Embedding server error: {header.get('error')}")
+        return header, payload
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        parts = []
+        for start in range(0, len(texts), CLIENT_CHUNK_SIZE):
+            header, payload = self._call({"op": "embed", "texts": texts[start:start + CLIENT_CHUNK_SIZE]})
+            parts.append(np.frombuffer(payload, dtype="<f4").reshape(header["n"], header["dim"]))
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(parts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def stats(self) -> Dict[str, Any]:
+        header, _ = self._call({"op": "stats"})
+        return {"server": self.socket_path, **header["stats"]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding server")
+    parser.add_argument("--socket", type=str, default=EMBEDDING_SERVER_SOCKET or "/tmp/soalify-embedding.sock")
+    parser.add_argument("--max_wait_ms", type=float, default=EMBEDDING_MAX_WAIT_MS or 5.0)
+    parser.add_argument("--max_batch", type=int, default=EMBEDDING_MAX_BATCH)
+    args = parser.parse_args()
+    serve(args.socket, args.max_wait_ms, args.max_batch)
+
+if __name__ == "__main__":
+    main()
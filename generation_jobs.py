@@ -0,0 +1,403 @@
+"""
+Question generation shared by /questions/generate and background jobs.
+
+run_generation is the synchronous pipeline (semantic cache, RAG or direct
+generation, exclusion of questions already in the user's bank); run_batch
+fans it out over many topics for the batch API. The job
+manager runs it on a bounded worker pool so large generations outlive the
+HTTP request: clients poll the job or subscribe to its events, and
+cancelling a job cancels its token, which stops the Gemini stream.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from fastapi import HTTPException, status
+
+from cancellation import CancellationToken, GenerationCancelled, cancellation_stats, check_cancelled
+from question_index import _normalize, drop_existing_questions
+from rag_core import _retrieve_context, query_rag, direct_llm_questions
+from retrieval_cache import normalize_query
+from schemas import QueryRequest
+from semantic_cache import is_cacheable, options_key, semantic_cache, unit_vector
+from var import (
+    SEMANTIC_CACHE_ENABLED,
+    GENERATION_JOB_WORKERS,
+    GENERATION_JOB_MAX_PENDING,
+    GENERATION_JOB_TTL_SECONDS,
+    BATCH_RETRIEVAL_WORKERS,
+    BATCH_LLM_CONCURRENCY,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ====================== Generation ======================
+class _PrecomputedEmbeddings:
+    """Answers embed_query from vectors the caller already computed, delegating anything else"""
+
+    def __init__(self, base, vectors: Dict[str, List[float]]):
+        self.base = base
+        self._vectors = vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._vectors.get(text)
+        return vector if vector is not None else self.base.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+def run_generation(request: QueryRequest, user_id: Optional[int],
+                   cancel_token: Optional[CancellationToken] = None,
+                   on_partial: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                   query_vector: Optional[np.ndarray] = None,
+                   retrieved: Optional[Tuple[str, list]] = None,
+                   corpus_token: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+    """Generate questions for one request; returns (result, method)
+
+    query_vector (unit length) and retrieved (from _retrieve_context) can be
+    passed in when the caller computed them already, as the batch API does;
+    retrieved then needs the corpus_token taken before that retrieval.
+    """
+    # Ask for a few extra questions to make up for the ones that get dropped
+    num_questions = request.num_questions
+    if request.exclude_existing:
+        num_questions += max(1, request.num_questions // 4)
+
+    method = "rag" if request.use_rag else "llm"
+    cache_options = None
+    result = None
+    embeddings = None
+    if not SEMANTIC_CACHE_ENABLED:
+        query_vector = None
+    else:
+        try:
+            if query_vector is None:
+                from get_embedding_function import get_embedding_function
+
+                # Retrieval on a cache miss reuses this embedding instead of computing it again
+                base_embeddings = get_embedding_function()
+                raw_vector = base_embeddings.embed_query(request.query_text)
+                embeddings = _PrecomputedEmbeddings(base_embeddings, {request.query_text: raw_vector})
+                query_vector = unit_vector(raw_vector)
+            cache_options = options_key(request.use_rag, num_questions,
+                                        request.target_learning_outcome, request.selected_documents,
+                                        corpus_token)
+            if not request.bypass_cache:
+                result = semantic_cache.lookup(query_vector, cache_options)
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {e}")
+            query_vector = None
+
+    if result is None:
+        check_cancelled(cancel_token, "retrieval" if request.use_rag else "before_llm")
+        if request.use_rag:
+            result = query_rag(
+                request.query_text,
+                num_questions,
+                embedding_function=embeddings,
+                selected_documents=request.selected_documents,
+                target_learning_outcome=request.target_learning_outcome,
+                use_cache=not request.bypass_cache,
+                cancel_token=cancel_token,
+                on_partial=on_partial,
+                retrieved=retrieved
+            )
+        else:
+            result = direct_llm_questions(
+                request.query_text,
+                num_questions,
+                target_learning_outcome=request.target_learning_outcome,
+                use_cache=not request.bypass_cache,
+                cancel_token=cancel_token,
+                on_partial=on_partial
+            )
+
+        if query_vector is not None and is_cacheable(result):
+            semantic_cache.store(request.query_text, query_vector, cache_options, result)
+
+    if request.exclude_existing and user_id is not None:
+        result = drop_existing_questions(user_id, result, request.num_questions)
+    return result, method
+
+# ====================== Batch ======================
+_retrieval_pool = ThreadPoolExecutor(max_workers=max(1, BATCH_RETRIEVAL_WORKERS), thread_name_prefix="batch-retrieval")
+_llm_pool = ThreadPoolExecutor(max_workers=max(1, BATCH_LLM_CONCURRENCY), thread_name_prefix="batch-llm")
+
+def _generation_key(request: QueryRequest) -> tuple:
+    """Requests with equal keys would produce the same generation"""
+    return (
+        normalize_query(request.query_text),
+        request.num_questions,
+        request.use_rag,
+        " ".join((request.target_learning_outcome or "").lower().split()),
+        tuple(sorted(set(request.selected_documents or []))),
+        request.exclude_existing,
+        request.bypass_cache,
+    )
+
+def _retrieval_key(request: QueryRequest) -> tuple:
+    return normalize_query(request.query_text), tuple(sorted(set(request.selected_documents or [])))
+
+def run_batch(requests: List[QueryRequest], user_id: Optional[int],
+              cancel_token: Optional[CancellationToken] = None,
+              on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Generate every topic of a batch; returns (per-topic results in request order, metadata)
+
+    All query embeddings come from one forward pass, retrieval runs for all
+    topics concurrently (once per distinct query and document filter), and
+    the LLM calls go through a pool of BATCH_LLM_CONCURRENCY workers shared
+    by all batches. Identical topics are generated once. on_result is called
+    from worker threads as each topic finishes.
+    """
+    import numpy as np
+
+    from get_embedding_function import get_embedding_function
+    from retrieval_cache import corpus_cache_token
+
+    start = time.perf_counter()
+    groups: "OrderedDict[tuple, List[int]]" = OrderedDict()
+    for position, request in enumerate(requests):
+        groups.setdefault(_generation_key(request), []).append(position)
+    unique = [requests[positions[0]] for positions in groups.values()]
+
+    check_cancelled(cancel_token, "retrieval")
+    base_embeddings = get_embedding_function()
+    texts = list(dict.fromkeys(request.query_text for request in unique))
+    vectors = dict(zip(texts, base_embeddings.embed_documents(texts)))
+    embeddings = _PrecomputedEmbeddings(base_embeddings, vectors)
+    unit_vectors = {text: _normalize(np.asarray([vector]))[0] for text, vector in vectors.items()}
+    embed_ms = (time.perf_counter() - start) * 1000
+
+    # Taken before any retrieval so results from an older corpus are never cached as newer
+    corpus_token = corpus_cache_token()
+    retrievals = {}
+    for request in unique:
+        key = _retrieval_key(request)
+        if request.use_rag and key not in retrievals:
+            retrievals[key] = _retrieval_pool.submit(
+                _retrieve_context, request.query_text, embeddings, request.selected_documents, cancel_token
+            )
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+
+    def generate(request: QueryRequest, positions: List[int]):
+        try:
+            retrieved = retrievals[_retrieval_key(request)].result() if request.use_rag else None
+            result, method = run_generation(request, user_id, cancel_token,
+                                            query_vector=unit_vectors[request.query_text],
+                                            retrieved=retrieved, corpus_token=corpus_token)
+            outcome = {"method": method, "result": result}
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Batch topic '{request.query_text}' failed: {e}")
+            outcome = {"error": str(e)}
+
+        for position in positions:
+            item = {"index": position, "query_text": requests[position].query_text, **outcome}
+            results[position] = item
+            if on_result is not None:
+                on_result(item)
+
+    futures = [_llm_pool.submit(generate, request, positions)
+               for request, positions in zip(unique, groups.values())]
+    try:
+        for future in futures:
+            future.result()
+    except GenerationCancelled:
+        for future in futures + list(retrievals.values()):
+            future.cancel()
+        raise
+
+    metadata = {
+        "topics": len(requests),
+        "unique_topics": len(unique),
+        "retrievals": len(retrievals),
+        "embedding_ms": round(embed_ms, 1),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    logger.info(f"Batch generation: {metadata}")
+    return results, metadata
+
+# ====================== Jobs ======================
+FINISHED = ("completed", "failed", "cancelled")
+
+class GenerationJob:
+    def __init__(self, request: QueryRequest, user_id: Optional[int], on_finish: Optional[Callable[[], None]]):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.user_id = user_id
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.partial_questions: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.method: Optional[str] = None
+        self.error: Optional[str] = None
+        self.token = CancellationToken()
+        self.future = None
+        self._on_finish = on_finish
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "partial_questions": self.partial_questions,
+            "method": self.method,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    def _publish(self, event: Dict[str, Any]):
+        for loop, queue in self._subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                pass  # subscriber's loop already closed
+
+    def subscribe(self) -> Tuple[asyncio.Queue, Dict[str, Any]]:
+        """Queue of future events plus a snapshot of the job, taken atomically"""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+            return queue, self.to_dict()
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = [(loop, q) for loop, q in self._subscribers if q is not queue]
+
+    def set_running(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+            self._publish({"type": "status", "status": self.status})
+
+    def add_partial(self, questions: List[Dict[str, Any]]):
+        with self._lock:
+            new_questions = questions[len(self.partial_questions):]
+            self.partial_questions = list(questions)
+            if new_questions:
+                self._publish({"type": "partial", "questions": new_questions})
+
+    def finish(self, job_status: str, result: Optional[Dict[str, Any]] = None,
+               method: Optional[str] = None, error: Optional[str] = None):
+        with self._lock:
+            if self.finished:
+                return
+            self.status = job_status
+            self.finished_at = time.time()
+            self.result = result
+            self.method = method
+            self.error = error
+            self._publish({"type": "result", **self.to_dict()})
+        if self._on_finish is not None:
+            try:
+                self._on_finish()
+            except Exception as e:
+                logger.error(f"Job {self.id} finish callback failed: {e}")
+
+class GenerationJobManager:
+    """Bounded worker pool plus a TTL store of job states"""
+
+    def __init__(self, workers: int = GENERATION_JOB_WORKERS, max_pending: int = GENERATION_JOB_MAX_PENDING,
+                 ttl_seconds: float = GENERATION_JOB_TTL_SECONDS):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="generation-job")
+        self._jobs: "OrderedDict[str, GenerationJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {job_status: 0 for job_status in FINISHED}
+
+    def _purge(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, request: QueryRequest, user_id: Optional[int],
+               on_finish: Optional[Callable[[], None]] = None) -> GenerationJob:
+        with self._lock:
+            self._purge()
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many generation jobs queued, please retry later",
+                    headers={"Retry-After": "5"},
+                )
+            job = GenerationJob(request, user_id, on_finish)
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: GenerationJob):
+        try:
+            job.token.raise_if_cancelled("queued")
+            job.set_running()
+            result, method = run_generation(job.request, job.user_id, job.token, job.add_partial)
+            metadata = result.get("metadata") or {}
+            if metadata.get("status") == "error":
+                job.finish("failed", result=result, method=method, error=metadata.get("message"))
+            else:
+                job.finish("completed", result=result, method=method)
+        except GenerationCancelled:
+            job.finish("cancelled")
+        except Exception as e:
+            logger.error(f"Generation job {job.id} failed: {e}")
+            job.finish("failed", error=str(e))
+        finally:
+            with self._lock:
+                self.counts[job.status] = self.counts.get(job.status, 0) + 1
+
+    def get(self, job_id: str) -> Optional[GenerationJob]:
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job: GenerationJob):
+        job.token.cancel("cancelled by client")
+        if job.future is not None and job.future.cancel():
+            # Never started, so _run will not record it
+            cancellation_stats.record_stop("queued")
+            job.finish("cancelled")
+            with self._lock:
+                self.counts["cancelled"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.status] = states.get(job.status, 0) + 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "ttl_seconds": self.ttl_seconds,
+                "stored": len(self._jobs),
+                "states": states,
+                "finished": dict(self.counts),
+            }
+
+job_manager = GenerationJobManager()
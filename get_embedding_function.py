@@ -1,9 +1,130 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
 
-from langchain_huggingface import HuggingFaceEmbeddings
+import numpy as np
+from langchain_core.embeddings import Embeddings
 
-from var import EMBEDDING_MODEL
+from var import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_FILE,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_NUM_THREADS,
+    EMBEDDING_NORMALIZE,
+    EMBEDDING_MAX_WAIT_MS,
+    EMBEDDING_MAX_BATCH,
+    EMBEDDING_SERVER_SOCKET,
+)
+
+logger = logging.getLogger(__name__)
+
+# ====================== Configuration ======================
+@dataclass
+class EmbeddingConfig:
+    """Configuration for the CPU embedding backend"""
+    model_name: str = EMBEDDING_MODEL
+    backend: str = EMBEDDING_BACKEND  # "torch" or "onnx"
+    onnx_file: Optional[str] = EMBEDDING_ONNX_FILE  # e.g. "onnx/model_qint8_avx512_vnni.onnx"
+    batch_size: int = EMBEDDING_BATCH_SIZE
+    num_threads: int = EMBEDDING_NUM_THREADS  # 0 keeps the torch default
+    normalize: bool = EMBEDDING_NORMALIZE
+    device: str = "cpu"
+
+# ====================== CPU Embedding Backend ======================
+class CPUEmbeddings(Embeddings):
+    """Sentence-transformer embeddings tuned for CPU throughput"""
+
+    def __init__(self, config: Optional[EmbeddingConfig] = None):
+        self.config = config or EmbeddingConfig()
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Lazy-load the sentence-transformer model"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._load_model()
+        return self._client
+
+    def _load_model(self):
+        """Load the model with the configured backend and thread count"""
+        from sentence_transformers import SentenceTransformer
+
+        if self.config.num_threads > 0:
+            import torch
+            torch.set_num_threads(self.config.num_threads)
+
+        kwargs = {"device": self.config.device}
+        if self.config.backend == "onnx":
+            kwargs["backend"] = "onnx"
+            if self.config.onnx_file:
+                kwargs["model_kwargs"] = {"file_name": self.config.onnx_file}
+
+        logger.info(f"Loading embedding model {self.config.model_name} "
+                    f"(backend={self.config.backend}, threads={self.config.num_threads or 'default'})")
+        return SentenceTransformer(self.config.model_name, **kwargs)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in length-sorted buckets so each forward pass has little padding"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        output = None
+        batch_size = self.config.batch_size
+
+        for start in range(0, len(texts), batch_size):
+            bucket = order[start:start + batch_size]
+            vectors = self.client.encode(
+                [texts[i] for i in bucket],
+                batch_size=len(bucket),
+                convert_to_numpy=True,
+                normalize_embeddings=self.config.normalize,
+                show_progress_bar=False,
+            )
+            if output is None:
+                output = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            output[bucket] = vectors
+
+        return output
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+_embedding_function = None
+_embedding_lock = threading.Lock()
+
+def _create_embedding_function() -> Embeddings:
+    if EMBEDDING_SERVER_SOCKET:
+        from embedding_server import RemoteEmbeddings
+        return RemoteEmbeddings(EMBEDDING_SERVER_SOCKET)
+
+    backend = CPUEmbeddings()
+    if EMBEDDING_MAX_WAIT_MS > 0:
+        from embedding_batcher import MicroBatchEmbeddings
+        backend = MicroBatchEmbeddings(
+            backend,
+            max_wait_ms=EMBEDDING_MAX_WAIT_MS,
+            max_batch_size=EMBEDDING_MAX_BATCH,
+        )
+    return backend
 
 def get_embedding_function():
-    return HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL
-    )
\ No newline at end of file
+    """Return the process-wide embedding backend, loading it on first use
+
+    With EMBEDDING_SERVER_SOCKET set, this is a client for the shared
+    embedding server and no model is loaded in this process.
+    """
+    global _embedding_function
+    if _embedding_function is None:
+        with _embedding_lock:
+            if _embedding_function is None:
+                _embedding_function = _create_embedding_function()
+    return _embedding_function
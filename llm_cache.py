@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from var import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_MB, LLM_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+EVICTION_CHECK_EVERY = 50
+
+def completion_key(model_name: str, config: Dict[str, Any], prompt: str) -> str:
+    """Cache key for one fully formatted prompt under one model + generation config"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    payload = json.dumps({"model": model_name, "config": config, "prompt": prompt_hash}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCompletionCache:
+    """SQLite-backed completion cache with TTL and least-recently-used size eviction
+
+    Safe to share between threads (one connection per thread) and between
+    worker processes (WAL journal, busy timeout).
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_MB * 1024 * 1024,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    completion TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_completions_last_used ON completions (last_used)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT completion, created_at FROM completions WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is not None and self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+            with conn:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            row = None
+
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+
+        with conn:
+            conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key: str, model_name: str, completion: str):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, completion, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name or "", completion, len(completion.encode("utf-8")), now, now),
+            )
+
+        with self._stats_lock:
+            self._puts += 1
+            check = self._puts % EVICTION_CHECK_EVERY == 1
+        if check:
+            self.evict()
+
+    def delete(self, key: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+
+    def evict(self):
+        """Drop expired entries, then the least recently used until under max_bytes"""
+        conn = self._connect()
+        with conn:
+            if self.ttl_seconds > 0:
+                conn.execute("DELETE FROM completions WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            excess = total - self.max_bytes
+            freed = 0
+            stale_keys = []
+            for key, size in conn.execute("SELECT key, size FROM completions ORDER BY last_used"):
+                stale_keys.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            conn.executemany("DELETE FROM completions WHERE key = ?", stale_keys)
+            logger.info(f"LLM cache evicted {len(stale_keys)} entries ({freed} bytes)")
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM completions")
+
+    def stats(self) -> Dict[str, Any]:
+        entries, total = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+_cache: Optional[LLMCompletionCache] = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMCompletionCache]:
+    """Process-wide completion cache, or None when disabled or the file cannot be opened"""
+    global _cache, _cache_failed
+    if not LLM_CACHE_ENABLED or _cache_failed:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and not _cache_failed:
+                try:
+                    _cache = LLMCompletionCache()
+                except (sqlite3.Error, OSError) as e:
+                    logger.error(f"LLM cache disabled, could not open {LLM_CACHE_PATH}: {e}")
+                    _cache_failed = True
+    return _cache
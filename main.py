@@ -1,14 +1,19 @@
 import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.concurrency import run_in_threadpool
  
-from var import URL_PATH
+from var import URL_PATH, WARMUP_ON_STARTUP
 import models
 import routers
 from database_seeder import seed_database
-from database import engine, get_db
+from database import engine, get_db, async_engine
+from warmup import warm_up_retrieval
+from search_index import ensure_search_index
 models.Base.metadata.create_all(bind=engine)
+models.ensure_indexes(engine)
+ensure_search_index(engine)
 
 app = FastAPI()
 
@@ -18,6 +23,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
 
 os.makedirs("data", exist_ok=True)
@@ -27,8 +33,11 @@ app.include_router(routers.tags_router)
 app.include_router(routers.packages_router)
 app.include_router(routers.rag_router)
 app.include_router(routers.questions_router)
+app.include_router(routers.health_router)
 
 
+_background_tasks = set()
+
 @app.on_event("startup")
 async def startup_event():
     db = next(get_db())
@@ -37,6 +46,15 @@ async def startup_event():
     finally:
         db.close()
 
+    if WARMUP_ON_STARTUP:
+        task = asyncio.create_task(run_in_threadpool(warm_up_retrieval))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await async_engine.dispose()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
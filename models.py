@@ -5,8 +5,8 @@ from database import Base
 package_tags = Table(
     "package_tags",
     Base.metadata,
-    Column("package_id", Integer, ForeignKey("packages.id", ondelete="CASCADE")),
-    Column("tag_id", Integer, ForeignKey("tags.tag_id", ondelete="CASCADE"))
+    Column("package_id", Integer, ForeignKey("packages.id", ondelete="CASCADE"), index=True),
+    Column("tag_id", Integer, ForeignKey("tags.tag_id", ondelete="CASCADE"), index=True)
 )
 
 class Role(Base):
@@ -46,7 +46,7 @@ class Package(Base):
     
     id = Column(Integer, primary_key=True)
     package_name = Column(String)
-    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), index=True)
     
     user = relationship("User", back_populates="packages")
     tags = relationship("Tag", secondary=package_tags, back_populates="packages")
@@ -56,8 +56,14 @@ class QA(Base):
     __tablename__ = "qa"
     
     id = Column(Integer, primary_key=True)
-    package_id = Column(Integer, ForeignKey("packages.id", ondelete="CASCADE"))  
+    package_id = Column(Integer, ForeignKey("packages.id", ondelete="CASCADE"), index=True)
     question = Column(Text)
     answer = Column(Text)
 
-    package = relationship("Package", back_populates="questions")
\ No newline at end of file
+    package = relationship("Package", back_populates="questions")
+
+def ensure_indexes(bind):
+    """Create declared indexes missing from tables that create_all skipped because they already existed"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
@@ -0,0 +1,295 @@
+"""
+Streaming import/export of question packages.
+
+Both formats use the same flat row, one row per question:
+
+    package        id of the package in the exporting system (groups rows)
+    package_name   name of the package
+    tags           tag names (a JSON list in NDJSON, ";"-separated in CSV)
+    question       question text (empty for a package without questions)
+    answer         answer text
+
+Exports stream rows from a server-side cursor, so memory stays constant no
+matter how many questions are exported. Imports parse the upload row by row,
+insert questions in batches and collect per-row errors instead of aborting.
+"""
+
+import codecs
+import csv
+import io
+import json
+import logging
+from collections import defaultdict
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("package", "package_name", "tags", "question", "answer")
+TAG_SEPARATOR = ";"
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+# ====================== Export ======================
+async def export_rows(user_id: int, package_ids: Optional[List[int]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one row per question of the user's packages, in package/question order
+
+    Opens its own session because the response body is streamed after the
+    request's dependencies have been cleaned up.
+    """
+    filters = [models.Package.user_id == user_id]
+    if package_ids:
+        filters.append(models.Package.id.in_(package_ids))
+
+    async with AsyncSessionLocal() as db:
+        tag_rows = await db.execute(
+            select(models.package_tags.c.package_id, models.Tag.tag_name)
+            .join(models.Tag, models.Tag.tag_id == models.package_tags.c.tag_id)
+            .join(models.Package, models.Package.id == models.package_tags.c.package_id)
+            .where(*filters)
+        )
+        tags = defaultdict(list)
+        for package_id, tag_name in tag_rows:
+            tags[package_id].append(tag_name)
+
+        result = await db.stream(
+            select(models.Package.id, models.Package.package_name, models.QA.question, models.QA.answer)
+            .outerjoin(models.QA, models.QA.package_id == models.Package.id)
+            .where(*filters)
+            .order_by(models.Package.id, models.QA.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for package_id, package_name, question, answer in result:
+            yield {
+                "package": package_id,
+                "package_name": package_name,
+                "tags": tags.get(package_id, []),
+                "question": question,
+                "answer": answer,
+            }
+
+async def ndjson_chunks(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    buffer = []
+    size = 0
+    async for row in rows:
+        line = json.dumps(row, ensure_ascii=False) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+async def csv_chunks(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    async for row in rows:
+        writer.writerow([
+            row["package"],
+            row["package_name"],
+            TAG_SEPARATOR.join(row["tags"]),
+            row["question"] or "",
+            row["answer"] or "",
+        ])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+# ====================== Import ======================
+def _text_lines(binary_file, chunk_size: int = EXPORT_CHUNK_BYTES) -> Iterator[str]:
+    """Decode an uploaded file incrementally, keeping line endings for the csv module"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = binary_file.read(chunk_size)
+        pending += decoder.decode(chunk, final=not chunk)
+        # Split on "\n" only: str.splitlines would also break on U+2028 etc.,
+        # which json.dumps(ensure_ascii=False) leaves unescaped inside strings
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+        if not chunk:
+            if pending:
+                yield pending
+            return
+
+def parse_rows(binary_file, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, row dict or the error that row raised)"""
+    lines = _text_lines(binary_file)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            tags = row.get("tags") or ""
+            row["tags"] = [tag for tag in tags.split(TAG_SEPARATOR) if tag.strip()]
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, row
+
+def _read_rows(rows: Iterator[Tuple[int, Any]], count: int):
+    """Next `count` parsed rows, plus the read error that stopped them early if any"""
+    batch = []
+    try:
+        batch.extend(islice(rows, count))
+    except (UnicodeDecodeError, csv.Error) as e:
+        return batch, e
+    return batch, None
+
+async def parse_upload_rows(binary_file, fmt: str,
+                            batch_size: int = IMPORT_BATCH_SIZE) -> AsyncIterator[Tuple[int, Any]]:
+    """parse_rows for an upload, reading and parsing batch_size rows at a time in the threadpool
+
+    Large uploads are spooled to disk, so reading them on the event loop
+    would block it. A read error is raised after the rows parsed before it.
+    """
+    rows = parse_rows(binary_file, fmt)
+    while True:
+        batch, error = await run_in_threadpool(_read_rows, rows, batch_size)
+        for item in batch:
+            yield item
+        if error is not None:
+            raise error
+        if len(batch) < batch_size:
+            return
+
+def _clean(row: Dict[str, Any]):
+    package_name = (row.get("package_name") or "").strip()
+    if not package_name:
+        raise ValueError("package_name is required")
+
+    tags = row.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(TAG_SEPARATOR)
+    if not isinstance(tags, list):
+        raise ValueError("tags must be a list")
+    tags = [str(tag).strip() for tag in tags if str(tag).strip()]
+
+    question = row.get("question") or ""
+    answer = row.get("answer") or ""
+    if bool(question) != bool(answer):
+        raise ValueError("question and answer must both be set")
+
+    key = str(row.get("package") or package_name)
+    return key, package_name, tags, question, answer
+
+class PackageImporter:
+    """Create packages, tags and questions from parsed rows in bulk batches
+
+    Each new package (with its tags) is committed as soon as it is first
+    seen; questions are buffered and inserted IMPORT_BATCH_SIZE at a time.
+    A failing row or batch is reported and skipped, the rest carries on.
+    """
+
+    def __init__(self, db: AsyncSession, user_id: int, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self._packages: Dict[str, int] = {}
+        self._tags: Optional[Dict[str, int]] = None
+        self._pending: List[Tuple[int, Dict[str, Any]]] = []
+        self.packages_created = 0
+        self.questions_imported = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def report_error(self, line: Optional[int], message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    async def _tag_ids(self, names: List[str]) -> List[int]:
+        if self._tags is None:
+            rows = await self.db.execute(
+                select(models.Tag.tag_name, models.Tag.tag_id).where(models.Tag.user_id == self.user_id)
+            )
+            self._tags = {name: tag_id for name, tag_id in rows}
+
+        for name in names:
+            if name not in self._tags:
+                tag = models.Tag(tag_name=name, user_id=self.user_id)
+                self.db.add(tag)
+                await self.db.flush()
+                self._tags[name] = tag.tag_id
+        return [self._tags[name] for name in dict.fromkeys(names)]
+
+    async def _package_id(self, key: str, package_name: str, tags: List[str]) -> int:
+        if key in self._packages:
+            return self._packages[key]
+
+        package = models.Package(package_name=package_name, user_id=self.user_id)
+        self.db.add(package)
+        await self.db.flush()
+        tag_ids = await self._tag_ids(tags)
+        if tag_ids:
+            await self.db.execute(
+                insert(models.package_tags),
+                [{"package_id": package.id, "tag_id": tag_id} for tag_id in tag_ids],
+            )
+        await self.db.commit()
+
+        self._packages[key] = package.id
+        self.packages_created += 1
+        return package.id
+
+    async def add(self, line: int, row: Any):
+        if isinstance(row, Exception):
+            self.report_error(line, f"Invalid row: {row}")
+            return
+        try:
+            key, package_name, tags, question, answer = _clean(row)
+            package_id = await self._package_id(key, package_name, tags)
+        except Exception as e:
+            await self.db.rollback()
+            self._tags = None  # may hold ids of tags created in the rolled back transaction
+            self.report_error(line, str(e))
+            return
+
+        if question:
+            self._pending.append((line, {"package_id": package_id, "question": question, "answer": answer}))
+            if len(self._pending) >= self.batch_size:
+                await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await self.db.execute(insert(models.QA), [values for _, values in batch])
+            await self.db.commit()
+            self.questions_imported += len(batch)
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Question import batch failed: {e}")
+            for line, _ in batch:
+                self.report_error(line, f"Batch insert failed: {e}")
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "packages_created": self.packages_created,
+            "questions_imported": self.questions_imported,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from var import (
+    QUESTION_INDEX_PATH,
+    QUESTION_INDEX_MAX_USERS,
+    QUESTION_DUPLICATE_THRESHOLD,
+    QUESTION_DEDUP_ON_SAVE,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def _text_hash(text: str) -> int:
+    return zlib.crc32((text or "").strip().lower().encode("utf-8"))
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def embed_questions(texts: List[str]) -> np.ndarray:
+    """Unit-length float32 embeddings for question texts"""
+    from get_embedding_function import get_embedding_function
+
+    embedding_function = get_embedding_function()
+    backend = getattr(embedding_function, "backend", embedding_function)
+    if hasattr(backend, "embed_array"):
+        vectors = backend.embed_array(texts)
+    else:
+        vectors = embedding_function.embed_documents(texts)
+    return _normalize(vectors)
+
+# ====================== Per-user index ======================
+class UserQuestionIndex:
+    """Saved questions of one user as a dense matrix of unit vectors
+
+    Rows live in preallocated arrays that grow by doubling, so adding a few
+    questions does not copy the whole bank. A duplicate check is a single
+    matrix-vector product over the live rows.
+    """
+
+    def __init__(self, dim: int = 0, capacity: int = 256):
+        import numpy as np
+
+        self.dim = dim
+        self.size = 0
+        self.lock = threading.Lock()
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.package_ids = np.zeros(capacity, dtype=np.int64)
+        self.hashes = np.zeros(capacity, dtype=np.uint32)
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+
+    def _reserve(self, extra: int, dim: int):
+        import numpy as np
+
+        if self.dim == 0:
+            self.dim = dim
+            self.vectors = np.zeros((self.ids.shape[0], dim), dtype=np.float32)
+        needed = self.size + extra
+        capacity = self.ids.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("ids", "package_ids", "hashes", "vectors"):
+            old = getattr(self, name)
+            grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def remove(self, ids) -> int:
+        import numpy as np
+
+        if self.size == 0 or len(ids) == 0:
+            return 0
+        keep = ~np.isin(self.ids[:self.size], np.asarray(ids, dtype=np.int64))
+        kept = int(keep.sum())
+        removed = self.size - kept
+        if removed:
+            for name in ("ids", "package_ids", "hashes", "vectors"):
+                array = getattr(self, name)
+                array[:kept] = array[:self.size][keep]
+            self.size = kept
+        return removed
+
+    def add(self, ids, package_ids, hashes, vectors: np.ndarray):
+        if len(ids) == 0:
+            return
+        self.remove(ids)
+        self._reserve(len(ids), vectors.shape[1])
+        end = self.size + len(ids)
+        self.ids[self.size:end] = ids
+        self.package_ids[self.size:end] = package_ids
+        self.hashes[self.size:end] = hashes
+        self.vectors[self.size:end] = vectors
+        self.size = end
+
+    def find_duplicates(self, query_vectors: np.ndarray, threshold: float,
+                        exclude_package_id: Optional[int] = None) -> List[Optional[Dict[str, Any]]]:
+        """For each query vector, the most similar saved question at or above threshold"""
+        import numpy as np
+
+        matches: List[Optional[Dict[str, Any]]] = [None] * len(query_vectors)
+        if self.size == 0 or len(query_vectors) == 0:
+            return matches
+
+        with self.lock:
+            scores = self.vectors[:self.size] @ query_vectors.T
+            if exclude_package_id is not None:
+                scores[self.package_ids[:self.size] == exclude_package_id] = -1.0
+
+            best_rows = scores.argmax(axis=0)
+            best_scores = scores[best_rows, np.arange(scores.shape[1])]
+            for i in np.flatnonzero(best_scores >= threshold):
+                row = best_rows[i]
+                matches[i] = {
+                    "duplicate_of": int(self.ids[row]),
+                    "package_id": int(self.package_ids[row]),
+                    "similarity": round(float(best_scores[i]), 4),
+                }
+        return matches
+
+    def save(self, path: str):
+        import numpy as np
+
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=self.ids[:self.size],
+            package_ids=self.package_ids[:self.size],
+            hashes=self.hashes[:self.size],
+            vectors=self.vectors[:self.size],
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "UserQuestionIndex":
+        import numpy as np
+
+        with np.load(path) as data:
+            vectors = data["vectors"]
+            index = cls(dim=vectors.shape[1] if vectors.ndim == 2 else 0,
+                        capacity=max(256, len(vectors)))
+            index.add(data["ids"], data["package_ids"], data["hashes"], vectors)
+        return index
+
+# ====================== Registry ======================
+class QuestionIndexRegistry:
+    """LRU of per-user indexes, persisted as <root>/<user_id>.npz
+
+    sync_user reconciles an index with the qa table and embeds only rows that
+    are new or whose text changed; given the packages a write touched, it
+    reads only their rows, so it is cheap to call after every package write.
+    Other workers notice the rewritten .npz file and reload it.
+    """
+
+    def __init__(self, root: str = QUESTION_INDEX_PATH, max_users: int = QUESTION_INDEX_MAX_USERS):
+        self.root = root
+        self.max_users = max(1, max_users)
+        self._indexes: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._user_locks: Dict[int, threading.Lock] = {}
+
+    def _path(self, user_id: int) -> str:
+        return os.path.join(self.root, f"{user_id}.npz")
+
+    def _user_lock(self, user_id: int) -> threading.Lock:
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def _cache(self, user_id: int, index: UserQuestionIndex, mtime: float):
+        with self._lock:
+            self._indexes[user_id] = (index, mtime)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+
+    def get(self, user_id: int, build: bool = True) -> Optional[UserQuestionIndex]:
+        """Cached index, reloaded if another worker rewrote it
+
+        An index that was never built is built here, or None is returned with
+        build=False so the caller does not embed the whole bank inline.
+        """
+        path = self._path(user_id)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+
+        with self._lock:
+            cached = self._indexes.get(user_id)
+            if cached is not None:
+                self._indexes.move_to_end(user_id)
+        if cached is not None and (mtime is None or cached[1] >= mtime):
+            return cached[0]
+
+        if mtime is None:
+            return self.sync_user(user_id) if build else None
+        with self._user_lock(user_id):
+            index = UserQuestionIndex.load(path)
+        self._cache(user_id, index, mtime)
+        return index
+
+    def sync_user(self, user_id: int, package_ids: Optional[List[int]] = None) -> UserQuestionIndex:
+        """Bring the user's index in line with their saved questions and persist it
+
+        With package_ids only the rows of those packages are reconciled; a
+        missing index is always built in full.
+        """
+        import numpy as np
+        from sqlalchemy import select
+
+        import models
+        from database import SessionLocal
+
+        scope = None if package_ids is None else np.asarray(package_ids, dtype=np.int64)
+        with self._user_lock(user_id):
+            start = time.perf_counter()
+            with self._lock:
+                cached = self._indexes.get(user_id)
+            path = self._path(user_id)
+            if cached is not None:
+                index = cached[0]
+            elif os.path.exists(path):
+                index = UserQuestionIndex.load(path)
+            else:
+                index = UserQuestionIndex()
+                scope = None
+
+            stmt = (
+                select(models.QA.id, models.QA.package_id, models.QA.question)
+                .join(models.Package, models.Package.id == models.QA.package_id)
+                .where(models.Package.user_id == user_id)
+            )
+            if scope is not None:
+                stmt = stmt.where(models.QA.package_id.in_(scope.tolist()))
+            with SessionLocal() as db:
+                rows = db.execute(stmt).all()
+
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            package_ids = np.array([row[1] for row in rows], dtype=np.int64)
+            hashes = np.array([_text_hash(row[2]) for row in rows], dtype=np.uint32)
+
+            # Only syncs mutate the index and they hold the user lock, so it can
+            # be read here; embedding runs before the index lock is taken
+            in_scope = np.ones(index.size, dtype=bool)
+            if scope is not None:
+                in_scope = np.isin(index.package_ids[:index.size], scope)
+            known = dict(zip(index.ids[:index.size][in_scope].tolist(), index.hashes[:index.size][in_scope].tolist()))
+            stale = [i for i, (qa_id, text_hash) in enumerate(zip(ids.tolist(), hashes.tolist()))
+                     if known.get(qa_id) != text_hash]
+            vectors = embed_questions([rows[i][2] or "" for i in stale]) if stale else None
+
+            with index.lock:
+                removed = index.remove(np.setdiff1d(index.ids[:index.size][in_scope], ids))
+
+                # Package moves need no re-embedding, only the row's package id
+                moved = 0
+                if index.size and scope is None:
+                    order = np.argsort(ids)
+                    rows_in_db = order[np.searchsorted(ids, index.ids[:index.size], sorter=order)]
+                    current = package_ids[rows_in_db]
+                    moved = int((index.package_ids[:index.size] != current).sum())
+                    index.package_ids[:index.size] = current
+
+                if stale:
+                    stale_rows = np.array(stale)
+                    index.add(ids[stale_rows], package_ids[stale_rows], hashes[stale_rows], vectors)
+
+                if stale or removed or moved or not os.path.exists(path):
+                    os.makedirs(self.root, exist_ok=True)
+                    index.save(path)
+            self._cache(user_id, index, os.path.getmtime(path))
+
+            logger.info(f"Question index for user {user_id}: {index.size} rows, "
+                        f"{len(stale)} embedded, {removed} removed "
+                        f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return index
+
+    def find_duplicates(self, user_id: int, texts: List[str], exclude_package_id: Optional[int] = None,
+                        threshold: float = QUESTION_DUPLICATE_THRESHOLD,
+                        build: bool = True) -> List[Optional[Dict[str, Any]]]:
+        if not texts:
+            return []
+        index = self.get(user_id, build)
+        if index is None or index.size == 0:
+            return [None] * len(texts)
+        return index.find_duplicates(embed_questions(texts), threshold, exclude_package_id)
+
+question_index = QuestionIndexRegistry()
+
+def sync_user_questions(user_id: int, package_ids: Optional[List[int]] = None):
+    """Background task run after package writes; package_ids limits it to the packages written"""
+    try:
+        question_index.sync_user(user_id, package_ids)
+    except Exception as e:
+        logger.error(f"Question index sync failed for user {user_id}: {e}")
+
+def find_saved_duplicates(user_id: int, questions: Dict[int, str],
+                          exclude_package_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Saved questions (by position in the package) that repeat the user's other packages
+
+    Runs inside the save request, so a user whose index is not built yet gets
+    no report; the sync scheduled after the save builds it in the background.
+    """
+    if not QUESTION_DEDUP_ON_SAVE or not questions:
+        return []
+    positions = list(questions)
+    try:
+        matches = question_index.find_duplicates(user_id, [questions[i] for i in positions],
+                                                 exclude_package_id, build=False)
+    except Exception as e:
+        logger.error(f"Duplicate check failed for user {user_id}: {e}")
+        return []
+    return [
+        {"position": position, "question": questions[position], **match}
+        for position, match in zip(positions, matches) if match is not None
+    ]
+
+def drop_existing_questions(user_id: int, result: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    """Remove generated questions that are already in the user's bank"""
+    questions = result.get("questions") or []
+    try:
+        matches = question_index.find_duplicates(user_id, [qa.get("question", "") for qa in questions])
+    except Exception as e:
+        logger.error(f"Existing question check failed for user {user_id}: {e}")
+        matches = [None] * len(questions)
+    kept = [qa for qa, match in zip(questions, matches) if match is None]
+
+    result["questions"] = kept[:limit]
+    metadata = result.setdefault("metadata", {})
+    metadata["skipped_existing"] = len(questions) - len(kept)
+    if "count" in metadata:
+        metadata["count"] = len(result["questions"])
+    return result
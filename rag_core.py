@@ -1,19 +1,22 @@
+from __future__ import annotations
+
 import time
 import json
 import os
-import google.generativeai as genai
-from typing import List, Tuple, Dict, Any, Optional
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, List, Tuple, Dict, Any, Optional, TYPE_CHECKING
 import logging
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 
-from langchain_chroma import Chroma
-from langchain.prompts import ChatPromptTemplate
-from langchain_core.documents import Document
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
+from cancellation import CancellationToken, GenerationCancelled, check_cancelled
 from get_prompt_template import get_prompt_template
-from get_embedding_function import get_embedding_function
-from var import DATA_PATH, CHROMA_PATH, GEMINI_MODEL, GEMINI_API_KEY
+from var import (
+    DATA_PATH, CHROMA_PATH, GEMINI_MODEL, GEMINI_API_KEY, VECTOR_BACKEND, VECTOR_INDEX_PATH,
+    RETRIEVAL_CACHE_ENABLED,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -94,6 +97,31 @@ class JSONParser:
         
         return json.loads(repaired)
     
+    @staticmethod
+    def parse_partial_questions(response_text: str) -> List[Dict[str, Any]]:
+        """Complete question objects found so far in a still-streaming response"""
+        start_idx = response_text.find('"questions"')
+        if start_idx == -1:
+            return []
+        pos = response_text.find('[', start_idx)
+        if pos == -1:
+            return []
+
+        decoder = json.JSONDecoder()
+        questions = []
+        pos += 1
+        while True:
+            while pos < len(response_text) and response_text[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(response_text) or response_text[pos] != '{':
+                return questions
+            try:
+                question, pos = decoder.raw_decode(response_text, pos)
+            except ValueError:
+                return questions
+            if isinstance(question, dict):
+                questions.append(question)
+
     @staticmethod
     def _create_error_response(response_text: str) -> Dict[str, Any]:
         """Create error response when JSON parsing fails"""
@@ -114,6 +142,9 @@ def extract_primary_keyword(text: str) -> str:
         return text
     
     try:
+        import numpy as np
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
         vectorizer = TfidfVectorizer(stop_words=None, ngram_range=(1, 2))
         tfidf_matrix = vectorizer.fit_transform([text])
         feature_names = vectorizer.get_feature_names_out()
@@ -135,11 +166,19 @@ def keyword_match_score(doc_content: str, keyword: str) -> float:
 class GeminiLLM:
     """Optimized Gemini LLM wrapper with connection pooling"""
     
-    def __init__(self, api_key: str, model_name: str = GEMINI_MODEL, timeout: int = 60):
+    def __init__(self, api_key: str, model_name: str = GEMINI_MODEL, timeout: int = 60, cache=None):
         self.api_key = api_key
         self.model_name = model_name
         self.timeout = timeout
+        self.last_cache_hit = False
+        self._last_cache_key = None
+
+        if cache is None:
+            from llm_cache import get_llm_cache
+            cache = get_llm_cache()
+        self.cache = cache
         
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
         
@@ -155,56 +194,124 @@ class GeminiLLM:
         tokens_per_question = 300
         return min(8192, base_tokens + (tokens_per_question * num_questions))
         
-    def invoke(self, prompt: str, max_retries: int = 3, num_questions: int = 1) -> str:
-        """Invoke model with exponential backoff retry"""
+    def _cache_key(self, prompt: str) -> str:
+        from llm_cache import completion_key
+        config = {
+            "temperature": self.generation_config.temperature,
+            "top_p": self.generation_config.top_p,
+            "top_k": self.generation_config.top_k,
+            "max_output_tokens": self.generation_config.max_output_tokens,
+        }
+        return completion_key(self.model_name, config, prompt)
+
+    def _cache_call(self, operation: str, *args):
+        """Run a cache operation; cache errors are logged and never fail the generation"""
+        try:
+            return getattr(self.cache, operation)(*args)
+        except Exception as e:
+            logger.error(f"LLM cache {operation} failed: {e}")
+            return None
+
+    def invoke(self, prompt: str, max_retries: int = 3, num_questions: int = 1,
+               use_cache: bool = True, cancel_token: Optional[CancellationToken] = None,
+               on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Invoke model with exponential backoff retry
+
+        Completions are cached by (model, generation config, prompt); with
+        use_cache=False the cache is not read but the fresh result is stored.
+        With a cancel_token or on_text callback the response is streamed, so
+        cancellation takes effect between chunks and on_text sees the text
+        received so far.
+        """
         max_tokens = self._calculate_max_tokens(num_questions)
         self.generation_config.max_output_tokens = max_tokens
-        
+        self.last_cache_hit = False
+
+        cache_key = self._cache_key(prompt) if self.cache is not None else None
+        self._last_cache_key = cache_key
+        if cache_key and use_cache:
+            cached = self._cache_call("get", cache_key)
+            if cached is not None:
+                self.last_cache_hit = True
+                return cached
+        
+        completion = self._generate(prompt, max_retries, cancel_token, on_text)
+        if cache_key:
+            self._cache_call("put", cache_key, self.model_name, completion)
+        return completion
+
+    def _generate(self, prompt: str, max_retries: int, cancel_token: Optional[CancellationToken],
+                  on_text: Optional[Callable[[str], None]]) -> str:
         for attempt in range(max_retries):
+            check_cancelled(cancel_token, "before_llm")
             try:
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=self.generation_config
-                )
+                if cancel_token is None and on_text is None:
+                    response = self.model.generate_content(
+                        prompt,
+                        generation_config=self.generation_config
+                    )
+                    text = response.text
+                else:
+                    text = self._stream(prompt, cancel_token, on_text)
                 
-                if response.text:
-                    return response.text.strip()
+                if text:
+                    return text.strip()
                 else:
                     raise Exception("Empty response from Gemini API")
                     
+            except GenerationCancelled:
+                raise
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  
+                    if cancel_token is not None:
+                        cancel_token.sleep(2 ** attempt)
+                    else:
+                        time.sleep(2 ** attempt)  
                 else:
                     raise Exception(f"Gemini API error after {max_retries} attempts: {str(e)}")
 
-class ChromaDBManager:
-    """Manage ChromaDB operations with connection reuse and keyword-aware reranking"""
-    
-    def __init__(self, persist_directory: str, embedding_function):
-        self.persist_directory = persist_directory
-        self.embedding_function = embedding_function
-        self._db = None
-        
-    @property
-    def db(self):
-        """Lazy-load database connection"""
-        if self._db is None:
-            self._db = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embedding_function
-            )
-        return self._db
-        
+    def _stream(self, prompt: str, cancel_token: Optional[CancellationToken],
+                on_text: Optional[Callable[[str], None]]) -> str:
+        """Read a streamed response chunk by chunk; stops reading once cancelled"""
+        response = self.model.generate_content(
+            prompt,
+            generation_config=self.generation_config,
+            stream=True
+        )
+        parts = []
+        for chunk in response:
+            check_cancelled(cancel_token, "llm_stream")
+            parts.append(chunk.text)
+            if on_text is not None:
+                on_text("".join(parts))
+        return "".join(parts)
+
+    def discard_last_completion(self):
+        """Drop the last completion from the cache, e.g. when it was not valid JSON"""
+        if self.cache is not None and self._last_cache_key:
+            self._cache_call("delete", self._last_cache_key)
+
+class VectorStoreManager(ABC):
+    """Base class for vector store backends sharing the filtered, keyword-aware search flow"""
+
+    @abstractmethod
     def get_collection_count(self) -> int:
-        """Get total number of documents in collection"""
-        try:
-            return self.db._collection.count()
-        except Exception as e:
-            logger.error(f"Error getting collection count: {e}")
-            return 0
-            
+        ...
+
+    @abstractmethod
+    def _filtered_search(self, query_text: str, k: int,
+                        selected_documents: List[str], collection_count: int) -> List[Tuple[Document, float]]:
+        ...
+
+    @abstractmethod
+    def _regular_search(self, query_text: str, k: int) -> List[Tuple[Document, float]]:
+        ...
+
+    @abstractmethod
+    def _fallback_search(self, query_text: str) -> List[Tuple[Document, float]]:
+        ...
+
     def search_with_filters(self, query_text: str, top_k: int, 
                           selected_documents: Optional[List[str]] = None,
                           keyword: Optional[str] = None) -> List[Tuple[Document, float]]:
@@ -244,6 +351,33 @@ class ChromaDBManager:
         
         reranked.sort(key=lambda x: x[1], reverse=True)
         return reranked
+
+class ChromaDBManager(VectorStoreManager):
+    """Manage ChromaDB operations with connection reuse and keyword-aware reranking"""
+    
+    def __init__(self, persist_directory: str, embedding_function):
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self._db = None
+        
+    @property
+    def db(self):
+        """Lazy-load database connection"""
+        if self._db is None:
+            from langchain_chroma import Chroma
+            self._db = Chroma(
+                persist_directory=self.persist_directory,
+                embedding_function=self.embedding_function
+            )
+        return self._db
+        
+    def get_collection_count(self) -> int:
+        """Get total number of documents in collection"""
+        try:
+            return self.db._collection.count()
+        except Exception as e:
+            logger.error(f"Error getting collection count: {e}")
+            return 0
             
     def _filtered_search(self, query_text: str, k: int, 
                         selected_documents: List[str], collection_count: int) -> List[Tuple[Document, float]]:
@@ -276,6 +410,31 @@ class ChromaDBManager:
             logger.error(f"Fallback search failed: {e}")
             return []
 
+def get_vector_store(embedding_function) -> VectorStoreManager:
+    """Return the configured vector store backend (VECTOR_BACKEND=chroma|numpy)"""
+    if VECTOR_BACKEND == "numpy":
+        from vector_index import NumpyIndexManager
+        return NumpyIndexManager(VECTOR_INDEX_PATH, embedding_function)
+    return ChromaDBManager(CHROMA_PATH, embedding_function)
+
+def refresh_vector_index():
+    """Rebuild the NumPy index and invalidate cached retrievals after the Chroma collection changed
+
+    The corpus version is bumped only once the new snapshot is published, so
+    a query that still reads the old index cannot store its results under
+    the new version.
+    """
+    from retrieval_cache import bump_corpus_version
+
+    try:
+        if VECTOR_BACKEND == "numpy":
+            from vector_index import build_index_from_chroma
+            build_index_from_chroma()
+    except Exception as e:
+        logger.error(f"Error rebuilding vector index: {e}")
+    finally:
+        bump_corpus_version()
+
 # ====================== Core RAG Functions ======================
 def get_similarity_search(query_text: str, embedding_function, top_k: int = 5,
                          selected_documents: Optional[List[str]] = None,
@@ -283,7 +442,7 @@ def get_similarity_search(query_text: str, embedding_function, top_k: int = 5,
     """Enhanced similarity search with keyword reranking"""
     start_time = time.time()
     
-    db_manager = ChromaDBManager(CHROMA_PATH, embedding_function)
+    db_manager = get_vector_store(embedding_function)
     results = db_manager.search_with_filters(
         query_text, 
         top_k, 
@@ -294,13 +453,58 @@ def get_similarity_search(query_text: str, embedding_function, top_k: int = 5,
     logger.info(f"Similarity search took {time.time() - start_time:.2f} seconds")
     return results
 
-def query_rag(query_text: str, num_questions: int = 1, embedding_function=None, 
-              model=None, selected_documents: Optional[List[str]] = None,
-              target_learning_outcome: Optional[str] = None) -> Dict[str, Any]:
-    """Main RAG query function with keyword-aware retrieval"""
-    
+def _retrieve_context(query_text: str, embedding_function=None,
+                      selected_documents: Optional[List[str]] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> Tuple[str, List[Tuple[Document, float]]]:
+    """Keyword extraction, similarity search and threshold filtering, cached per corpus version"""
+    from retrieval_cache import retrieval_cache
+
+    cache_key = retrieval_cache.key(query_text, selected_documents) if RETRIEVAL_CACHE_ENABLED else None
+    if cache_key is not None:
+        cached = retrieval_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Retrieval cache hit for keyword: {cached[0]}")
+            return cached
+
     if embedding_function is None:
+        from get_embedding_function import get_embedding_function
         embedding_function = get_embedding_function()
+
+    main_keyword = extract_primary_keyword(query_text)
+    logger.info(f"Primary keyword extracted: {main_keyword}")
+    check_cancelled(cancel_token, "retrieval")
+    
+    results = get_similarity_search(
+        query_text, 
+        embedding_function, 
+        top_k=10, 
+        selected_documents=selected_documents,
+        keyword=main_keyword
+    )
+    
+    SIMILARITY_THRESHOLD = 0.65 
+    filtered_results = [
+        (doc, score) for doc, score in results 
+        if score > SIMILARITY_THRESHOLD
+    ]
+
+    if cache_key is not None:
+        retrieval_cache.put(cache_key, main_keyword, filtered_results)
+    return main_keyword, filtered_results
+
+def query_rag(query_text: str, num_questions: int = 1, embedding_function=None, 
+              model=None, selected_documents: Optional[List[str]] = None,
+              target_learning_outcome: Optional[str] = None,
+              use_cache: bool = True, cancel_token: Optional[CancellationToken] = None,
+              on_partial: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+              retrieved: Optional[Tuple[str, List[Tuple[Document, float]]]] = None) -> Dict[str, Any]:
+    """Main RAG query function with keyword-aware retrieval
+
+    on_partial receives the complete questions parsed so far while the
+    response streams in; cancel_token stops the generation between steps.
+    retrieved is a (keyword, results) pair from _retrieve_context when the
+    caller already ran retrieval.
+    """
     
     if model is None:
         model = GeminiLLM(api_key=GEMINI_API_KEY, model_name=GEMINI_MODEL, timeout=120)
@@ -308,26 +512,17 @@ def query_rag(query_text: str, num_questions: int = 1, embedding_function=None,
     try:
         start_time = time.time()
         
-        main_keyword = extract_primary_keyword(query_text)
-        logger.info(f"Primary keyword extracted: {main_keyword}")
-        
-        results = get_similarity_search(
-            query_text, 
-            embedding_function, 
-            top_k=10, 
-            selected_documents=selected_documents,
-            keyword=main_keyword
-        )
-        
-        SIMILARITY_THRESHOLD = 0.65 
-        filtered_results = [
-            (doc, score) for doc, score in results 
-            if score > SIMILARITY_THRESHOLD
-        ]
+        check_cancelled(cancel_token, "retrieval")
+        if retrieved is None:
+            retrieved = _retrieve_context(query_text, embedding_function, selected_documents, cancel_token)
+        main_keyword, filtered_results = retrieved
+        check_cancelled(cancel_token, "before_llm")
         
         if not filtered_results:
             logger.warning("No relevant context found, using direct generation")
-            return direct_llm_questions(query_text, num_questions, target_learning_outcome)
+            return direct_llm_questions(query_text, num_questions, target_learning_outcome,
+                                        use_cache=use_cache, cancel_token=cancel_token,
+                                        on_partial=on_partial)
             
         context_text = "\n\n---\n\n".join([doc.page_content for doc, _ in filtered_results])
         
@@ -341,23 +536,32 @@ def query_rag(query_text: str, num_questions: int = 1, embedding_function=None,
             context_text, 
             num_questions, 
             model,
-            prompt_template_str=keyword_aware_prompt
+            prompt_template_str=keyword_aware_prompt,
+            use_cache=use_cache,
+            cancel_token=cancel_token,
+            on_partial=on_partial
         )
         
         logger.info(f"Total RAG query took {time.time() - start_time:.2f} seconds")
+        check_cancelled(cancel_token, "post_processing")
         
         json_output = JSONParser.parse_json_from_llm_response(response_text)
         _enhance_metadata(json_output, selected_documents, filtered_results)
+        _mark_llm_cache(json_output, model)
         _log_rag_quality(query_text, json_output, filtered_results)  
         
         return json_output
     
+    except GenerationCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error in RAG query: {e}")
         return _create_error_response(str(e), selected_documents)
 
 def direct_llm_questions(query_text: str, num_questions: int = 1, 
-                        target_learning_outcome: Optional[str] = None) -> Dict[str, Any]:
+                        target_learning_outcome: Optional[str] = None,
+                        use_cache: bool = True, cancel_token: Optional[CancellationToken] = None,
+                        on_partial: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
     """Generate questions directly from LLM with keyword focus"""
     try:
         start_time = time.time()
@@ -374,29 +578,39 @@ def direct_llm_questions(query_text: str, num_questions: int = 1,
             )
         )
 
+        from langchain.prompts import ChatPromptTemplate
         prompt_template = ChatPromptTemplate.from_template(prompt_template_str)
         enhanced_prompt = prompt_template.format(
             query_text=query_text, 
             num_questions=num_questions
         ) + "\n\nIMPORTANT: Please ensure your response is complete and valid JSON."
         
-        response_text = model.invoke(enhanced_prompt, num_questions=num_questions)
+        response_text = model.invoke(enhanced_prompt, num_questions=num_questions, use_cache=use_cache,
+                                     cancel_token=cancel_token, on_text=_partial_reporter(on_partial))
         
         logger.info(f"Direct LLM generation took {time.time() - start_time:.2f} seconds")
+        check_cancelled(cancel_token, "post_processing")
         
-        return JSONParser.parse_json_from_llm_response(response_text)
+        json_output = JSONParser.parse_json_from_llm_response(response_text)
+        _mark_llm_cache(json_output, model)
+        return json_output
     
+    except GenerationCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error generating direct questions: {e}")
         return _create_error_response(f"Error in making the question: {str(e)}")
         
 def _generate_llm_response(context_text: str, num_questions: int, model: GeminiLLM, 
                           prompt_template_str: str = None, 
-                          target_learning_outcome: Optional[str] = None) -> str:
+                          target_learning_outcome: Optional[str] = None,
+                          use_cache: bool = True, cancel_token: Optional[CancellationToken] = None,
+                          on_partial: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> str:
     """Generate LLM response with context and custom prompt"""
     if not prompt_template_str:
         prompt_template_str = get_prompt_template(num_questions, target_learning_outcome)
         
+    from langchain.prompts import ChatPromptTemplate
     prompt_template = ChatPromptTemplate.from_template(prompt_template_str)
     
     enhanced_prompt = prompt_template.format(
@@ -404,7 +618,8 @@ def _generate_llm_response(context_text: str, num_questions: int, model: GeminiL
         num_questions=num_questions
     ) + "\n\nIMPORTANT: Please ensure your response is complete and valid JSON."
 
-    return model.invoke(enhanced_prompt, num_questions=num_questions)
+    return model.invoke(enhanced_prompt, num_questions=num_questions, use_cache=use_cache,
+                        cancel_token=cancel_token, on_text=_partial_reporter(on_partial))
 
 def get_available_documents() -> List[str]:
     """Get list of available document sources"""
@@ -412,6 +627,7 @@ def get_available_documents() -> List[str]:
         if not os.path.exists(CHROMA_PATH):
             return []
 
+        from get_embedding_function import get_embedding_function
         db_manager = ChromaDBManager(CHROMA_PATH, get_embedding_function())
         items = db_manager.db.get(include=["metadatas"])
         
@@ -432,14 +648,31 @@ def reset_chroma_db() -> bool:
             shutil.rmtree(CHROMA_PATH)
             logger.info(f"Deleted corrupted ChromaDB at {CHROMA_PATH}")
         
+        from get_embedding_function import get_embedding_function
         ChromaDBManager(CHROMA_PATH, get_embedding_function())
         logger.info("Created new ChromaDB database")
+
+        from retrieval_cache import bump_corpus_version
+        bump_corpus_version()
         return True
     except Exception as e:
         logger.error(f"Error resetting ChromaDB: {e}")
         return False
 
 # ====================== Helper Functions ======================
+def _partial_reporter(on_partial: Optional[Callable[[List[Dict[str, Any]]], None]]) -> Optional[Callable[[str], None]]:
+    """Turn streamed response text into on_partial calls whenever a new question completes"""
+    if on_partial is None:
+        return None
+    reported = [0]
+
+    def on_text(text: str):
+        questions = JSONParser.parse_partial_questions(text)
+        if len(questions) > reported[0]:
+            reported[0] = len(questions)
+            on_partial(questions)
+    return on_text
+
 def _log_rag_quality(query_text: str, output: Dict[str, Any], 
                     context_results: List[Tuple[Document, float]]):
     """Log RAG quality metrics for continuous improvement"""
@@ -467,6 +700,15 @@ def _log_rag_quality(query_text: str, output: Dict[str, Any],
     except Exception as e:
         logger.error(f"Error logging RAG quality: {e}")
 
+def _mark_llm_cache(json_output: Dict[str, Any], model: GeminiLLM):
+    """Flag cached completions in metadata and keep unparseable ones out of the cache"""
+    if not isinstance(json_output, dict):
+        return
+    metadata = json_output.setdefault("metadata", {})
+    if metadata.get("status") == "error":
+        model.discard_last_completion()
+    metadata["cache_hit"] = model.last_cache_hit
+
 def _create_error_response(error_message: str, selected_documents: Optional[List[str]] = None) -> Dict[str, Any]:
     """Create error response"""
     return {
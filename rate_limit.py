@@ -0,0 +1,180 @@
+"""
+In-memory rate limiting and concurrency quotas for expensive endpoints.
+
+Each client (signed-in user, otherwise the caller's IP) gets a token bucket
+and a cap on requests in flight, sized by tier: admin (role_id 1), user or
+anonymous. Limits are per worker process; with N workers a client can get
+up to N times the configured rate.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request, status
+
+from auth import CurrentUser
+from var import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_ADMIN_PER_MINUTE,
+    RATE_LIMIT_ADMIN_CONCURRENCY,
+    RATE_LIMIT_USER_PER_MINUTE,
+    RATE_LIMIT_USER_CONCURRENCY,
+    RATE_LIMIT_ANON_PER_MINUTE,
+    RATE_LIMIT_ANON_CONCURRENCY,
+    RATE_LIMIT_MAX_CLIENTS,
+    RATE_LIMIT_TRUST_FORWARDED,
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    per_minute: float
+    concurrency: int
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.per_minute / 60.0
+
+TIERS = {
+    "admin": Tier("admin", RATE_LIMIT_ADMIN_PER_MINUTE, RATE_LIMIT_ADMIN_CONCURRENCY),
+    "user": Tier("user", RATE_LIMIT_USER_PER_MINUTE, RATE_LIMIT_USER_CONCURRENCY),
+    "anonymous": Tier("anonymous", RATE_LIMIT_ANON_PER_MINUTE, RATE_LIMIT_ANON_CONCURRENCY),
+}
+
+class _Client:
+    __slots__ = ("tokens", "updated_at", "in_flight")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated_at = now
+        self.in_flight = 0
+
+class RateLimiter:
+    """Token bucket (capacity = one minute of requests) plus an in-flight cap per client"""
+
+    def __init__(self, name: str, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.name = name
+        self.max_clients = max(1, max_clients)
+        self._clients: "OrderedDict[str, _Client]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = {tier: 0 for tier in TIERS}
+        self.rejected_rate = {tier: 0 for tier in TIERS}
+        self.rejected_concurrency = {tier: 0 for tier in TIERS}
+
+    def _client(self, key: str, tier: Tier, now: float) -> _Client:
+        client = self._clients.get(key)
+        if client is None:
+            client = _Client(tier.per_minute, now)
+            self._clients[key] = client
+            self._prune()
+        else:
+            elapsed = now - client.updated_at
+            client.tokens = min(tier.per_minute, client.tokens + elapsed * tier.refill_per_second)
+            client.updated_at = now
+        self._clients.move_to_end(key)
+        return client
+
+    def _prune(self):
+        # Drop the least recently seen idle clients; a dropped client starts
+        # again with a full bucket, which only errs on the generous side
+        while len(self._clients) > self.max_clients:
+            for key, client in self._clients.items():
+                if client.in_flight == 0:
+                    del self._clients[key]
+                    break
+            else:
+                return
+
+    def acquire(self, key: str, tier: Tier, cost: float = 1.0):
+        """Take `cost` tokens and one in-flight slot, or raise 429 with Retry-After"""
+        now = time.monotonic()
+        with self._lock:
+            client = self._client(key, tier, now)
+            if client.in_flight >= tier.concurrency:
+                self.rejected_concurrency[tier.name] += 1
+                retry_after, detail = 1, "Too many generations in progress, wait for one to finish"
+            elif client.tokens < cost:
+                self.rejected_rate[tier.name] += 1
+                retry_after = math.ceil((cost - client.tokens) / tier.refill_per_second) if tier.refill_per_second else 60
+                detail = "Rate limit exceeded, please retry later"
+            else:
+                client.tokens -= cost
+                client.in_flight += 1
+                self.allowed[tier.name] += 1
+                return
+
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(max(1, retry_after))},
+        )
+
+    def release(self, key: str, refund: float = 0.0):
+        """Free the in-flight slot; refund gives back tokens of a request that never ran"""
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                if client.in_flight > 0:
+                    client.in_flight -= 1
+                # Capped at the bucket size on the client's next refill
+                client.tokens += refund
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": RATE_LIMIT_ENABLED,
+                "tiers": {
+                    name: {"per_minute": tier.per_minute, "concurrency": tier.concurrency}
+                    for name, tier in TIERS.items()
+                },
+                "clients": len(self._clients),
+                "in_flight": sum(client.in_flight for client in self._clients.values()),
+                "allowed": dict(self.allowed),
+                "rejected_rate": dict(self.rejected_rate),
+                "rejected_concurrency": dict(self.rejected_concurrency),
+            }
+
+generation_limiter = RateLimiter("generation")
+
+def client_identity(request: Request, user: Optional[CurrentUser]):
+    """(bucket key, tier) for the caller"""
+    if user is not None:
+        return f"user:{user.user_id}", TIERS["admin" if user.role_id == 1 else "user"]
+
+    host = request.client.host if request.client else "unknown"
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            host = forwarded.split(",")[0].strip()
+    return f"ip:{host}", TIERS["anonymous"]
+
+def acquire_generation_slot(request: Request, user: Optional[CurrentUser],
+                            cost: float = 1.0) -> Optional[Callable[..., None]]:
+    """Take a generation slot for the caller, or raise 429
+
+    Call it after the request has passed its own checks, so rejected requests
+    cost nothing. cost is capped at a full bucket. Returns
+    release(refund=False), or None when rate limiting is disabled;
+    refund=True also gives the tokens back. Only the first call to release
+    frees the slot, so every path that may end the request can call it.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+
+    key, tier = client_identity(request, user)
+    cost = min(cost, tier.per_minute)
+    generation_limiter.acquire(key, tier, cost)
+
+    released = threading.Lock()
+
+    def release(refund: bool = False):
+        if released.acquire(blocking=False):
+            generation_limiter.release(key, cost if refund else 0.0)
+    return release
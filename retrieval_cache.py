@@ -0,0 +1,121 @@
+"""
+In-process cache of retrieval results for query_rag.
+
+Entries are keyed on (normalized query, selected documents, corpus version).
+The corpus version lives in a small file that every ingest or delete bumps,
+so all workers see the change on their next lookup: old entries simply stop
+matching and age out of the LRU, nothing has to be flushed.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from var import RETRIEVAL_CACHE_ENABLED, RETRIEVAL_CACHE_SIZE, CORPUS_VERSION_PATH, VECTOR_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# ====================== Corpus version ======================
+def get_corpus_version(path: str = CORPUS_VERSION_PATH) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def bump_corpus_version(path: str = CORPUS_VERSION_PATH) -> int:
+    """Advance the corpus version after the vector store changed
+
+    Uses the wall clock (never going backwards from the stored value), so two
+    workers bumping at the same time both end up past the old version without
+    needing a file lock.
+    """
+    version = max(get_corpus_version(path) + 1, time.time_ns())
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Could not bump corpus version at {path}: {e}")
+    return version
+
+def corpus_cache_token(path: str = CORPUS_VERSION_PATH) -> str:
+    """Corpus version to key cached results on, taken before searching
+
+    With the numpy backend it also names the snapshot this process has
+    mapped: workers re-read the CURRENT pointer at most once a second, so
+    right after a bump a worker may still search the old snapshot and must
+    not cache those results as the new version.
+    """
+    token = str(get_corpus_version(path))
+    if VECTOR_BACKEND == "numpy":
+        from vector_index import get_snapshot_reader
+        reader = get_snapshot_reader()
+        reader.get()
+        token = f"{token}:{reader.version}"
+    return token
+
+# ====================== Cache ======================
+def normalize_query(query_text: str) -> str:
+    return " ".join((query_text or "").lower().split())
+
+class RetrievalCache:
+    """LRU of (keyword, filtered results) per query, documents and corpus version"""
+
+    def __init__(self, max_size: int = RETRIEVAL_CACHE_SIZE, version_path: str = CORPUS_VERSION_PATH):
+        self.max_size = max(1, max_size)
+        self.version_path = version_path
+        self._entries: "OrderedDict[tuple, Tuple[str, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, query_text: str, selected_documents: Optional[List[str]]) -> tuple:
+        documents = tuple(sorted(set(selected_documents))) if selected_documents else ()
+        return normalize_query(query_text), documents, corpus_cache_token(self.version_path)
+
+    def get(self, key: tuple) -> Optional[Tuple[str, list]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        keyword, results = entry
+        return keyword, list(results)
+
+    def put(self, key: tuple, keyword: str, results: list):
+        with self._lock:
+            self._entries[key] = (keyword, list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": RETRIEVAL_CACHE_ENABLED,
+                "corpus_version": get_corpus_version(self.version_path),
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+retrieval_cache = RetrievalCache()
@@ -1,4 +1,5 @@
 from .users_router import router as users_router
 from .tags_router import router as tags_router
 from .packages_router import router as packages_router
-from .rag_router import router as rag_router, questions_router
\ No newline at end of file
+from .rag_router import router as rag_router, questions_router
+from .health_router import router as health_router
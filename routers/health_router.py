@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+
+from cancellation import cancellation_stats
+from database import pool_stats
+from generation_jobs import job_manager
+from auth import CurrentUser, get_current_active_user, password_pool, user_cache
+from llm_cache import get_llm_cache
+from rate_limit import generation_limiter
+from retrieval_cache import retrieval_cache
+from semantic_cache import semantic_cache
+from warmup import is_ready, readiness
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+@router.get("/ready")
+async def get_readiness():
+    """Report whether retrieval is warm (503 while the warm-up is still running)"""
+    state = readiness()
+    if not is_ready():
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=state)
+    return state
+
+@router.get("/metrics")
+async def get_metrics(
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Runtime metrics for tuning (admin only)"""
+    if current_user.role_id != 1:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required to view metrics"
+        )
+
+    from get_embedding_function import get_embedding_function
+
+    metrics = {
+        "auth_user_cache": user_cache.stats(),
+        "password_hashing": password_pool.stats(),
+        "database_pool": pool_stats(),
+        "retrieval_cache": retrieval_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "generation_rate_limit": generation_limiter.stats(),
+        "generation_jobs": job_manager.stats(),
+        "generation_cancellation": cancellation_stats.stats(),
+    }
+    embedding_function = get_embedding_function()
+    if hasattr(embedding_function, "stats"):
+        try:
+            metrics["query_embedding_batcher"] = embedding_function.stats()
+        except Exception as e:
+            metrics["query_embedding_batcher"] = {"error": str(e)}
+
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        metrics["llm_cache"] = llm_cache.stats()
+
+    return metrics
@@ -1,73 +1,229 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import csv
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Literal, Optional
 
-from database import get_db
+from database import get_async_db
 import models
 import schemas
-from auth import get_current_active_user
+import package_io
+from search_index import is_search_available, search_questions
+from question_index import find_saved_duplicates, sync_user_questions
+from auth import get_current_active_user, CurrentUser
 
 router = APIRouter(prefix="/packages", tags=["Packages"])
 
+def _package_query(user_id: int):
+    """Packages owned by the user with tags and questions eagerly loaded"""
+    return select(models.Package).where(
+        models.Package.user_id == user_id
+    ).options(
+        selectinload(models.Package.tags),
+        selectinload(models.Package.questions),
+    )
+
+async def _get_package(db: AsyncSession, package_id: int, user_id: int):
+    return await db.scalar(
+        _package_query(user_id).where(models.Package.id == package_id).execution_options(populate_existing=True)
+    )
+
+def _paginate(stmt, cursor: Optional[int], limit: int):
+    """Keyset page ordered by package id: rows after ``cursor``"""
+    if cursor is not None:
+        stmt = stmt.where(models.Package.id > cursor)
+    return stmt.order_by(models.Package.id).limit(limit)
+
+def _set_next_cursor(response: Response, package_ids: List[int], limit: int):
+    if len(package_ids) == limit:
+        response.headers["X-Next-Cursor"] = str(package_ids[-1])
+
+def _diff_questions(existing: List[models.QA], incoming: List[schemas.QACreate], package_id: int):
+    """Split the submitted questions into rows to insert, update and delete
+
+    Items whose id belongs to this package update that row (only if the text
+    changed); items without a known id are inserted; existing rows that are
+    not submitted any more are deleted.
+    """
+    current = {qa.id: qa for qa in existing}
+    inserts, updates, seen = [], [], set()
+
+    for item in incoming:
+        row = current.get(item.id) if item.id not in seen else None
+        if row is None:
+            inserts.append({"package_id": package_id, "question": item.question, "answer": item.answer})
+            continue
+        seen.add(item.id)
+        if row.question != item.question or row.answer != item.answer:
+            updates.append({"id": row.id, "question": item.question, "answer": item.answer})
+
+    deletes = [qa_id for qa_id in current if qa_id not in seen]
+    return inserts, updates, deletes
+
+async def _get_owned_tags(db: AsyncSession, tag_ids: List[int], user_id: int):
+    return (await db.scalars(select(models.Tag).where(
+        models.Tag.tag_id.in_(tag_ids),
+        models.Tag.user_id == user_id
+    ))).all()
+
 @router.post("/", response_model=schemas.PackageResponse)
 async def create_package(
     package: schemas.PackageCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     db_package = models.Package(
         package_name=package.package_name,
-        user_id=current_user.user_id 
+        user_id=current_user.user_id,
+        tags=[],
+        questions=[],
     )
-    db.add(db_package)
-    db.commit()
-    db.refresh(db_package)
 
     # Handle tags
     if package.tag_ids:
-        tags = db.query(models.Tag).filter(
-            models.Tag.tag_id.in_(package.tag_ids),
-            models.Tag.user_id == current_user.user_id 
-        ).all()
-        db_package.tags = tags
+        db_package.tags = list(await _get_owned_tags(db, package.tag_ids, current_user.user_id))
     
     # Handle questions
     if package.questions:
-        db_questions = [
+        db_package.questions = [
             models.QA(
-                package_id=db_package.id,
                 question=q.question,
                 answer=q.answer
             ) for q in package.questions
         ]
-        db.add_all(db_questions)
 
-    db.commit()
-    db.refresh(db_package)
+    db.add(db_package)
+    await db.commit()
+
+    duplicates = await run_in_threadpool(
+        find_saved_duplicates,
+        current_user.user_id,
+        {i: q.question for i, q in enumerate(package.questions or [])},
+        db_package.id,
+    )
+    background_tasks.add_task(sync_user_questions, current_user.user_id, [db_package.id])
+
+    db_package = await _get_package(db, db_package.id, current_user.user_id)
+    db_package.duplicates = duplicates
     return db_package
 
 @router.get("/", response_model=List[schemas.PackageResponse])
 async def get_packages(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    response: Response,
+    cursor: Optional[int] = Query(None, description="Last package id of the previous page (X-Next-Cursor)"),
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
-    packages = db.query(models.Package).filter(
-        models.Package.user_id == current_user.user_id
-    ).offset(skip).limit(limit).all()
+    packages = (await db.scalars(
+        _paginate(_package_query(current_user.user_id), cursor, limit)
+    )).all()
+    _set_next_cursor(response, [package.id for package in packages], limit)
     return packages
 
+@router.get("/summary", response_model=List[schemas.PackageSummaryResponse])
+async def get_package_summaries(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="Last package id of the previous page (X-Next-Cursor)"),
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Package list with question counts instead of full QA bodies"""
+    question_count = select(func.count(models.QA.id)).where(
+        models.QA.package_id == models.Package.id
+    ).scalar_subquery()
+
+    stmt = select(models.Package, question_count).where(
+        models.Package.user_id == current_user.user_id
+    ).options(selectinload(models.Package.tags))
+    rows = (await db.execute(_paginate(stmt, cursor, limit))).all()
+
+    _set_next_cursor(response, [package.id for package, _ in rows], limit)
+    return [
+        {
+            "id": package.id,
+            "package_name": package.package_name,
+            "user_id": package.user_id,
+            "tags": package.tags,
+            "question_count": count,
+        }
+        for package, count in rows
+    ]
+
+@router.get("/search", response_model=List[schemas.QASearchResult])
+async def search_packages(
+    q: str = Query(..., min_length=1, description="Words to find in saved questions and answers"),
+    tag_ids: List[int] = Query([], description="Only packages with any of these tags"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Full-text search over your saved questions, ranked with highlighted matches"""
+    if not is_search_available():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Full-text search index is not available"
+        )
+    if not q.strip():
+        return []
+
+    return await search_questions(db, current_user.user_id, q, tag_ids, limit, offset)
+
+@router.get("/export")
+async def export_packages(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    package_ids: List[int] = Query([], description="Packages to export (all of yours if empty)"),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Stream packages as NDJSON or CSV, one row per question"""
+    rows = package_io.export_rows(current_user.user_id, package_ids)
+    if format == "csv":
+        body, media_type = package_io.csv_chunks(rows), "text/csv"
+    else:
+        body, media_type = package_io.ndjson_chunks(rows), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="packages.{format}"'},
+    )
+
+@router.post("/import")
+async def import_packages(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Import an NDJSON or CSV export; bad rows are reported and skipped"""
+    if format is None:
+        format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+
+    importer = package_io.PackageImporter(db, current_user.user_id)
+    try:
+        async for line, row in package_io.parse_upload_rows(file.file, format):
+            await importer.add(line, row)
+    except (UnicodeDecodeError, csv.Error) as e:
+        importer.report_error(None, f"Could not read the rest of the file: {e}")
+    await importer.flush()
+
+    background_tasks.add_task(sync_user_questions, current_user.user_id)
+    return importer.result()
+
 @router.get("/{package_id}", response_model=schemas.PackageResponse)
 async def get_package(
     package_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
-    db_package = db.query(models.Package).filter(
-        models.Package.id == package_id,
-        models.Package.user_id == current_user.user_id 
-    ).first()
+    db_package = await _get_package(db, package_id, current_user.user_id)
     
     if not db_package:
         raise HTTPException(status_code=404, detail="Package not found")
@@ -78,13 +234,11 @@ async def get_package(
 async def update_package(
     package_id: int,
     package: schemas.PackageCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
-    db_package = db.query(models.Package).filter(
-        models.Package.id == package_id,
-        models.Package.user_id == current_user.user_id
-    ).first()
+    db_package = await _get_package(db, package_id, current_user.user_id)
     
     if not db_package:
         raise HTTPException(status_code=404, detail="Package not found")
@@ -93,43 +247,80 @@ async def update_package(
 
     # Update tags (verify ownership)
     if package.tag_ids:
-        tags = db.query(models.Tag).filter(
-            models.Tag.tag_id.in_(package.tag_ids),
-            models.Tag.user_id == current_user.user_id
-        ).all()
-        db_package.tags = tags
+        db_package.tags = list(await _get_owned_tags(db, package.tag_ids, current_user.user_id))
     else:
         db_package.tags.clear()
 
-    # Update questions
-    db.query(models.QA).filter(models.QA.package_id == package_id).delete()
-    if package.questions:
-        db_questions = [
-            models.QA(package_id=package_id, question=q.question, answer=q.answer)
-            for q in package.questions
-        ]
-        db.add_all(db_questions)
+    # Update questions: apply only the changed rows as bulk statements
+    inserts, updates, deletes = _diff_questions(db_package.questions, package.questions or [], package_id)
+    if deletes:
+        await db.execute(delete(models.QA).where(models.QA.id.in_(deletes)))
+    if updates:
+        await db.execute(update(models.QA), updates)
+    if inserts:
+        await db.execute(insert(models.QA), inserts)
+
+    await db.commit()
+
+    # Unchanged questions were checked when they were first saved
+    changed = {item["question"] for item in inserts + updates}
+    duplicates = await run_in_threadpool(
+        find_saved_duplicates,
+        current_user.user_id,
+        {i: q.question for i, q in enumerate(package.questions or []) if q.question in changed},
+        package_id,
+    )
+    if changed or deletes:
+        background_tasks.add_task(sync_user_questions, current_user.user_id, [package_id])
 
-    db.commit()
-    db.refresh(db_package)
+    db_package = await _get_package(db, package_id, current_user.user_id)
+    db_package.duplicates = duplicates
     return db_package
 
+@router.patch("/{package_id}/questions/{qa_id}", response_model=schemas.QAResponse)
+async def update_question(
+    package_id: int,
+    qa_id: int,
+    qa_update: schemas.QAUpdate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    db_question = await db.scalar(
+        select(models.QA).join(models.Package).where(
+            models.QA.id == qa_id,
+            models.QA.package_id == package_id,
+            models.Package.user_id == current_user.user_id
+        )
+    )
+
+    if not db_question:
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    if qa_update.question is not None:
+        db_question.question = qa_update.question
+    if qa_update.answer is not None:
+        db_question.answer = qa_update.answer
+
+    await db.commit()
+    background_tasks.add_task(sync_user_questions, current_user.user_id, [package_id])
+    return db_question
+
 @router.delete("/{package_id}")
 async def delete_package(
     package_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
-    db_package = db.query(models.Package).filter(
-        models.Package.id == package_id,
-        models.Package.user_id == current_user.user_id
-    ).first()
+    db_package = await _get_package(db, package_id, current_user.user_id)
     
     if not db_package:
         raise HTTPException(status_code=404, detail="Package not found")
 
-    db.query(models.QA).filter(models.QA.package_id == package_id).delete()
-    db.delete(db_package)
-    db.commit()
+    # questions are loaded, so the delete-orphan cascade removes them with the package
+    await db.delete(db_package)
+    await db.commit()
+    background_tasks.add_task(sync_user_questions, current_user.user_id, [package_id])
 
     return {"detail": "Package deleted successfully"}
\ No newline at end of file
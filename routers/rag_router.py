@@ -1,38 +1,49 @@
+import asyncio
+import json
 import os
-from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, HTTPException, Depends, status
-from fastapi.responses import JSONResponse, FileResponse 
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketState
 from typing import List, Optional
 import shutil
 import time
 
-from langchain_chroma import Chroma
-
-from database import get_db
-import models
+from database import get_db, AsyncSessionLocal
 import schemas
-from auth import get_current_active_user
+from auth import get_current_active_user, get_current_user, get_optional_current_user, CurrentUser
 
-from utils import (
-    query_rag,
-    get_embedding_function,
-    process_documents,
+from rag_core import (
+    get_available_documents,
+    refresh_vector_index,
 )
-
-from rag_core import (direct_llm_questions, get_available_documents)
-from schemas import QueryRequest
+from schemas import BatchQueryRequest, QueryRequest
+from cancellation import CancellationToken, GenerationCancelled, run_until_disconnected
+from generation_jobs import FINISHED, job_manager, run_batch, run_generation
+from rate_limit import acquire_generation_slot
 
 from var import (
     DATA_PATH,
-    CHROMA_PATH
+    CHROMA_PATH,
+    BATCH_MAX_TOPICS,
 )
 
 router = APIRouter(prefix="/database", tags=["RAG"])
 
 questions_router = APIRouter(prefix="/questions", tags=["Question Generation"])
 
+def _open_chroma():
+    """Open the Chroma collection, importing langchain_chroma on first use"""
+    from langchain_chroma import Chroma
+    from get_embedding_function import get_embedding_function
+    return Chroma(
+        persist_directory=CHROMA_PATH,
+        embedding_function=get_embedding_function()
+    )
+
 @router.get("/documents")
 async def get_database_documents(
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     start_time = time.time()
     try:
@@ -53,17 +64,14 @@ async def get_database_documents(
 
 @router.get("/document-count")
 async def get_document_count(
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     start_time = time.time()
     try:
         if not os.path.exists(CHROMA_PATH):
             return {"document_count": 0}
 
-        db = Chroma(
-            persist_directory=CHROMA_PATH,
-            embedding_function=get_embedding_function()
-        )
+        db = _open_chroma()
 
         items = db.get() 
 
@@ -84,7 +92,7 @@ async def get_document_count(
 async def upload_documents(
     background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
 
     if current_user.role_id != 1:
@@ -93,6 +101,8 @@ async def upload_documents(
             detail="You do not have permission to upload documents."
         )
 
+    from utils import process_documents
+
     start_time = time.time()
     uploaded_files = []
     try:
@@ -124,7 +134,7 @@ async def upload_documents(
 @router.delete("/source/{source_filename}")
 async def delete_documents_by_source(
     source_filename: str,
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     if current_user.role_id != 1:
         raise HTTPException(
@@ -136,10 +146,7 @@ async def delete_documents_by_source(
         if not os.path.exists(CHROMA_PATH):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Database does not exist")
 
-        db = Chroma(
-            persist_directory=CHROMA_PATH,
-            embedding_function=get_embedding_function()
-        )
+        db = _open_chroma()
 
         items = db.get(include=["metadatas"]) 
 
@@ -155,6 +162,7 @@ async def delete_documents_by_source(
             )
 
         db.delete(ids=ids_to_delete)
+        await run_in_threadpool(refresh_vector_index)
         
         file_path = os.path.join(DATA_PATH, source_filename)
         file_deleted = False
@@ -219,23 +227,126 @@ async def get_file_preview(filename: str):
         )
 
 @questions_router.post("/generate")
-async def generate_questions(request: QueryRequest):
+async def generate_questions(
+    request: QueryRequest,
+    http_request: Request,
+    current_user: Optional[CurrentUser] = Depends(get_optional_current_user)
+):
+    if request.exclude_existing and current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sign in to exclude questions already in your bank",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    release = acquire_generation_slot(http_request, current_user)
     try:
-        if request.use_rag:
-            result = query_rag(
-                request.query_text, 
-                request.num_questions,
-                selected_documents=getattr(request, 'selected_documents', None),
-                target_learning_outcome=getattr(request, 'target_learning_outcome', None)
-            )
-            return {"result": result, "method": "rag"}
-        else:
-            result = direct_llm_questions(
-                request.query_text, 
-                request.num_questions,
-                target_learning_outcome=getattr(request, 'target_learning_outcome', None)
-            )
-            return {"result": result, "method": "llm"}
+        result, method = await run_until_disconnected(
+            http_request, run_generation, request, current_user.user_id if current_user else None
+        )
+        return {"result": result, "method": method}
+    except GenerationCancelled:
+        # Nobody is left to read the response
+        return JSONResponse(status_code=499, content={"error": "Client disconnected"})
+    except Exception as e:
+        error_msg = f"Error generating questions: {str(e)}"
+        print(error_msg)
+        return JSONResponse(
+            status_code=500,
+            content={"error": error_msg}
+        )
+    finally:
+        if release is not None:
+            release()
+
+class _SlotStreamingResponse(StreamingResponse):
+    """StreamingResponse that frees the generation slot however the response ends
+
+    The body generator's finally does not run when the generator was never
+    started, e.g. when the client left before the first chunk was sent.
+    """
+
+    def __init__(self, content, release=None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.release is not None:
+                self.release()
+
+async def _stream_batch(requests: List[QueryRequest], user_id: Optional[int], release=None):
+    """NDJSON lines: one "result" per topic as it finishes, then a "summary" line"""
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+    token = CancellationToken()
+    on_result = lambda item: loop.call_soon_threadsafe(results.put_nowait, item)
+    work = asyncio.ensure_future(run_in_threadpool(run_batch, requests, user_id, token, on_result))
+    try:
+        for _ in range(len(requests)):
+            next_result = asyncio.ensure_future(results.get())
+            await asyncio.wait({next_result, work}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_result.done():
+                next_result.cancel()
+                break
+            yield json.dumps({"type": "result", **next_result.result()}, ensure_ascii=False) + "\n"
+
+        try:
+            _, metadata = await work
+            yield json.dumps({"type": "summary", **metadata}) + "\n"
+        except Exception as e:
+            print(f"Error in batch generation: {str(e)}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+    finally:
+        if not work.done():
+            # Client went away mid-stream
+            token.cancel("client disconnected")
+        if release is not None:
+            release()
+
+@questions_router.post("/batch")
+async def generate_questions_batch(
+    batch: BatchQueryRequest,
+    http_request: Request,
+    current_user: Optional[CurrentUser] = Depends(get_optional_current_user)
+):
+    """Generate questions for many topics in one request
+
+    Topics share one embedding pass and run concurrently; with ``stream``
+    the response is NDJSON with each topic's result as soon as it is ready.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No topics given")
+    if len(batch.requests) > BATCH_MAX_TOPICS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_TOPICS} topics per batch"
+        )
+    if current_user is None and any(request.exclude_existing for request in batch.requests):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sign in to exclude questions already in your bank",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # A batch costs one token per topic, capped at a full bucket
+    release = acquire_generation_slot(http_request, current_user, cost=len(batch.requests))
+
+    user_id = current_user.user_id if current_user else None
+    if batch.stream:
+        return _SlotStreamingResponse(
+            _stream_batch(batch.requests, user_id, release),
+            release=release,
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        results, metadata = await run_until_disconnected(http_request, run_batch, batch.requests, user_id)
+        return {"results": results, "metadata": metadata}
+    except GenerationCancelled:
+        return JSONResponse(status_code=499, content={"error": "Client disconnected"})
     except Exception as e:
         error_msg = f"Error generating questions: {str(e)}"
         print(error_msg)
@@ -243,20 +354,116 @@ async def generate_questions(request: QueryRequest):
             status_code=500,
             content={"error": error_msg}
         )
+    finally:
+        if release is not None:
+            release()
+
+def _get_job(job_id: str, current_user: Optional[CurrentUser]):
+    """Job visible to the caller; other users' jobs look like missing ones"""
+    job = job_manager.get(job_id)
+    if job is None or (job.user_id is not None and (current_user is None or current_user.user_id != job.user_id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@questions_router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job(
+    request: QueryRequest,
+    http_request: Request,
+    current_user: Optional[CurrentUser] = Depends(get_optional_current_user)
+):
+    """Start a generation in the background and return its id right away"""
+    if request.exclude_existing and current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sign in to exclude questions already in your bank",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # The quota slot is held until the job finishes, not just for this request
+    release = acquire_generation_slot(http_request, current_user)
+    try:
+        job = job_manager.submit(request, current_user.user_id if current_user else None, release)
+    except Exception:
+        # Queue full: the job never ran, so its token is given back too
+        if release is not None:
+            release(refund=True)
+        raise
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/questions/jobs/{job.id}",
+        "websocket_url": f"/questions/jobs/{job.id}/ws",
+    }
+
+@questions_router.get("/jobs/{job_id}")
+async def get_generation_job(
+    job_id: str,
+    current_user: Optional[CurrentUser] = Depends(get_optional_current_user)
+):
+    return _get_job(job_id, current_user).to_dict()
+
+@questions_router.delete("/jobs/{job_id}")
+async def cancel_generation_job(
+    job_id: str,
+    current_user: Optional[CurrentUser] = Depends(get_optional_current_user)
+):
+    """Cancel a queued or running job; the Gemini stream stops at the next chunk"""
+    job = _get_job(job_id, current_user)
+    if not job.finished:
+        job_manager.cancel(job)
+    return job.to_dict()
+
+@questions_router.websocket("/jobs/{job_id}/ws")
+async def generation_job_updates(websocket: WebSocket, job_id: str, token: Optional[str] = None):
+    """Push job events: a snapshot, then "status", "partial" and a final "result" message
+
+    Jobs of signed-in users require the same user's access token as the
+    ``token`` query parameter.
+    """
+    current_user = None
+    if token:
+        try:
+            async with AsyncSessionLocal() as db:
+                current_user = await get_current_user(token, db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+    try:
+        job = _get_job(job_id, current_user)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue, snapshot = job.subscribe()
+    try:
+        await websocket.send_json({"type": "snapshot", **snapshot})
+        if snapshot["status"] in FINISHED:
+            return
+        while True:
+            event = await queue.get()
+            await websocket.send_json(event)
+            if event["type"] == "result":
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        job.unsubscribe(queue)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
 
 @router.get("/document-info")
 async def get_document_info(
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """Get detailed information about documents in the database"""
     try:
         if not os.path.exists(CHROMA_PATH):
             return {"documents": [], "total_chunks": 0}
 
-        db = Chroma(
-            persist_directory=CHROMA_PATH,
-            embedding_function=get_embedding_function()
-        )
+        db = _open_chroma()
 
         items = db.get(include=["metadatas"])
         
@@ -1,24 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from database import get_db
+from database import get_async_db
 import models
 import schemas
-from auth import get_current_active_user  
+from auth import get_current_active_user, CurrentUser
 
 router = APIRouter(prefix="/tags", tags=["Tags"])
 
 @router.post("/", response_model=schemas.TagResponse)
 async def create_tag(
     tag: schemas.TagCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user) 
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user) 
 ):
-    db_tag = db.query(models.Tag).filter(
+    db_tag = await db.scalar(select(models.Tag).where(
         models.Tag.tag_name == tag.tag_name,
         models.Tag.user_id == current_user.user_id  
-    ).first()
+    ))
     
     if db_tag:
         raise HTTPException(
@@ -31,32 +32,32 @@ async def create_tag(
         user_id=current_user.user_id 
     )
     db.add(db_tag)
-    db.commit()
-    db.refresh(db_tag)
+    await db.commit()
+    await db.refresh(db_tag)
     return db_tag
 
 @router.get("/", response_model=List[schemas.TagResponse])
 async def get_tags(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user) 
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user) 
 ):
-    return db.query(models.Tag).filter(
+    return (await db.scalars(select(models.Tag).where(
         models.Tag.user_id == current_user.user_id
-    ).all()
+    ))).all()
 
 
 @router.put("/{tag_id}", response_model=schemas.TagResponse)
 async def update_tag(
     tag_id: int,
     tag_update: schemas.TagUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
 
-    tag = db.query(models.Tag).filter(
+    tag = await db.scalar(select(models.Tag).where(
         models.Tag.tag_id == tag_id,
         models.Tag.user_id == current_user.user_id
-    ).first()
+    ))
     
     if not tag:
         raise HTTPException(
@@ -64,11 +65,11 @@ async def update_tag(
             detail="Tag not found or not owned by you"
         )
     
-    existing_tag = db.query(models.Tag).filter(
+    existing_tag = await db.scalar(select(models.Tag).where(
         models.Tag.tag_name == tag_update.tag_name,
         models.Tag.user_id == current_user.user_id,
         models.Tag.tag_id != tag_id
-    ).first()
+    ))
     
     if existing_tag:
         raise HTTPException(
@@ -77,20 +78,20 @@ async def update_tag(
         )
     
     tag.tag_name = tag_update.tag_name
-    db.commit()
-    db.refresh(tag)
+    await db.commit()
+    await db.refresh(tag)
     return tag
 
 @router.delete("/{tag_id}")
 async def delete_tag(
     tag_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user) 
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user) 
 ):
-    tag = db.query(models.Tag).filter(
+    tag = await db.scalar(select(models.Tag).where(
         models.Tag.tag_id == tag_id,
         models.Tag.user_id == current_user.user_id  
-    ).first()
+    ))
     
     if not tag:
         raise HTTPException(
@@ -98,6 +99,6 @@ async def delete_tag(
             detail="Tag not found or not owned by you"
         )
     
-    db.delete(tag)
-    db.commit()
+    await db.delete(tag)
+    await db.commit()
     return {"message": "Tag deleted successfully"}
\ No newline at end of file
@@ -1,25 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Union
 from passlib.context import CryptContext 
-from database import get_db
+from database import get_async_db
 import models
 import schemas
 from datetime import timedelta
 
 from auth import (
-    get_password_hash, 
-    verify_password, 
+    get_password_hash_async, 
+    verify_password_async, 
     create_access_token, 
-    get_current_active_user
+    get_current_active_user,
+    user_cache,
+    CurrentUser
 )
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def is_admin(user: models.User) -> bool:
+def is_admin(user: Union[models.User, CurrentUser]) -> bool:
     """Check if the user has admin role (role_id=1)"""
     return user.role_id == 1
 
@@ -27,7 +30,7 @@ def is_seeded_admin(user: models.User) -> bool:
     """Check if the user is a seeded admin user"""
     return user.is_seeded and is_admin(user)
 
-def admin_required(current_user: models.User = Depends(get_current_active_user)):
+async def admin_required(current_user: CurrentUser = Depends(get_current_active_user)):
     """Dependency to check if the current user is an admin"""
     if not is_admin(current_user):
         raise HTTPException(
@@ -39,8 +42,8 @@ def admin_required(current_user: models.User = Depends(get_current_active_user))
 @router.post("/register", response_model=schemas.UserResponse)
 async def create_user(
     user: schemas.UserCreate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     if not is_admin(current_user):
         raise HTTPException(
@@ -48,11 +51,11 @@ async def create_user(
             detail="Only administrators can register new users"
         )
     
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = models.User(
         email=user.email, 
         password=hashed_password, 
@@ -61,17 +64,17 @@ async def create_user(
         is_seeded=False  
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/public/register", response_model=schemas.UserResponse)
-async def public_register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def public_register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_role_id = 2
     
     db_user = models.User(
@@ -82,22 +85,33 @@ async def public_register(user: schemas.UserCreate, db: Session = Depends(get_db
         is_seeded=False 
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/login", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+    user = await db.scalar(select(models.User).where(models.User.email == form_data.username))
+    if user:
+        valid, new_hash = await verify_password_async(
+            form_data.password, user.password, busy_detail="Too many concurrent sign-ins, please retry"
+        )
+    else:
+        valid, new_hash = False, None
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if new_hash:
+        # Stored hash predates the configured BCRYPT_ROUNDS, upgrade it in place
+        user.password = new_hash
+        await db.commit()
     
     access_token = create_access_token(
         data={"sub": user.email}, 
@@ -121,7 +135,7 @@ async def login_for_access_token(
 
 @router.get("/me", response_model=schemas.UserResponse)
 async def read_users_me(
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     return {
         "user_id": current_user.user_id,
@@ -135,8 +149,8 @@ async def read_users_me(
 @router.get("/{user_id}", response_model=schemas.UserResponse)
 async def get_user(
     user_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     if not is_admin(current_user) and current_user.user_id != user_id:
         raise HTTPException(
@@ -144,7 +158,7 @@ async def get_user(
             detail="Not authorized to view this user's information"
         )
     
-    db_user = db.query(models.User).get(user_id)
+    db_user = await db.get(models.User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -162,8 +176,8 @@ async def get_user(
 async def update_user(
     user_id: int, 
     user_update: schemas.UserUpdate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     if current_user.user_id != user_id and not is_admin(current_user):
         raise HTTPException(
@@ -171,10 +185,12 @@ async def update_user(
             detail="Not authorized to update this user"
         )
     
-    db_user = db.query(models.User).get(user_id)
+    db_user = await db.get(models.User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    previous_email = db_user.email
+
     if user_update.role_id is not None:
         if not is_admin(current_user):
             raise HTTPException(
@@ -195,10 +211,10 @@ async def update_user(
                 detail="Cannot change email of seeded system user"
             )
         
-        existing_user = db.query(models.User).filter(
+        existing_user = await db.scalar(select(models.User).where(
             models.User.email == user_update.email,
             models.User.user_id != user_id
-        ).first()
+        ))
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         db_user.email = user_update.email
@@ -208,10 +224,11 @@ async def update_user(
     if user_update.role_id is not None:
         db_user.role_id = user_update.role_id
     if user_update.password is not None:
-        db_user.password = get_password_hash(user_update.password)
+        db_user.password = await get_password_hash_async(user_update.password)
     
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    user_cache.invalidate(previous_email, db_user.email)
     
     result = {
         "user_id": db_user.user_id,
@@ -227,8 +244,8 @@ async def update_user(
 async def update_password(
     user_id: int,
     password_update: schemas.PasswordUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
 
     if user_id != current_user.user_id and not is_admin(current_user):
@@ -237,28 +254,30 @@ async def update_password(
             detail="You can only update your own password"
         )
     
-    db_user = db.query(models.User).get(user_id)
+    db_user = await db.get(models.User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
     if user_id == current_user.user_id or not is_admin(current_user):
-        if not verify_password(password_update.current_password, db_user.password):
+        valid, _ = await verify_password_async(password_update.current_password, db_user.password)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
             )
     
-    hashed_password = get_password_hash(password_update.new_password)
+    hashed_password = await get_password_hash_async(password_update.new_password)
     db_user.password = hashed_password
-    db.commit()
+    await db.commit()
+    user_cache.invalidate(db_user.email)
     
     return {"message": "Password updated successfully"}
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
     if not is_admin(current_user) and current_user.user_id != user_id:
@@ -267,7 +286,7 @@ async def delete_user(
             detail="Not authorized to delete this user"
         )
     
-    db_user = db.query(models.User).get(user_id)
+    db_user = await db.get(models.User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -278,12 +297,14 @@ async def delete_user(
         )
     
     if is_admin(db_user):
-        non_seeded_admin_count = db.query(models.User).filter(
+        non_seeded_admin_count = await db.scalar(select(func.count()).select_from(models.User).where(
             models.User.role_id == 1,
             models.User.is_seeded == False
-        ).count()
+        ))
         
-        total_admin_count = db.query(models.User).filter(models.User.role_id == 1).count()
+        total_admin_count = await db.scalar(
+            select(func.count()).select_from(models.User).where(models.User.role_id == 1)
+        )
         
         if total_admin_count <= 1:
             raise HTTPException(
@@ -298,13 +319,14 @@ async def delete_user(
             )
     
     try:
-        db.delete(db_user)
-        db.commit()
+        await db.delete(db_user)
+        await db.commit()
+        user_cache.invalidate(db_user.email)
         
         return {"message": "User and all related data deleted successfully"}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting user: {str(e)}"
@@ -314,8 +336,8 @@ async def delete_user(
 async def get_users(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     if not is_admin(current_user):
         raise HTTPException(
@@ -323,7 +345,9 @@ async def get_users(
             detail="Admin privileges required to view all users"
         )
     
-    users = db.query(models.User).offset(skip).limit(limit).all()
+    users = (await db.scalars(
+        select(models.User).order_by(models.User.user_id).offset(skip).limit(limit)
+    )).all()
     result = []
     for user in users:
         result.append({
@@ -338,10 +362,10 @@ async def get_users(
 
 @router.get("/roles/")
 async def get_roles(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
-    roles = db.query(models.Role).all()
+    roles = (await db.scalars(select(models.Role))).all()
     return [{
         "role_id": int(role.role_id),  
         "role_name": role.role_name
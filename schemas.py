@@ -2,9 +2,14 @@ from pydantic import BaseModel
 from typing import List, Dict, Optional
 
 class QACreate(BaseModel):
+    id: Optional[int] = None
     question: str
     answer: str
 
+class QAUpdate(BaseModel):
+    question: Optional[str] = None
+    answer: Optional[str] = None
+
 class QAResponse(BaseModel):
     id: int
     package_id: int
@@ -69,22 +74,52 @@ class PackageCreate(BaseModel):
     questions: Optional[List[QACreate]] = []
     tag_ids: List[int] = []
 
+class DuplicateQuestion(BaseModel):
+    position: int
+    question: str
+    duplicate_of: int
+    package_id: int
+    similarity: float
+
 class PackageResponse(BaseModel):
     id: int
     package_name: str
     questions: Optional[List["QAResponse"]] = []
     user_id: int
     tags: List[TagResponse] = []
+    duplicates: List[DuplicateQuestion] = []
 
     class Config:
         orm_mode = True
 
+class PackageSummaryResponse(BaseModel):
+    id: int
+    package_name: str
+    user_id: int
+    tags: List[TagResponse] = []
+    question_count: int = 0
+
+    class Config:
+        orm_mode = True
+
+class QASearchResult(BaseModel):
+    id: int
+    package_id: int
+    package_name: str
+    question: str
+    answer: str
+    rank: float
+    question_highlight: str
+    answer_highlight: str
+
 class QueryRequest(BaseModel):
     query_text: str
     num_questions: int = 1
     use_rag: bool = True
     selected_documents: Optional[List[str]] = None
     target_learning_outcome: Optional[str] = None 
+    exclude_existing: bool = False
+    bypass_cache: bool = False
     
     class Config:
         json_schema_extra = {
@@ -95,4 +130,8 @@ class QueryRequest(BaseModel):
                 "selected_documents": ["document1.pdf", "document2.pdf"],
                 "target_learning_outcome": "Pemahaman konseptual"
             }
-        }
\ No newline at end of file
+        }
+
+class BatchQueryRequest(BaseModel):
+    requests: List[QueryRequest]
+    stream: bool = False
@@ -0,0 +1,153 @@
+"""
+Full-text index over saved questions and answers (qa.question, qa.answer).
+
+PostgreSQL: a GIN expression index on to_tsvector(SEARCH_TS_CONFIG, ...),
+maintained by Postgres itself; queries use websearch_to_tsquery, ts_rank_cd
+and ts_headline.
+
+SQLite (local dev): an external-content FTS5 table kept in sync with qa by
+insert/update/delete triggers; queries use MATCH, bm25 and highlight.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from var import SEARCH_TS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+if not re.fullmatch(r"[a-z_]+", SEARCH_TS_CONFIG):
+    raise ValueError(f"Invalid SEARCH_TS_CONFIG: {SEARCH_TS_CONFIG!r}")
+
+# Inlined (not bound) so the query expression matches the index expression
+_TS_DOCUMENT = (
+    f"to_tsvector('{SEARCH_TS_CONFIG}'::regconfig, "
+    "coalesce(qa.question, '') || ' ' || coalesce(qa.answer, ''))"
+)
+
+_POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_qa_fulltext ON qa USING GIN ({_TS_DOCUMENT})",
+]
+
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS qa_fts USING fts5(
+        question, answer, content='qa', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS qa_fts_ai AFTER INSERT ON qa BEGIN
+        INSERT INTO qa_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS qa_fts_ad AFTER DELETE ON qa BEGIN
+        INSERT INTO qa_fts(qa_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS qa_fts_au AFTER UPDATE ON qa BEGIN
+        INSERT INTO qa_fts(qa_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+        INSERT INTO qa_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END""",
+]
+
+_search_available = False
+
+def ensure_search_index(engine):
+    """Create the full-text index for the engine's dialect if it is missing"""
+    global _search_available
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "postgresql":
+                for statement in _POSTGRES_DDL:
+                    conn.exec_driver_sql(statement)
+            elif dialect == "sqlite":
+                exists = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'qa_fts'"
+                ).first()
+                for statement in _SQLITE_DDL:
+                    conn.exec_driver_sql(statement)
+                if not exists:
+                    # Index the questions saved before the FTS table existed
+                    conn.exec_driver_sql("INSERT INTO qa_fts(qa_fts) VALUES ('rebuild')")
+            else:
+                logger.warning(f"Full-text search is not supported on {dialect}")
+                return
+        _search_available = True
+    except Exception as e:
+        logger.error(f"Could not create the full-text search index: {e}")
+
+def is_search_available() -> bool:
+    return _search_available
+
+def _fts5_query(query: str) -> str:
+    """Quote each term so user input cannot use FTS5 syntax; prefix-match the last one"""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def _tag_filter(tag_ids: Optional[List[int]]) -> str:
+    if not tag_ids:
+        return ""
+    return """
+        AND EXISTS (
+            SELECT 1 FROM package_tags pt
+            WHERE pt.package_id = p.id AND pt.tag_id IN :tag_ids
+        )"""
+
+async def search_questions(
+    db: AsyncSession,
+    user_id: int,
+    query: str,
+    tag_ids: Optional[List[int]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Ranked matches among the user's saved questions, best first"""
+    params: Dict[str, Any] = {"user_id": user_id, "limit": limit, "offset": offset}
+    if tag_ids:
+        params["tag_ids"] = tag_ids
+
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        params["query"] = query
+        headline_options = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, HighlightAll=true"
+        sql = f"""
+            SELECT qa.id, qa.package_id, p.package_name, qa.question, qa.answer,
+                   ts_rank_cd({_TS_DOCUMENT}, q.query) AS rank,
+                   ts_headline('{SEARCH_TS_CONFIG}'::regconfig, qa.question, q.query, '{headline_options}') AS question_highlight,
+                   ts_headline('{SEARCH_TS_CONFIG}'::regconfig, qa.answer, q.query, '{headline_options}') AS answer_highlight
+            FROM websearch_to_tsquery('{SEARCH_TS_CONFIG}'::regconfig, :query) AS q(query)
+            JOIN qa ON {_TS_DOCUMENT} @@ q.query
+            JOIN packages p ON p.id = qa.package_id
+            WHERE p.user_id = :user_id{_tag_filter(tag_ids)}
+            ORDER BY rank DESC, qa.id
+            LIMIT :limit OFFSET :offset
+        """
+    elif dialect == "sqlite":
+        params["query"] = _fts5_query(query)
+        sql = f"""
+            SELECT qa.id, qa.package_id, p.package_name, qa.question, qa.answer,
+                   -bm25(qa_fts) AS rank,
+                   highlight(qa_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}') AS question_highlight,
+                   highlight(qa_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}') AS answer_highlight
+            FROM qa_fts
+            JOIN qa ON qa.id = qa_fts.rowid
+            JOIN packages p ON p.id = qa.package_id
+            WHERE qa_fts MATCH :query AND p.user_id = :user_id{_tag_filter(tag_ids)}
+            ORDER BY bm25(qa_fts), qa.id
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        raise RuntimeError(f"Full-text search is not supported on {dialect}")
+
+    statement = text(sql)
+    if tag_ids:
+        statement = statement.bindparams(bindparam("tag_ids", expanding=True))
+
+    rows = await db.execute(statement, params)
+    return [dict(row._mapping) for row in rows]
@@ -0,0 +1,183 @@
+"""
+Semantic response cache for /questions/generate.
+
+Stores the embedding of each generated query next to its result. A new
+query reuses the result of the nearest cached query when their cosine
+similarity reaches SEMANTIC_CACHE_THRESHOLD and the generation options
+(method, num_questions, learning outcome, document filter, corpus version)
+are identical, so paraphrases such as "proses fotosintesis" and
+"fotosintesis pada tumbuhan" share one Gemini round trip.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from var import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_SIZE,
+    SEMANTIC_CACHE_TTL_SECONDS,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_SAMPLES = 1000
+
+def unit_vector(embedding: List[float]) -> np.ndarray:
+    """Unit-length float32 copy of an embedding"""
+    import numpy as np
+
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def options_key(use_rag: bool, num_questions: int, target_learning_outcome: Optional[str],
+                selected_documents: Optional[List[str]], corpus_token: Optional[str] = None) -> int:
+    """Hash of everything besides the query text that changes the generated result
+
+    corpus_token must be taken before retrieval ran; it defaults to the
+    current one.
+    """
+    parts = [
+        "rag" if use_rag else "llm",
+        str(num_questions),
+        " ".join((target_learning_outcome or "").lower().split()),
+        "\x1f".join(sorted(set(selected_documents or []))),
+    ]
+    if use_rag:
+        if corpus_token is None:
+            from retrieval_cache import corpus_cache_token
+            corpus_token = corpus_cache_token()
+        parts.append(corpus_token)
+    return zlib.crc32("\x1e".join(parts).encode("utf-8"))
+
+class SemanticResponseCache:
+    """Fixed-capacity matrix of query embeddings with the result cached for each row
+
+    A lookup is one matrix-vector product over all rows; rows with other
+    options or past their TTL are masked out. When full, the least recently
+    used row is overwritten. The arrays are allocated on the first store.
+    """
+
+    def __init__(self, capacity: int = SEMANTIC_CACHE_SIZE, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS):
+        self.capacity = max(1, capacity)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.size = 0
+        self.vectors: Optional[np.ndarray] = None
+        self.options: Optional[np.ndarray] = None
+        self.created_at: Optional[np.ndarray] = None
+        self.last_used: Optional[np.ndarray] = None
+        self.queries: List[str] = [""] * self.capacity
+        self.results: List[Any] = [None] * self.capacity
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._hit_similarities: deque = deque(maxlen=SIMILARITY_SAMPLES)
+        self._miss_similarities: deque = deque(maxlen=SIMILARITY_SAMPLES)
+
+    def _live_scores(self, vector: np.ndarray, options: int, now: float) -> np.ndarray:
+        scores = self.vectors[:self.size] @ vector
+        stale = self.options[:self.size] != options
+        if self.ttl_seconds > 0:
+            stale |= now - self.created_at[:self.size] > self.ttl_seconds
+        scores[stale] = -1.0
+        return scores
+
+    def lookup(self, vector: np.ndarray, options: int) -> Optional[Dict[str, Any]]:
+        """Copy of the closest cached result at or above the threshold, or None"""
+        now = time.time()
+        with self._lock:
+            best_row, best_score = -1, -1.0
+            if self.size and self.vectors.shape[1] == vector.shape[0]:
+                scores = self._live_scores(vector, options, now)
+                best_row = int(scores.argmax())
+                best_score = float(scores[best_row])
+
+            if best_row < 0 or best_score < self.threshold:
+                self.misses += 1
+                if best_score >= 0:
+                    self._miss_similarities.append(best_score)
+                return None
+
+            self.hits += 1
+            self._hit_similarities.append(best_score)
+            self.last_used[best_row] = now
+            result = copy.deepcopy(self.results[best_row])
+            matched_query = self.queries[best_row]
+
+        metadata = result.setdefault("metadata", {})
+        metadata["semantic_cache"] = {"similarity": round(best_score, 4), "matched_query": matched_query}
+        return result
+
+    def store(self, query_text: str, vector: np.ndarray, options: int, result: Dict[str, Any]):
+        import numpy as np
+
+        now = time.time()
+        with self._lock:
+            if self.vectors is None or self.vectors.shape[1] != vector.shape[0]:
+                self.vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+                self.options = np.zeros(self.capacity, dtype=np.int64)
+                self.created_at = np.zeros(self.capacity, dtype=np.float64)
+                self.last_used = np.zeros(self.capacity, dtype=np.float64)
+                self.size = 0
+
+            if self.size < self.capacity:
+                row = self.size
+                self.size += 1
+            else:
+                row = int(self.last_used.argmin())
+
+            self.vectors[row] = vector
+            self.options[row] = options
+            self.created_at[row] = now
+            self.last_used[row] = now
+            self.queries[row] = query_text
+            self.results[row] = copy.deepcopy(result)
+
+    def clear(self):
+        with self._lock:
+            self.size = 0
+            self.results = [None] * self.capacity
+
+    def stats(self) -> Dict[str, Any]:
+        def quantiles(samples) -> Optional[Dict[str, float]]:
+            if not samples:
+                return None
+            import numpy as np
+
+            values = np.fromiter(samples, dtype=np.float64)
+            p10, p50, p90 = np.percentile(values, [10, 50, 90])
+            return {"p10": round(float(p10), 4), "p50": round(float(p50), 4), "p90": round(float(p90), 4)}
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": SEMANTIC_CACHE_ENABLED,
+                "threshold": self.threshold,
+                "entries": self.size,
+                "capacity": self.capacity,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "hit_similarity": quantiles(self._hit_similarities),
+                "miss_best_similarity": quantiles(self._miss_similarities),
+            }
+
+semantic_cache = SemanticResponseCache()
+
+def is_cacheable(result: Dict[str, Any]) -> bool:
+    metadata = result.get("metadata") or {}
+    return bool(result.get("questions")) and metadata.get("status") != "error"
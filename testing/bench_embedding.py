@@ -0,0 +1,87 @@
+"""
+Benchmark throughput (chunks/s) of the CPU embedding backend.
+
+Compares the old per-50-chunk HuggingFaceEmbeddings path against CPUEmbeddings
+with different batch sizes, thread counts and the optional ONNX backend.
+
+Usage (from the repository root):
+    python testing/bench_embedding.py --chunks 2000 --threads 1 4 --batch-sizes 32 128
+    python testing/bench_embedding.py --onnx-file onnx/model_qint8_avx512_vnni.onnx
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from get_embedding_function import CPUEmbeddings, EmbeddingConfig
+from var import EMBEDDING_MODEL
+
+KATA = ("fotosintesis tumbuhan klorofil cahaya matahari energi air karbon dioksida oksigen "
+        "daun akar batang sel makhluk hidup ekosistem rantai makanan hewan manusia "
+        "kalimat paragraf puisi pantun cerita tokoh alur latar amanat bahasa").split()
+
+def buat_chunks(n: int, seed: int = 42):
+    """Generate synthetic chunks with a realistic spread of lengths (~50-512 chars)"""
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(n):
+        target = rng.randint(50, 512)
+        words = []
+        while sum(len(w) + 1 for w in words) < target:
+            words.append(rng.choice(KATA))
+        chunks.append(" ".join(words)[:target])
+    return chunks
+
+def ukur(label, embed_fn, chunks, repeat):
+    embed_fn(chunks[:8])  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embed_fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<45} {len(chunks) / best:>10.1f} chunks/s  ({best:.2f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding throughput benchmark")
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--threads", type=int, nargs="+", default=[0])
+    parser.add_argument("--onnx-file", type=str, default=None)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    chunks = buat_chunks(args.chunks)
+    print(f"Model: {EMBEDDING_MODEL}, chunks: {len(chunks)}, cpu_count: {os.cpu_count()}")
+    print("-" * 80)
+
+    if not args.skip_baseline:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        baseline = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+        def baseline_per_50(texts):
+            for i in range(0, len(texts), 50):
+                baseline.embed_documents(texts[i:i + 50])
+
+        ukur("baseline HuggingFaceEmbeddings (50/call)", baseline_per_50, chunks, args.repeat)
+
+    for threads in args.threads:
+        for batch_size in args.batch_sizes:
+            config = EmbeddingConfig(batch_size=batch_size, num_threads=threads)
+            backend = CPUEmbeddings(config)
+            ukur(f"torch batch={batch_size} threads={threads or 'default'}",
+                 backend.embed_array, chunks, args.repeat)
+
+            if args.onnx_file:
+                config = EmbeddingConfig(batch_size=batch_size, num_threads=threads,
+                                         backend="onnx", onnx_file=args.onnx_file)
+                backend = CPUEmbeddings(config)
+                ukur(f"onnx batch={batch_size} threads={threads or 'default'}",
+                     backend.embed_array, chunks, args.repeat)
+
+if __name__ == "__main__":
+    main()
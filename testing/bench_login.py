@@ -0,0 +1,91 @@
+"""
+Login storm benchmark.
+
+Fires --logins concurrent POST /users/login requests at a running server
+while a separate thread keeps calling an unrelated endpoint, then reports
+login throughput and the latency of the unrelated endpoint during the storm.
+With bcrypt on the event loop the probe p99 jumps to seconds; with the
+hashing pool it should stay close to the idle baseline.
+
+Usage (server already running, e.g. `uvicorn main:app --port 8000`):
+    python testing/bench_login.py --email admin@soalify.com --password password --logins 200 --concurrency 50
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def login(base: str, email: str, password: str) -> int:
+    body = urllib.parse.urlencode({"username": email, "password": password}).encode()
+    request = urllib.request.Request(f"{base}/users/login", data=body,
+                                     headers={"Content-Type": "application/x-www-form-urlencoded"})
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def probe(url: str, stop: threading.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        with urllib.request.urlopen(url, timeout=120) as response:
+            response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.01)
+
+def persentil(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def ukur_probe(url: str, duration: float):
+    stop = threading.Event()
+    latencies = []
+    thread = threading.Thread(target=probe, args=(url, stop, latencies))
+    thread.start()
+    time.sleep(duration)
+    stop.set()
+    thread.join()
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Login storm benchmark")
+    parser.add_argument("--base_url", type=str, default="http://127.0.0.1:8000")
+    parser.add_argument("--email", type=str, required=True)
+    parser.add_argument("--password", type=str, required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probe_path", type=str, default="/health/ready")
+    args = parser.parse_args()
+
+    probe_url = args.base_url + args.probe_path
+    idle = ukur_probe(probe_url, 2.0)
+    print(f"idle probe: p50 {statistics.median(idle):.1f} ms, p99 {persentil(idle, 0.99):.1f} ms")
+
+    stop = threading.Event()
+    storm_latencies = []
+    prober = threading.Thread(target=probe, args=(probe_url, stop, storm_latencies))
+    prober.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        codes = list(pool.map(lambda _: login(args.base_url, args.email, args.password), range(args.logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    prober.join()
+
+    ok = codes.count(200)
+    print(f"logins: {ok}/{len(codes)} ok, {codes.count(503)} rejected (503), "
+          f"{ok / elapsed:.1f} logins/s over {elapsed:.1f} s")
+    if storm_latencies:
+        print(f"probe during storm: p50 {statistics.median(storm_latencies):.1f} ms, "
+              f"p99 {persentil(storm_latencies, 0.99):.1f} ms ({len(storm_latencies)} calls)")
+
+if __name__ == "__main__":
+    main()
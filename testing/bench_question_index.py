@@ -0,0 +1,69 @@
+"""
+Latency of the saved-question duplicate check.
+
+Fills a UserQuestionIndex with random unit vectors (no model needed) and
+times find_duplicates for batches of query questions, plus the cost of
+adding new rows incrementally.
+
+Usage (from the repository root):
+    python testing/bench_question_index.py --rows 50000 --queries 1 5 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_index import UserQuestionIndex, _normalize
+
+def buat_index(rows: int, dim: int, seed: int = 42) -> UserQuestionIndex:
+    rng = np.random.default_rng(seed)
+    index = UserQuestionIndex()
+    vectors = _normalize(rng.standard_normal((rows, dim)))
+    index.add(np.arange(rows), np.arange(rows) // 100, np.zeros(rows, dtype=np.uint32), vectors)
+    return index
+
+def ukur(fn, repeat: int):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return statistics.median(durations), durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Question index benchmark")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    index = buat_index(args.rows, args.dim)
+    print(f"{index.size} rows x {args.dim} dims, {index.vectors[:index.size].nbytes / 1e6:.0f} MB")
+
+    for n in args.queries:
+        queries = index.vectors[:n].copy()
+        p50, p99 = ukur(lambda: index.find_duplicates(queries, 0.92, exclude_package_id=1), args.repeat)
+        print(f"find_duplicates x{n:<3}: p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+
+    rng = np.random.default_rng(7)
+    next_id = [args.rows]
+
+    def tambah():
+        vectors = _normalize(rng.standard_normal((10, args.dim)))
+        ids = np.arange(next_id[0], next_id[0] + 10)
+        next_id[0] += 10
+        index.add(ids, np.zeros(10, dtype=np.int64), np.zeros(10, dtype=np.uint32), vectors)
+
+    p50, p99 = ukur(tambah, args.repeat)
+    print(f"add 10 rows         : p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Track application import time and time-to-first-request.
+
+1. Imports `main` in fresh interpreters and reports the median wall time
+   plus the slowest direct imports from `python -X importtime`.
+2. Starts uvicorn, measures how long until the port answers and until
+   /health/ready returns 200, then times the first /questions/generate call.
+
+Each run is appended as one JSON line to --output so results can be compared
+across commits.
+
+Usage (from the repository root):
+    python testing/bench_startup.py --runs 5
+    WARMUP_ON_STARTUP=true python testing/bench_startup.py --generate "proses fotosintesis"
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def ukur_import(runs: int):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durations.append(time.perf_counter() - start)
+
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Direct imports of main are indented by exactly one level (two spaces)
+        if not name.startswith("   ") or name.startswith("    "):
+            continue
+        modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    return statistics.median(durations), modules[:10]
+
+def tunggu(url: str, timeout: float, expect_status: int = 200) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == expect_status:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+def ukur_first_request(port: int, query: str, timeout: float):
+    result = {}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        tunggu(f"{base}/docs", timeout)
+        result["server_up_s"] = round(time.perf_counter() - start, 3)
+        tunggu(f"{base}/health/ready", timeout)
+        result["ready_s"] = round(time.perf_counter() - start, 3)
+
+        if query:
+            body = json.dumps({"query_text": query, "num_questions": 1}).encode()
+            request = urllib.request.Request(f"{base}/questions/generate", data=body,
+                                             headers={"Content-Type": "application/json"})
+            request_start = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+            result["first_generate_s"] = round(time.perf_counter() - request_start, 3)
+            result["time_to_first_result_s"] = round(time.perf_counter() - start, 3)
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--generate", type=str, default=None,
+                        help="Query for a first /questions/generate call (needs Gemini access)")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", type=str, default=os.path.join(ROOT, "testing", "bench_startup.jsonl"))
+    args = parser.parse_args()
+
+    median_import, slowest = ukur_import(args.runs)
+    print(f"import main (median of {args.runs}): {median_import * 1000:.0f} ms")
+    for cumulative_us, name in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    server = ukur_first_request(args.port, args.generate, args.timeout)
+    for key, value in server.items():
+        print(f"{key}: {value}")
+
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "warmup_on_startup": os.getenv("WARMUP_ON_STARTUP", "false"),
+        "import_main_ms": round(median_import * 1000, 1),
+        **server,
+    }
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended results to {args.output}")
+
+if __name__ == "__main__":
+    main()
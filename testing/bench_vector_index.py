@@ -0,0 +1,91 @@
+"""
+Compare the NumPy vector index against Chroma on the current collection.
+
+For each storage dtype (and optionally HNSW) it reports recall@k against
+Chroma's own top-k, mean query latency, the memory used by the vectors
+versus a float32 matrix and the time to open the memory-mapped snapshot.
+
+Usage (from the repository root, with CHROMA_PATH populated):
+    python testing/bench_vector_index.py --queries 200 --k 30
+    python testing/bench_vector_index.py --hnsw --selected-documents buku1.pdf
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag_core import ChromaDBManager
+from get_embedding_function import get_embedding_function
+from vector_index import NumpyVectorIndex
+from var import CHROMA_PATH
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy index vs Chroma benchmark")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=30)
+    parser.add_argument("--dtypes", nargs="+", default=["float32", "float16", "int8"])
+    parser.add_argument("--hnsw", action="store_true")
+    parser.add_argument("--selected-documents", nargs="*", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    collection = ChromaDBManager(CHROMA_PATH, get_embedding_function()).db._collection
+    items = collection.get(include=["embeddings", "documents", "metadatas"])
+    ids = items["ids"]
+    matrix = np.asarray(items["embeddings"], dtype=np.float32)
+    print(f"Collection: {len(ids)} chunks, dim {matrix.shape[1]}, float32 matrix {matrix.nbytes / 1e6:.1f} MB")
+
+    # Queries: stored vectors with a little noise, so they behave like real paraphrases
+    rng = np.random.default_rng(args.seed)
+    picks = rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)
+    queries = matrix[picks] + rng.normal(0, 0.01, size=(len(picks), matrix.shape[1])).astype(np.float32)
+
+    where = None
+    if args.selected_documents:
+        sources = {m["source"] for m in items["metadatas"]
+                   if m and os.path.basename(m.get("source", "")) in args.selected_documents}
+        where = {"source": {"$in": sorted(sources)}}
+
+    start = time.perf_counter()
+    truth = []
+    for query in queries:
+        result = collection.query(query_embeddings=[query.tolist()], n_results=args.k, where=where)
+        truth.append(set(result["ids"][0]))
+    chroma_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"{'chroma':<18} recall@{args.k}=1.000  {chroma_ms:8.2f} ms/query")
+
+    variants = [(dtype, False) for dtype in args.dtypes]
+    if args.hnsw:
+        variants += [(dtype, True) for dtype in args.dtypes]
+
+    for dtype, use_hnsw in variants:
+        index = NumpyVectorIndex.build(ids, matrix, items["documents"], items["metadatas"],
+                                       dtype=dtype, use_hnsw=use_hnsw)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index")
+            index.save(path)
+            load_start = time.perf_counter()
+            index = NumpyVectorIndex.load(path)
+            load_ms = (time.perf_counter() - load_start) * 1000
+
+            start = time.perf_counter()
+            recalls = []
+            for query, expected in zip(queries, truth):
+                rows = index.search(query, args.k, args.selected_documents)
+                found = {index.ids[row] for row, _ in rows}
+                recalls.append(len(found & expected) / max(1, len(expected)))
+            numpy_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            label = f"{dtype}{'+hnsw' if use_hnsw else ''}"
+            print(f"{label:<18} recall@{args.k}={np.mean(recalls):.3f}  {numpy_ms:8.2f} ms/query  "
+                  f"vectors {index.nbytes / 1e6:.1f} MB ({index.nbytes / matrix.nbytes:.0%} of float32)  "
+                  f"cold open {load_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,28 @@
 Generator PDF Lengkap untuk Materi Bahasa Indonesia Sekolah Dasar (SD)
 Menggabungkan materi kelas 1-6, tata bahasa, dan kosakata
 menjadi satu dokumen yang komprehensif.
+
+Mode korpus sintetis (untuk benchmark ingestion dan retrieval) membuat N PDF
+dengan jumlah halaman, mata pelajaran, distribusi kosakata (Zipf) dan
+paragraf hampir-duplikat yang bisa diatur. Hasilnya deterministik untuk
+seed yang sama, dan manifest.jsonl mencatat setiap dokumen beserta letak
+paragraf duplikatnya sebagai ground truth.
+
+Penggunaan (dari root repository):
+    python testing/create_pdf.py
+    python testing/create_pdf.py --jumlah 200 --halaman 20 80 --seed 42 --output korpus_sintetis
+    python testing/create_pdf.py --jumlah 2000 --duplikat 0.15 --mutasi 0.1 --zipf 1.2 --proses 8
 """
 
+import argparse
+import json
+import os
+import random
+import time
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet
@@ -182,10 +202,207 @@ def buat_pdf_rangkuman_lengkap():
     except Exception as e:
         print(f"❌ Terjadi kesalahan saat membuat PDF: {e}")
 
-# Jalankan fungsi utama
-if __name__ == "__main__":
+# ====================== Korpus Sintetis ======================
+MATA_PELAJARAN = {
+    "bahasa_indonesia": ["kalimat", "paragraf", "puisi", "pantun", "majas", "sinonim", "antonim", "imbuhan",
+                         "dongeng", "pidato", "ejaan", "tanda baca", "kata kerja", "kata benda", "amanat"],
+    "matematika": ["pecahan", "bilangan", "perkalian", "pembagian", "bangun datar", "keliling", "luas",
+                   "volume", "sudut", "desimal", "persen", "diagram", "rata-rata", "kelipatan", "faktor"],
+    "ipa": ["fotosintesis", "ekosistem", "rantai makanan", "energi", "gaya", "magnet", "cahaya", "bunyi",
+            "sel", "organ", "pernapasan", "pencernaan", "cuaca", "tata surya", "perubahan wujud"],
+    "ips": ["kerajaan", "pahlawan", "proklamasi", "peta", "iklim", "koperasi", "pasar", "kebudayaan",
+            "suku bangsa", "sumber daya", "ekonomi", "penjajahan", "pelabuhan", "pertanian", "kota"],
+    "ppkn": ["pancasila", "musyawarah", "gotong royong", "hak", "kewajiban", "norma", "persatuan",
+             "keberagaman", "konstitusi", "warga negara", "toleransi", "lembaga negara", "hukum", "sila", "bhinneka"],
+}
+
+KATA_UMUM = ["yang", "dan", "di", "ke", "dari", "untuk", "dengan", "pada", "adalah", "dalam", "akan",
+             "dapat", "juga", "tidak", "lebih", "setiap", "siswa", "guru", "kelas", "contoh", "bagian",
+             "proses", "hasil", "cara", "waktu", "sehari-hari", "penting", "berbeda", "sama", "memahami",
+             "menjelaskan", "menggunakan", "menunjukkan", "membuat", "mengamati", "membandingkan"]
+
+POLA_KALIMAT = [
+    "{a} adalah {u1} {u2} yang {u3} dengan {b}.",
+    "Dalam pelajaran ini, siswa {u1} {a} dan {b} melalui {u2} {u3}.",
+    "Contoh {a} dapat {u1} pada {b} {u2} {u3}.",
+    "{a} berkaitan dengan {b} karena {u1} {u2} {u3} {u4}.",
+    "Guru {u1} bahwa {a} {u2} {u3} untuk {b}.",
+]
+
+SUKU_KATA = ["ba", "ca", "da", "ga", "ha", "ja", "ka", "la", "ma", "na", "pa", "ra", "sa", "ta", "wa",
+             "bi", "di", "ki", "li", "mi", "ni", "ri", "si", "ti", "bu", "du", "gu", "ku", "lu", "mu",
+             "nu", "ru", "su", "tu", "an", "ang", "ar", "al", "em", "en", "ing", "un", "ur", "ol", "es"]
+
+def buat_kosakata(ukuran: int, seed: int):
+    """Kata umum ditambah kata buatan dari suku kata sampai `ukuran` kata, urutan peringkat Zipf"""
+    rng = random.Random(seed)
+    kosakata = list(KATA_UMUM)
+    terpakai = set(kosakata)
+    while len(kosakata) < ukuran:
+        kata = "".join(rng.choice(SUKU_KATA) for _ in range(rng.randint(2, 4)))
+        if kata not in terpakai:
+            terpakai.add(kata)
+            kosakata.append(kata)
+    return kosakata[:max(ukuran, len(KATA_UMUM))]
+
+class PembuatTeks:
+    """Membuat kalimat dan paragraf dari kosakata berdistribusi Zipf dan istilah mata pelajaran"""
+
+    def __init__(self, kosakata, zipf: float, rng: random.Random):
+        self.kosakata = kosakata
+        self.bobot_kumulatif = list(accumulate(1.0 / (peringkat ** zipf) for peringkat in range(1, len(kosakata) + 1)))
+        self.rng = rng
+
+    def kata(self) -> str:
+        posisi = self.rng.random() * self.bobot_kumulatif[-1]
+        return self.kosakata[min(bisect(self.bobot_kumulatif, posisi), len(self.kosakata) - 1)]
+
+    def kalimat(self, istilah) -> str:
+        pola = self.rng.choice(POLA_KALIMAT)
+        teks = pola.format(a=self.rng.choice(istilah), b=self.rng.choice(istilah),
+                           u1=self.kata(), u2=self.kata(), u3=self.kata(), u4=self.kata())
+        return teks[0].upper() + teks[1:]
+
+    def paragraf(self, istilah, jumlah_kata: int) -> str:
+        kalimat = []
+        total = 0
+        while total < jumlah_kata:
+            baru = self.kalimat(istilah)
+            kalimat.append(baru)
+            total += len(baru.split())
+        return " ".join(kalimat)
+
+def mutasi_paragraf(teks: str, laju: float, pembuat: PembuatTeks) -> str:
+    """Salinan hampir-duplikat: sebagian kecil kata diganti kata lain dari kosakata"""
+    kata = teks.split()
+    for i in range(len(kata)):
+        if pembuat.rng.random() < laju:
+            kata[i] = pembuat.kata()
+    return " ".join(kata)
+
+def buat_bank_paragraf(jumlah: int, args) -> list:
+    """Paragraf sumber untuk hampir-duplikat, dipakai bersama oleh semua dokumen"""
+    rng = random.Random(f"{args.seed}:bank")
+    pembuat = PembuatTeks(buat_kosakata(args.kosakata, args.seed), args.zipf, rng)
+    mapel = sorted(MATA_PELAJARAN)
+    return [pembuat.paragraf(MATA_PELAJARAN[mapel[i % len(mapel)]], args.kata_per_paragraf) for i in range(jumlah)]
+
+def buat_isi_dokumen(nomor: int, args, bank: list) -> dict:
+    """Teks semua halaman satu dokumen; hanya bergantung pada (seed, nomor), jadi aman diparalelkan"""
+    rng = random.Random(f"{args.seed}:{nomor}")
+    pembuat = PembuatTeks(buat_kosakata(args.kosakata, args.seed), args.zipf, rng)
+    mapel = args.mata_pelajaran[nomor % len(args.mata_pelajaran)]
+    istilah = MATA_PELAJARAN[mapel]
+
+    halaman = []
+    duplikat = []
+    for nomor_halaman in range(rng.randint(args.halaman[0], args.halaman[1])):
+        paragraf = []
+        for nomor_paragraf in range(args.paragraf_per_halaman):
+            if bank and rng.random() < args.duplikat:
+                sumber = rng.randrange(len(bank))
+                paragraf.append(mutasi_paragraf(bank[sumber], args.mutasi, pembuat))
+                duplikat.append({"halaman": nomor_halaman + 1, "paragraf": nomor_paragraf, "bank": sumber})
+            else:
+                paragraf.append(pembuat.paragraf(istilah, args.kata_per_paragraf))
+        judul = f"{mapel.replace('_', ' ').title()}: {rng.choice(istilah).title()}"
+        halaman.append((judul, paragraf))
+
+    return {
+        "file": f"dok_{nomor:05d}_{mapel}.pdf",
+        "mata_pelajaran": mapel,
+        "halaman": halaman,
+        "duplikat": duplikat,
+    }
+
+def tulis_pdf(path: str, judul_dokumen: str, halaman: list):
+    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(path, pagesize=A4, rightMargin=inch/2, leftMargin=inch/2,
+                            topMargin=inch/2, bottomMargin=inch/2, title=judul_dokumen)
+    story = []
+    for i, (judul, paragraf) in enumerate(halaman):
+        if i:
+            story.append(PageBreak())
+        story.append(Paragraph(judul, styles['Heading2']))
+        for teks in paragraf:
+            story.append(Paragraph(teks, styles['Normal']))
+            story.append(Spacer(1, 0.1 * inch))
+    doc.build(story)
+
+def buat_satu_dokumen(nomor: int, args, bank: list) -> dict:
+    isi = buat_isi_dokumen(nomor, args, bank)
+    tulis_pdf(os.path.join(args.output, isi["file"]), isi["file"], isi["halaman"])
+    jumlah_karakter = sum(len(judul) + sum(len(p) for p in paragraf) for judul, paragraf in isi["halaman"])
+    return {
+        "file": isi["file"],
+        "mata_pelajaran": isi["mata_pelajaran"],
+        "halaman": len(isi["halaman"]),
+        "karakter": jumlah_karakter,
+        "duplikat": isi["duplikat"],
+    }
+
+def buat_korpus(args):
+    """Membuat korpus sintetis dan manifest.jsonl di args.output"""
+    os.makedirs(args.output, exist_ok=True)
+    mulai = time.time()
+    bank = buat_bank_paragraf(args.bank, args) if args.duplikat > 0 else []
+
+    manifest_path = os.path.join(args.output, "manifest.jsonl")
+    total_halaman = 0
+    total_karakter = 0
+    total_duplikat = 0
+    with open(manifest_path, "w", encoding="utf-8") as manifest, \
+         ProcessPoolExecutor(max_workers=args.proses) as executor:
+        hasil = executor.map(buat_satu_dokumen, range(args.jumlah), [args] * args.jumlah, [bank] * args.jumlah,
+                             chunksize=max(1, args.jumlah // (args.proses * 4)))
+        for i, dokumen in enumerate(hasil, start=1):
+            manifest.write(json.dumps({"seed": args.seed, **dokumen}, ensure_ascii=False) + "\n")
+            total_halaman += dokumen["halaman"]
+            total_karakter += dokumen["karakter"]
+            total_duplikat += len(dokumen["duplikat"])
+            if i % 50 == 0 or i == args.jumlah:
+                print(f"  {i}/{args.jumlah} dokumen, {total_halaman} halaman")
+
+    durasi = time.time() - mulai
+    # Perkiraan jumlah chunk dengan pengaturan default SearchConfig (512 karakter, overlap 128)
+    perkiraan_chunk = total_karakter // (512 - 128)
+    print(f"✅ {args.jumlah} PDF ({total_halaman} halaman, {total_duplikat} paragraf hampir-duplikat) "
+          f"dibuat di '{args.output}' dalam {durasi:.1f} detik")
+    print(f"📄 Perkiraan jumlah chunk saat di-ingest: ~{perkiraan_chunk:,}")
+    print(f"🗂️  Ground truth: {manifest_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator PDF rangkuman dan korpus sintetis")
+    parser.add_argument("--jumlah", type=int, default=0, help="Jumlah PDF korpus sintetis (0 = buat PDF rangkuman)")
+    parser.add_argument("--halaman", type=int, nargs=2, default=[5, 20], metavar=("MIN", "MAKS"),
+                        help="Rentang jumlah halaman per PDF")
+    parser.add_argument("--mata_pelajaran", nargs="+", default=sorted(MATA_PELAJARAN),
+                        choices=sorted(MATA_PELAJARAN))
+    parser.add_argument("--paragraf_per_halaman", type=int, default=4)
+    parser.add_argument("--kata_per_paragraf", type=int, default=80)
+    parser.add_argument("--kosakata", type=int, default=5000, help="Ukuran kosakata")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Eksponen distribusi Zipf kosakata")
+    parser.add_argument("--duplikat", type=float, default=0.05, help="Peluang sebuah paragraf hampir-duplikat")
+    parser.add_argument("--mutasi", type=float, default=0.1, help="Bagian kata yang diganti pada paragraf duplikat")
+    parser.add_argument("--bank", type=int, default=200, help="Jumlah paragraf sumber duplikat")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--proses", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--output", default="korpus_sintetis")
+    args = parser.parse_args()
+
+    if args.jumlah > 0:
+        print(f"📚 Membuat korpus sintetis: {args.jumlah} PDF, seed {args.seed}...")
+        print("=" * 60)
+        buat_korpus(args)
+        print("=" * 60)
+        return
+
     print("📚 Memulai proses pembuatan PDF Rangkuman Lengkap Bahasa Indonesia SD...")
     print("=" * 60)
     buat_pdf_rangkuman_lengkap()
     print("=" * 60)
     print("🎯 Proses selesai.")
+
+# Jalankan fungsi utama
+if __name__ == "__main__":
+    main()
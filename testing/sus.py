@@ -1,9 +1,186 @@
+"""
+Kalkulator SUS (System Usability Scale) untuk ekspor survei kecil maupun besar.
+
+Nilai yang hilang (kosong atau bukan angka) diisi nilai netral 3. Respons
+angka di luar skala 1-5 dihitung apa adanya seperti sebelumnya; dengan
+isi_di_luar_skala=True (--isi_di_luar_skala) respons itu diperlakukan
+sebagai nilai yang hilang dan juga diisi 3.
+
+Statistik dihitung dari jumlah responden per nilai skor, bukan dari semua
+skor: pada mode bertahap hanya jumlah itu (per grup) yang disimpan, jadi
+file yang lebih besar dari memori tetap bisa diringkas dengan median,
+persentil dan bootstrap yang persis sama.
+"""
+
+import argparse
+import os
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-def hitung_skor_sus(df):
+# ====================== Skor vektor ======================
+JUMLAH_PERTANYAAN = 10
+
+# Pertanyaan ganjil: skor - 1, pertanyaan genap: 5 - skor. Dalam bentuk
+# vektor: jumlah(bobot * respons) + 20, dengan bobot +1/-1 bergantian.
+BOBOT_PERTANYAAN = np.tile([1.0, -1.0], JUMLAH_PERTANYAAN // 2)
+KONSTANTA_SKOR = 20.0
+
+BATAS_INTERPRETASI = [80, 70, 50]
+LABEL_INTERPRETASI = ["Sangat Baik", "Baik", "Cukup/Marginal"]
+LABEL_BURUK = "Buruk"
+
+def pilih_kolom_sus(kolom, kolom_grup=None):
+    """Nama 10 kolom SUS: kolom pertama (nama/ID) dan kolom grup dilewati"""
+    kolom = list(kolom)
+    if kolom_grup is not None and kolom_grup not in kolom:
+        raise ValueError(f"Kolom grup '{kolom_grup}' tidak ditemukan. Kolom yang ada: {', '.join(map(str, kolom))}")
+    kandidat = [k for k in kolom[1:] if k != kolom_grup]
+    if len(kandidat) < JUMLAH_PERTANYAAN:
+        raise ValueError(f"Butuh {JUMLAH_PERTANYAAN} kolom SUS, hanya ditemukan {len(kandidat)}")
+    return kandidat[:JUMLAH_PERTANYAAN]
+
+def matriks_respons(data_sus, isi_di_luar_skala=False):
+    """
+    Ubah 10 kolom SUS menjadi matriks float (n x 10).
+
+    Nilai yang hilang diisi nilai netral (3); dengan isi_di_luar_skala=True
+    respons di luar 1-5 juga. Mengembalikan (matriks, jumlah sel yang diisi,
+    jumlah sel di luar skala).
+    """
+    respons = data_sus.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    kosong = np.isnan(respons)
+    di_luar_skala = ~kosong & ~np.isin(respons, (1, 2, 3, 4, 5))
+    diisi = kosong | di_luar_skala if isi_di_luar_skala else kosong
+    jumlah_diisi = int(diisi.sum())
+    if jumlah_diisi:
+        respons = np.where(diisi, 3.0, respons)
+    return respons, jumlah_diisi, int(di_luar_skala.sum())
+
+def _peringatan_respons(jumlah_diisi, jumlah_di_luar_skala, isi_di_luar_skala):
+    if jumlah_diisi:
+        print(f"Peringatan: {jumlah_diisi} nilai yang hilang{'/di luar skala' if isi_di_luar_skala else ''} "
+              "diisi dengan nilai netral (3).")
+    if jumlah_di_luar_skala and not isi_di_luar_skala:
+        print(f"Peringatan: {jumlah_di_luar_skala} respons di luar skala 1-5 dihitung apa adanya "
+              "(gunakan --isi_di_luar_skala untuk mengisinya dengan 3).")
+
+def hitung_skor_matriks(respons):
+    """Skor SUS semua responden sekaligus (satu perkalian matriks-vektor)"""
+    return (respons @ BOBOT_PERTANYAAN + KONSTANTA_SKOR) * 2.5
+
+def interpretasi_skor(skor):
+    """Interpretasi untuk array skor"""
+    skor = np.asarray(skor)
+    kondisi = [skor >= batas for batas in BATAS_INTERPRETASI]
+    return np.select(kondisi, LABEL_INTERPRETASI, default=LABEL_BURUK)
+
+# ====================== Statistik dari distribusi ======================
+# Distribusi = pandas.Series jumlah responden per nilai skor (indeks terurut).
+# Dengan respons 1-5 skor selalu kelipatan 2.5, jadi paling banyak 41 nilai.
+
+def distribusi_skor(skor):
+    """Jumlah responden per nilai skor"""
+    return pd.Series(skor).value_counts().sort_index()
+
+def gabung_distribusi(a, b):
+    """Jumlahkan dua distribusi (boleh None)"""
+    if a is None:
+        return b
+    return a.add(b, fill_value=0).astype(np.int64).sort_index()
+
+def _nilai_pada_peringkat(nilai, kumulatif, peringkat):
+    """Skor ke-`peringkat` (0-based) dari data terurut, tanpa mengurutkan data"""
+    return nilai[np.searchsorted(kumulatif, peringkat, side='right')]
+
+def kuantil_distribusi(distribusi, q):
+    """Kuantil dengan interpolasi linear, sama dengan pandas.Series.quantile"""
+    nilai = distribusi.index.to_numpy(dtype=np.float64)
+    kumulatif = np.cumsum(distribusi.to_numpy())
+    posisi = (kumulatif[-1] - 1) * np.asarray(q, dtype=np.float64)
+    bawah = np.floor(posisi)
+    nilai_bawah = _nilai_pada_peringkat(nilai, kumulatif, bawah)
+    nilai_atas = _nilai_pada_peringkat(nilai, kumulatif, np.ceil(posisi))
+    return nilai_bawah + (nilai_atas - nilai_bawah) * (posisi - bawah)
+
+def ringkas_distribusi(distribusi):
+    """Statistik SUS (tanpa skor individu) dari distribusi skor"""
+    distribusi = distribusi[distribusi > 0]
+    n = int(distribusi.sum())
+    if n == 0:
+        raise ValueError("Tidak ada responden untuk diringkas")
+
+    nilai = distribusi.index.to_numpy(dtype=np.float64)
+    jumlah = distribusi.to_numpy(dtype=np.float64)
+    rata_rata = float(jumlah @ nilai / n)
+    varians = float(jumlah @ (nilai - rata_rata) ** 2 / (n - 1)) if n > 1 else float('nan')
+    median, persentil_25, persentil_75 = kuantil_distribusi(distribusi, [0.5, 0.25, 0.75])
+
+    return {
+        'total_responden': n,
+        'skor_rata_rata': round(rata_rata, 2),
+        'skor_median': round(float(median), 2),
+        'standar_deviasi': round(float(np.sqrt(varians)), 2),
+        'skor_minimum': round(float(nilai[0]), 2),
+        'skor_maksimum': round(float(nilai[-1]), 2),
+        'persentil_25': round(float(persentil_25), 2),
+        'persentil_75': round(float(persentil_75), 2),
+        'interpretasi': str(interpretasi_skor(rata_rata)),
+    }
+
+def bootstrap_ci(distribusi, jumlah_bootstrap=2000, tingkat=0.95, seed=None):
+    """
+    Interval kepercayaan bootstrap (persentil) untuk rata-rata dan median.
+
+    Mengambil ulang n responden dengan pengembalian sama saja dengan menarik
+    jumlah per nilai skor dari distribusi multinomial, jadi semua sampel
+    bootstrap dibuat sekaligus sebagai matriks (jumlah_bootstrap x jumlah
+    nilai skor), berapa pun n.
+    """
+    distribusi = distribusi[distribusi > 0]
+    nilai = distribusi.index.to_numpy(dtype=np.float64)
+    jumlah = distribusi.to_numpy(dtype=np.int64)
+    n = int(jumlah.sum())
+    rng = np.random.default_rng(seed)
+    sampel = rng.multinomial(n, jumlah / n, size=jumlah_bootstrap)
+
+    rata_rata = sampel @ nilai / n
+
+    # Median tiap sampel: nilai pertama yang kumulatifnya melewati peringkat tengah
+    kumulatif = np.cumsum(sampel, axis=1)
+    tengah_bawah = (kumulatif > (n - 1) // 2).argmax(axis=1)
+    tengah_atas = (kumulatif > n // 2).argmax(axis=1)
+    median = (nilai[tengah_bawah] + nilai[tengah_atas]) / 2
+
+    alfa = (1 - tingkat) / 2 * 100
+    batas = [alfa, 100 - alfa]
+    ci_rata_rata = np.percentile(rata_rata, batas)
+    ci_median = np.percentile(median, batas)
+    return {
+        'tingkat_kepercayaan': tingkat,
+        'jumlah_bootstrap': jumlah_bootstrap,
+        'ci_rata_rata': (round(float(ci_rata_rata[0]), 2), round(float(ci_rata_rata[1]), 2)),
+        'ci_median': (round(float(ci_median[0]), 2), round(float(ci_median[1]), 2)),
+    }
+
+def distribusi_per_grup(skor, grup):
+    """Distribusi skor per grup sebagai Series berindeks (grup, skor)"""
+    grup = pd.Series(grup).fillna("(kosong)").astype(str).to_numpy()
+    return pd.DataFrame({'grup': grup, 'skor': skor}).value_counts().sort_index()
+
+def tabel_per_grup(distribusi_grup, jumlah_bootstrap=0, seed=None):
+    """DataFrame statistik SUS per sekolah/angkatan"""
+    baris = []
+    for i, (nama, distribusi) in enumerate(distribusi_grup.groupby(level='grup')):
+        distribusi = distribusi.droplevel('grup')
+        ringkasan = ringkas_distribusi(distribusi)
+        if jumlah_bootstrap > 0:
+            ci = bootstrap_ci(distribusi, jumlah_bootstrap, seed=None if seed is None else seed + i)
+            ringkasan['ci_rata_rata_bawah'], ringkasan['ci_rata_rata_atas'] = ci['ci_rata_rata']
+        baris.append({'grup': nama, **ringkasan})
+    return pd.DataFrame(baris)
+
+def hitung_skor_sus(df, kolom_grup=None, isi_di_luar_skala=False):
     """
     Menghitung skor SUS (System Usability Scale) dari DataFrame.
     
@@ -11,80 +188,108 @@ def hitung_skor_sus(df):
     df (pandas.DataFrame): DataFrame dengan respons kuesioner SUS
                           Kolom pertama berisi nama/ID responden
                           Kolom 2-11 berisi respons SUS (skala 1-5)
+    kolom_grup (str): Kolom sekolah/angkatan (opsional), dilewati saat
+                      memilih kolom SUS
+    isi_di_luar_skala (bool): Isi respons di luar 1-5 dengan 3, seperti
+                              nilai yang hilang
     
     Mengembalikan:
     dict: Dictionary berisi berbagai statistik SUS
     """
     
-    # Ekstrak hanya kolom SUS (tidak termasuk nama responden)
-    data_sus = df.iloc[:, 1:11]  # Asumsi 10 pertanyaan SUS
-    
-    # Bersihkan nama kolom (hapus spasi ekstra)
-    data_sus.columns = [col.strip() for col in data_sus.columns]
-    
-    # Konversi semua data ke numerik (tangani nilai string)
-    data_sus = data_sus.apply(pd.to_numeric, errors='coerce')
-    
-    # Periksa nilai yang hilang
-    if data_sus.isnull().any().any():
-        print("Peringatan: Terdeteksi nilai yang hilang. Akan diisi dengan nilai netral (3).")
-        data_sus = data_sus.fillna(3)
-    
-    # Dapatkan total responden
-    total_responden = len(data_sus)
-    
-    def hitung_skor_sus_individu(baris):
-        """Hitung skor SUS untuk satu responden"""
-        # Pertanyaan ganjil (1,3,5,7,9): skor - 1
-        skor_ganjil = baris.iloc[::2] - 1  # Pertanyaan 1,3,5,7,9
-        
-        # Pertanyaan genap (2,4,6,8,10): 5 - skor
-        skor_genap = 5 - baris.iloc[1::2]  # Pertanyaan 2,4,6,8,10
-        
-        # Jumlahkan semua skor dan kalikan dengan 2.5
-        total_skor = (skor_ganjil.sum() + skor_genap.sum()) * 2.5
-        return total_skor
-    
-    # Hitung skor SUS untuk setiap responden
-    skor_sus = data_sus.apply(hitung_skor_sus_individu, axis=1)
-    
-    # Hitung statistik
-    rata_rata_skor_sus = skor_sus.mean()
-    median_skor_sus = skor_sus.median()
-    std_skor_sus = skor_sus.std()
-    min_skor_sus = skor_sus.min()
-    max_skor_sus = skor_sus.max()
-    
-    # Hitung persentil
-    persentil_25 = skor_sus.quantile(0.25)
-    persentil_75 = skor_sus.quantile(0.75)
-    
-    # Interpretasi SUS
-    if rata_rata_skor_sus >= 80:
-        interpretasi = "Sangat Baik"
-    elif rata_rata_skor_sus >= 70:
-        interpretasi = "Baik"
-    elif rata_rata_skor_sus >= 50:
-        interpretasi = "Cukup/Marginal"
-    else:
-        interpretasi = "Buruk"
-    
-    # Buat dictionary hasil
-    hasil = {
-        'total_responden': total_responden,
-        'skor_individu': skor_sus.tolist(),
-        'skor_rata_rata': round(rata_rata_skor_sus, 2),
-        'skor_median': round(median_skor_sus, 2),
-        'standar_deviasi': round(std_skor_sus, 2),
-        'skor_minimum': round(min_skor_sus, 2),
-        'skor_maksimum': round(max_skor_sus, 2),
-        'persentil_25': round(persentil_25, 2),
-        'persentil_75': round(persentil_75, 2),
-        'interpretasi': interpretasi
-    }
+    # Ekstrak hanya kolom SUS (tidak termasuk nama responden dan kolom grup)
+    data_sus = df[pilih_kolom_sus(df.columns, kolom_grup)]
+    
+    # Konversi ke matriks numerik dan isi nilai yang hilang
+    respons, jumlah_diisi, jumlah_di_luar_skala = matriks_respons(data_sus, isi_di_luar_skala)
+    _peringatan_respons(jumlah_diisi, jumlah_di_luar_skala, isi_di_luar_skala)
+    
+    # Hitung skor SUS untuk semua responden sekaligus
+    skor_sus = pd.Series(hitung_skor_matriks(respons), index=df.index)
+    
+    # Hitung statistik dari distribusi skor
+    hasil = ringkas_distribusi(distribusi_skor(skor_sus))
+    hasil['skor_individu'] = skor_sus.tolist()
     
     return hasil, skor_sus
 
+# ====================== Pembacaan bertahap ======================
+def baca_bertahap(path, ukuran_chunk=50000):
+    """
+    Baca file survei (CSV atau Excel .xlsx) per potongan DataFrame.
+
+    Excel dibaca baris demi baris lewat openpyxl mode read_only, sehingga
+    file yang lebih besar dari memori tetap bisa diproses.
+    """
+    ekstensi = os.path.splitext(path)[1].lower()
+    if ekstensi in ('.xlsx', '.xlsm'):
+        yield from _baca_excel_bertahap(path, ukuran_chunk)
+    elif ekstensi in ('.csv', '.txt', ''):
+        yield from pd.read_csv(path, chunksize=ukuran_chunk)
+    else:
+        raise ValueError(f"Format file tidak didukung: {ekstensi}")
+
+def _baca_excel_bertahap(path, ukuran_chunk):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Membaca Excel secara bertahap membutuhkan paket 'openpyxl' (pip install openpyxl)")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        baris_baris = workbook.active.iter_rows(values_only=True)
+        header = [str(k) if k is not None else f"Kolom{i + 1}" for i, k in enumerate(next(baris_baris, ()))]
+        potongan = []
+        for baris in baris_baris:
+            potongan.append(baris)
+            if len(potongan) >= ukuran_chunk:
+                yield pd.DataFrame(potongan, columns=header)
+                potongan = []
+        if potongan:
+            yield pd.DataFrame(potongan, columns=header)
+    finally:
+        workbook.close()
+
+def analisis_bertahap(path, kolom_grup=None, ukuran_chunk=50000, file_ekspor=None, isi_di_luar_skala=False):
+    """
+    Hitung skor SUS dari file besar tanpa memuat semua baris ke memori.
+
+    Setiap potongan hanya menambah distribusi skor total dan per grup, jadi
+    memori yang dipakai tidak bergantung pada jumlah responden. Jika
+    file_ekspor diberikan, skor tiap responden ditulis per potongan.
+
+    Mengembalikan (distribusi total, distribusi per grup atau None).
+    """
+    distribusi = None
+    distribusi_grup = None
+    total_diisi = total_di_luar_skala = 0
+    kolom_sus = None
+
+    for nomor, df in enumerate(baca_bertahap(path, ukuran_chunk)):
+        df.columns = [str(k).strip() for k in df.columns]
+        if kolom_sus is None:
+            kolom_sus = pilih_kolom_sus(df.columns, kolom_grup)
+
+        respons, jumlah_diisi, jumlah_di_luar_skala = matriks_respons(df[kolom_sus], isi_di_luar_skala)
+        total_diisi += jumlah_diisi
+        total_di_luar_skala += jumlah_di_luar_skala
+        skor = hitung_skor_matriks(respons)
+        distribusi = gabung_distribusi(distribusi, distribusi_skor(skor))
+        if kolom_grup is not None:
+            distribusi_grup = gabung_distribusi(distribusi_grup, distribusi_per_grup(skor, df[kolom_grup]))
+
+        if file_ekspor:
+            df['Skor_SUS'] = skor
+            df['Interpretasi_SUS'] = interpretasi_skor(skor)
+            df.to_csv(file_ekspor, mode='w' if nomor == 0 else 'a', header=nomor == 0, index=False)
+
+    if distribusi is None:
+        raise ValueError(f"Tidak ada responden di {path}")
+    _peringatan_respons(total_diisi, total_di_luar_skala, isi_di_luar_skala)
+    if file_ekspor:
+        print(f"Hasil diekspor ke {file_ekspor}")
+    return distribusi, distribusi_grup
+
 def cetak_hasil_sus(hasil):
     """Cetak hasil SUS yang diformat"""
     print("=" * 50)
@@ -99,10 +304,23 @@ def cetak_hasil_sus(hasil):
     print(f"Persentil ke-25: {hasil['persentil_25']}")
     print(f"Persentil ke-75: {hasil['persentil_75']}")
     print(f"Interpretasi: {hasil['interpretasi']}")
+    if 'ci_rata_rata' in hasil:
+        persen = int(round(hasil['tingkat_kepercayaan'] * 100))
+        print(f"CI {persen}% Rata-rata (bootstrap {hasil['jumlah_bootstrap']}x): "
+              f"{hasil['ci_rata_rata'][0]} - {hasil['ci_rata_rata'][1]}")
+        print(f"CI {persen}% Median: {hasil['ci_median'][0]} - {hasil['ci_median'][1]}")
     print("=" * 50)
 
+def cetak_tabel_grup(tabel, kolom_grup):
+    """Cetak statistik SUS per grup"""
+    kolom = ['grup', 'total_responden', 'skor_rata_rata', 'skor_median', 'standar_deviasi', 'interpretasi']
+    kolom += [k for k in ('ci_rata_rata_bawah', 'ci_rata_rata_atas') if k in tabel.columns]
+    print(f"\nHASIL SUS PER {kolom_grup.upper()}")
+    print(tabel[kolom].rename(columns={'grup': kolom_grup}).to_string(index=False))
+
 def plot_distribusi_sus(skor_sus, hasil):
     """Buat visualisasi distribusi skor SUS"""
+    import matplotlib.pyplot as plt
     
     # Set font untuk mendukung bahasa Indonesia
     plt.rcParams['font.family'] = 'DejaVu Sans'
@@ -140,12 +358,7 @@ def plot_distribusi_sus(skor_sus, hasil):
     
     # Grafik interpretasi skor
     rentang_skor = ['Buruk\n(0-49)', 'Marginal\n(50-69)', 'Baik\n(70-79)', 'Sangat Baik\n(80-100)']
-    jumlah_rentang = [
-        sum(1 for skor in skor_sus if skor < 50),
-        sum(1 for skor in skor_sus if 50 <= skor < 70),
-        sum(1 for skor in skor_sus if 70 <= skor < 80),
-        sum(1 for skor in skor_sus if skor >= 80)
-    ]
+    jumlah_rentang = np.histogram(skor_sus, bins=[0, 50, 70, 80, np.inf])[0]
     
     warna = ['red', 'orange', 'lightgreen', 'green']
     ax4.bar(rentang_skor, jumlah_rentang, color=warna, alpha=0.7)
@@ -163,63 +376,77 @@ def ekspor_hasil_ke_csv(df, skor_sus, hasil, nama_file='hasil_sus.csv'):
     df_hasil['Skor_SUS'] = skor_sus
     
     # Tambahkan interpretasi untuk setiap skor
-    def dapatkan_interpretasi(skor):
-        if skor >= 80:
-            return "Sangat Baik"
-        elif skor >= 70:
-            return "Baik"
-        elif skor >= 50:
-            return "Cukup/Marginal"
-        else:
-            return "Buruk"
-    
-    df_hasil['Interpretasi_SUS'] = skor_sus.apply(dapatkan_interpretasi)
+    df_hasil['Interpretasi_SUS'] = interpretasi_skor(skor_sus)
     
     # Simpan ke CSV
     df_hasil.to_csv(nama_file, index=False)
     print(f"Hasil diekspor ke {nama_file}")
 
 # Contoh penggunaan dan fungsi utama
-def main():
+def buat_data_sampel():
+    """Data SUS sampel (10 pertanyaan, skala Likert 5 poin)"""
+    np.random.seed(42)  # Untuk hasil yang dapat direproduksi
+    data_sampel = {
+        'Responden': [f'R{i+1:03d}' for i in range(20)],
+    }
+    
+    # Generate respons sampel untuk 10 pertanyaan SUS
+    for q in range(1, 11):
+        if q % 2 == 1:  # Pertanyaan ganjil (pernyataan positif)
+            data_sampel[f'P{q}'] = np.random.choice([3, 4, 5], size=20, p=[0.2, 0.5, 0.3])
+        else:  # Pertanyaan genap (pernyataan negatif)
+            data_sampel[f'P{q}'] = np.random.choice([1, 2, 3], size=20, p=[0.3, 0.5, 0.2])
+    
+    return pd.DataFrame(data_sampel)
+
+def main(args=None):
     """Fungsi utama untuk mendemonstrasikan perhitungan SUS"""
+    if args is None:
+        args = argparse.Namespace(file='data_sus.csv', grup=None, bertahap=False, chunk=50000,
+                                  bootstrap=2000, seed=42, ekspor='hasil_sus.csv', tanpa_plot=False,
+                                  isi_di_luar_skala=False)
+    
+    # Mode bertahap: untuk ekspor survei besar, tidak ada skor individu di memori
+    if args.bertahap:
+        distribusi, distribusi_grup = analisis_bertahap(args.file, args.grup, args.chunk, args.ekspor,
+                                                        args.isi_di_luar_skala)
+        hasil = ringkas_distribusi(distribusi)
+        if args.bootstrap > 0:
+            hasil.update(bootstrap_ci(distribusi, args.bootstrap, seed=args.seed))
+        cetak_hasil_sus(hasil)
+        if args.grup:
+            cetak_tabel_grup(tabel_per_grup(distribusi_grup, args.bootstrap, args.seed), args.grup)
+        return hasil, None
     
-    # Contoh: Muat data dari file CSV
-    # Ganti 'file_anda.csv' dengan path file yang sebenarnya
     try:
         # Coba muat dari file CSV
-        df = pd.read_csv('data_sus.csv')  # Ganti dengan path file Anda
+        df = pd.read_csv(args.file)
+        df.columns = [str(k).strip() for k in df.columns]
         print("Data berhasil dimuat dari file CSV.")
     except FileNotFoundError:
         # Buat data sampel jika file tidak ditemukan
         print("File CSV tidak ditemukan. Membuat data sampel...")
-        
-        # Data SUS sampel (10 pertanyaan, skala Likert 5 poin)
-        np.random.seed(42)  # Untuk hasil yang dapat direproduksi
-        data_sampel = {
-            'Responden': [f'R{i+1:03d}' for i in range(20)],
-        }
-        
-        # Generate respons sampel untuk 10 pertanyaan SUS
-        for q in range(1, 11):
-            if q % 2 == 1:  # Pertanyaan ganjil (pernyataan positif)
-                data_sampel[f'P{q}'] = np.random.choice([3, 4, 5], size=20, p=[0.2, 0.5, 0.3])
-            else:  # Pertanyaan genap (pernyataan negatif)
-                data_sampel[f'P{q}'] = np.random.choice([1, 2, 3], size=20, p=[0.3, 0.5, 0.2])
-        
-        df = pd.DataFrame(data_sampel)
+        df = buat_data_sampel()
         print("Data sampel dibuat dengan 20 responden.")
     
     # Hitung skor SUS
-    hasil, skor_sus = hitung_skor_sus(df)
+    hasil, skor_sus = hitung_skor_sus(df, args.grup, args.isi_di_luar_skala)
+    if args.bootstrap > 0:
+        hasil.update(bootstrap_ci(distribusi_skor(skor_sus), args.bootstrap, seed=args.seed))
     
     # Cetak hasil
     cetak_hasil_sus(hasil)
+    if args.grup:
+        distribusi_grup = distribusi_per_grup(skor_sus.to_numpy(), df[args.grup])
+        cetak_tabel_grup(tabel_per_grup(distribusi_grup, args.bootstrap, args.seed), args.grup)
     
     # Buat visualisasi
-    plot_distribusi_sus(skor_sus, hasil)
+    if not args.tanpa_plot:
+        plot_distribusi_sus(skor_sus, hasil)
     
     # Ekspor hasil
-    ekspor_hasil_ke_csv(df, skor_sus, hasil)
+    if args.ekspor:
+        ekspor_hasil_ke_csv(df, skor_sus, hasil, args.ekspor)
     
     return hasil, skor_sus
 
@@ -245,5 +472,16 @@ if __name__ == "__main__":
     print("\nCatatan: Respons menggunakan skala 5 poin (1=Sangat Tidak Setuju, 5=Sangat Setuju)")
     print("\n" + "="*80 + "\n")
     
+    parser = argparse.ArgumentParser(description="Kalkulator SUS (System Usability Scale)")
+    parser.add_argument("--file", default="data_sus.csv", help="File survei (CSV, atau .xlsx untuk --bertahap)")
+    parser.add_argument("--grup", default=None, help="Kolom sekolah/angkatan untuk statistik per grup")
+    parser.add_argument("--bertahap", action="store_true", help="Baca file per potongan (untuk file yang lebih besar dari memori)")
+    parser.add_argument("--chunk", type=int, default=50000, help="Jumlah baris per potongan pada mode bertahap")
+    parser.add_argument("--bootstrap", type=int, default=2000, help="Jumlah sampel bootstrap untuk interval kepercayaan (0 = tidak)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed bootstrap")
+    parser.add_argument("--ekspor", default="hasil_sus.csv", help="File CSV hasil per responden (kosongkan untuk tidak mengekspor)")
+    parser.add_argument("--tanpa_plot", action="store_true", help="Lewati visualisasi")
+    parser.add_argument("--isi_di_luar_skala", action="store_true", help="Isi respons di luar skala 1-5 dengan 3, seperti nilai yang hilang")
+    
     # Jalankan perhitungan utama
-    hasil, skor_sus = main()
\ No newline at end of file
+    hasil, skor_sus = main(parser.parse_args())
\ No newline at end of file
@@ -1,9 +1,14 @@
 import argparse
+import csv
+import hashlib
 import json
 import os
 import re
 import shutil
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 import logging
 
@@ -11,8 +16,8 @@ from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFDirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from rag_core import reset_chroma_db
-from rag_core import query_rag
+from rag_core import reset_chroma_db, refresh_vector_index
+from rag_core import query_rag, direct_llm_questions
 from get_embedding_function import get_embedding_function
 from var import DATA_PATH, CHROMA_PATH
 
@@ -74,6 +79,10 @@ class DocumentProcessor:
             chunks = self._create_chunks(documents)
             if not chunks:
                 return False
+
+            content_hash = file_content_hash(file_path)
+            for chunk in chunks:
+                chunk.metadata["content_hash"] = content_hash
                 
             return self._add_to_database(chunks, filename)
             
@@ -129,14 +138,23 @@ class DocumentProcessor:
             
         return self.calculate_chunk_ids(chunks)
         
-    def _add_to_database(self, chunks: List[Document], filename: str) -> bool:
-        """Add chunks to ChromaDB in batches"""
+    def _add_to_database(self, chunks: List[Document], filename: str, refresh: bool = True,
+                         db_manager=None, existing_ids: Optional[Set[str]] = None) -> bool:
+        """Add chunks to ChromaDB in batches
+
+        Bulk ingestion passes refresh=False and refreshes the index once at the
+        end. It also passes the collection it opened and the ids already in it
+        (updated here as chunks are added), so the collection is not re-read
+        for every file.
+        """
         try:
-            from rag_core import ChromaDBManager
-            db_manager = ChromaDBManager(CHROMA_PATH, get_embedding_function())
+            if db_manager is None:
+                from rag_core import ChromaDBManager
+                db_manager = ChromaDBManager(CHROMA_PATH, get_embedding_function())
             
-            existing_items = db_manager.db.get(include=[])
-            existing_ids = set(existing_items["ids"]) if existing_items["ids"] else set()
+            if existing_ids is None:
+                existing_items = db_manager.db.get(include=[])
+                existing_ids = set(existing_items["ids"]) if existing_items["ids"] else set()
             
             new_chunks = [chunk for chunk in chunks 
                          if chunk.metadata["id"] not in existing_ids]
@@ -144,13 +162,31 @@ class DocumentProcessor:
             if not new_chunks:
                 logger.info(f"No new chunks to add from {filename}")
                 return True
-                
+
+            # Embed every new chunk in one call so the backend can bucket by length
+            # across the whole file, then write to Chroma in batches
+            embed_start = time.time()
+            embeddings = db_manager.embedding_function.embed_documents(
+                [chunk.page_content for chunk in new_chunks]
+            )
+            embed_time = time.time() - embed_start
+            logger.info(f"Embedded {len(new_chunks)} chunks in {embed_time:.2f} seconds "
+                        f"({len(new_chunks) / max(embed_time, 1e-6):.1f} chunks/s)")
+
             for i in range(0, len(new_chunks), self.config.batch_size):
                 batch = new_chunks[i:i + self.config.batch_size]
-                db_manager.db.add_documents(batch)
+                db_manager.db._collection.add(
+                    ids=[chunk.metadata["id"] for chunk in batch],
+                    embeddings=embeddings[i:i + self.config.batch_size],
+                    metadatas=[chunk.metadata for chunk in batch],
+                    documents=[chunk.page_content for chunk in batch],
+                )
+                existing_ids.update(chunk.metadata["id"] for chunk in batch)
                 logger.info(f"Added batch {i//self.config.batch_size + 1}: {len(batch)} chunks")
-            
+
             logger.info(f"Successfully added {len(new_chunks)} new chunks from {filename}")
+            if refresh:
+                refresh_vector_index()
             return True
             
         except Exception as e:
@@ -173,6 +209,14 @@ class DocumentProcessor:
             logger.error(f"Failed to delete file {filename}: {e}")
 
 # ====================== Convenience Functions ======================
+def file_content_hash(file_path: str) -> str:
+    """SHA-256 of a file's bytes, stored on its chunks as content_hash"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 def process_documents(filename: str):
     """Process documents using DocumentProcessor"""
     config = SearchConfig()
@@ -195,21 +239,377 @@ def _create_no_results_response(selected_documents: Optional[List[str]]) -> Dict
         }
     }
 
+# ====================== Bulk Ingestion ======================
+def _extract_pdf(file_path: str, config: SearchConfig) -> Dict[str, Any]:
+    """Load and chunk one PDF (runs in a worker process)"""
+    from langchain_community.document_loaders import PyPDFLoader
+
+    start_time = time.time()
+    filename = os.path.basename(file_path)
+    documents = PyPDFLoader(file_path).load()
+    chunks = DocumentProcessor(config)._create_chunks(documents) if documents else []
+    return {
+        "filename": filename,
+        "pages": len(documents),
+        "chunks": [(chunk.page_content, chunk.metadata) for chunk in chunks],
+        "seconds": time.time() - start_time,
+    }
+
+def _collection_sources(db_manager) -> Tuple[Set[str], Dict[str, Optional[str]], Dict[str, List[str]]]:
+    """One read of ChromaDB: chunk ids, content_hash per source filename (None
+    for chunks indexed without one) and chunk ids per source filename"""
+    existing_ids: Set[str] = set()
+    hashes: Dict[str, Optional[str]] = {}
+    ids_by_source: Dict[str, List[str]] = {}
+    if not os.path.exists(CHROMA_PATH):
+        return existing_ids, hashes, ids_by_source
+
+    items = db_manager.db.get(include=["metadatas"])
+    existing_ids.update(items["ids"])
+    for item_id, metadata in zip(items["ids"], items["metadatas"]):
+        if metadata and "source" in metadata:
+            filename = os.path.basename(metadata["source"])
+            ids_by_source.setdefault(filename, []).append(item_id)
+            if hashes.get(filename) is None:
+                hashes[filename] = metadata.get("content_hash")
+    return existing_ids, hashes, ids_by_source
+
+def _delete_source_chunks(db_manager, filename: str, ids_by_source: Dict[str, List[str]],
+                          existing_ids: Set[str]):
+    ids = ids_by_source.pop(filename, [])
+    if ids:
+        db_manager.db.delete(ids=ids)
+        existing_ids.difference_update(ids)
+        logger.info(f"Removed {len(ids)} outdated chunks of {filename}")
+
+def ingest_directory(directory: str, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Ingest every new or changed PDF in a directory
+
+    PDFs are parsed and chunked in a process pool while the main process
+    embeds and stores finished files with the one shared embedding model.
+    Files whose content hash is already indexed are skipped; a file whose
+    name is indexed with a different hash replaces its old chunks. Files
+    from another directory are copied into DATA_PATH so they can be
+    previewed like uploads.
+    """
+    if not directory or not os.path.isdir(directory):
+        raise ValueError(f"Not a directory: {directory!r}")
+    if not DATA_PATH or not CHROMA_PATH:
+        raise ValueError("DATA_PATH and CHROMA_PATH must be set to ingest documents")
+
+    start_time = time.time()
+    config = SearchConfig()
+    processor = DocumentProcessor(config)
+
+    # Open the collection and read its ids and sources once for the whole run
+    from rag_core import ChromaDBManager
+    db_manager = ChromaDBManager(CHROMA_PATH, get_embedding_function())
+    existing_ids, indexed, ids_by_source = _collection_sources(db_manager)
+    known_hashes = {content_hash for content_hash in indexed.values() if content_hash}
+
+    pending = []
+    skipped = 0
+    for filename in sorted(os.listdir(directory)):
+        file_path = os.path.join(directory, filename)
+        if not filename.lower().endswith(".pdf") or not os.path.isfile(file_path):
+            continue
+        content_hash = file_content_hash(file_path)
+        if content_hash in known_hashes:
+            skipped += 1
+            continue
+        known_hashes.add(content_hash)  # identical copies in the same run are ingested once
+        pending.append((file_path, content_hash))
+
+    summary = {"files": len(pending), "skipped": skipped, "failed": 0, "pages": 0, "chunks": 0, "bytes": 0,
+               "extract_seconds": 0.0, "store_seconds": 0.0}
+    logger.info(f"Ingesting {len(pending)} PDFs from {directory} ({skipped} unchanged or duplicate)")
+
+    if pending:
+        os.makedirs(DATA_PATH, exist_ok=True)
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_extract_pdf, file_path, config): (file_path, content_hash)
+                       for file_path, content_hash in pending}
+            for finished, future in enumerate(as_completed(futures), start=1):
+                file_path, content_hash = futures[future]
+                filename = os.path.basename(file_path)
+                try:
+                    extracted = future.result()
+                    if not extracted["chunks"]:
+                        raise ValueError("no text extracted")
+
+                    store_start = time.time()
+                    if filename in indexed:
+                        _delete_source_chunks(db_manager, filename, ids_by_source, existing_ids)
+                    chunks = [Document(page_content=text, metadata={**metadata, "content_hash": content_hash})
+                              for text, metadata in extracted["chunks"]]
+                    if not processor._add_to_database(chunks, filename, refresh=False,
+                                                      db_manager=db_manager, existing_ids=existing_ids):
+                        raise RuntimeError("could not add chunks to the database")
+
+                    target_path = os.path.join(DATA_PATH, filename)
+                    if os.path.abspath(file_path) != os.path.abspath(target_path):
+                        shutil.copy2(file_path, target_path)
+                except Exception as e:
+                    summary["failed"] += 1
+                    logger.error(f"[{finished}/{len(pending)}] {filename}: {e}")
+                    continue
+
+                store_seconds = time.time() - store_start
+                summary["pages"] += extracted["pages"]
+                summary["chunks"] += len(chunks)
+                summary["bytes"] += os.path.getsize(file_path)
+                summary["extract_seconds"] += extracted["seconds"]
+                summary["store_seconds"] += store_seconds
+                logger.info(f"[{finished}/{len(pending)}] {filename}: {extracted['pages']} pages, "
+                            f"{len(chunks)} chunks (extract {extracted['seconds']:.1f}s, "
+                            f"embed+store {store_seconds:.1f}s)")
+
+        refresh_vector_index()
+
+    elapsed = time.time() - start_time
+    summary["seconds"] = round(elapsed, 1)
+    print(f"Ingested {summary['files'] - summary['failed']}/{summary['files']} PDFs "
+          f"({summary['skipped']} skipped, {summary['failed']} failed) in {elapsed:.1f} seconds")
+    print(f"  {summary['pages']} pages, {summary['chunks']} chunks, {summary['bytes'] / 1e6:.1f} MB")
+    print(f"  {summary['pages'] / max(elapsed, 1e-6):.1f} pages/s, "
+          f"{summary['chunks'] / max(elapsed, 1e-6):.1f} chunks/s, "
+          f"{summary['bytes'] / 1e6 / max(elapsed, 1e-6):.2f} MB/s")
+    print(f"  extraction {summary['extract_seconds']:.1f}s across workers, "
+          f"embedding+storage {summary['store_seconds']:.1f}s")
+    return summary
+
+# ====================== Bulk Generation ======================
+class RequestPacer:
+    """Spaces out calls from many threads to stay under a requests-per-minute limit"""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def _split_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(";")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+def topic_id(topic: Dict[str, Any]) -> str:
+    """Stable id from everything that shapes a topic's output, independent of its line in the file"""
+    fields = {key: topic[key] for key in ("query", "num_questions", "documents", "learning_outcome",
+                                          "use_rag", "package_name", "tags")}
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def _parse_topic(row: Any) -> Dict[str, Any]:
+    if not isinstance(row, dict):
+        raise ValueError("not an object")
+    query = str(row.get("query") or "").strip()
+    if not query:
+        raise ValueError("no query")
+
+    num_questions = row.get("num_questions")
+    if num_questions is None or str(num_questions).strip() == "":
+        num_questions = 1
+    try:
+        num_questions = int(str(num_questions).strip())
+    except ValueError:
+        raise ValueError(f"num_questions is not a number: {num_questions!r}")
+    if num_questions < 1:
+        raise ValueError(f"num_questions must be at least 1, got {num_questions}")
+
+    use_rag = row.get("use_rag", True)
+    if isinstance(use_rag, str):
+        use_rag = use_rag.strip().lower() not in ("false", "0", "no")
+    topic = {
+        "query": query,
+        "num_questions": num_questions,
+        "documents": _split_list(row.get("documents")) or None,
+        "learning_outcome": str(row.get("learning_outcome") or "").strip() or None,
+        "use_rag": bool(use_rag),
+        "package_name": str(row.get("package_name") or "").strip() or query,
+        "tags": _split_list(row.get("tags")),
+    }
+    topic["id"] = topic_id(topic)
+    return topic
+
+def read_topics(path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Topics from a CSV (header row) or JSONL file, plus an error per invalid row
+
+    Columns/keys: query (required), num_questions, documents, learning_outcome,
+    use_rag, package_name, tags. List values are ";"-separated in CSV. A bad
+    row is reported with its line number and does not stop the other topics;
+    identical topics are generated once.
+    """
+    topics, errors = [], []
+    seen = set()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            # Data starts on line 2, after the header
+            rows = enumerate(csv.DictReader(f), start=2)
+        else:
+            rows = ((line_number, line) for line_number, line in enumerate(f, start=1) if line.strip())
+
+        for line_number, row in rows:
+            try:
+                if isinstance(row, str):
+                    row = json.loads(row)
+                topic = _parse_topic(row)
+            except ValueError as e:
+                errors.append({"line": line_number, "error": str(e)})
+                continue
+            if topic["id"] not in seen:
+                seen.add(topic["id"])
+                topics.append(topic)
+    return topics, errors
+
+def _finished_topics(output: str) -> set:
+    """Topic ids that already have rows in the output file
+
+    A line cut short by a crash is truncated away so new rows start on a
+    fresh line.
+    """
+    if not os.path.exists(output):
+        return set()
+    with open(output, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+            logger.warning(f"Dropped an incomplete last line from {output}")
+
+    done = set()
+    for line in data[:end].splitlines():
+        try:
+            done.add(json.loads(line)["package"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return done
+
+def _generate_topic(topic: Dict[str, Any], pacer: RequestPacer) -> Dict[str, Any]:
+    pacer.wait()
+    if topic["use_rag"]:
+        return query_rag(topic["query"], topic["num_questions"],
+                         selected_documents=topic["documents"],
+                         target_learning_outcome=topic["learning_outcome"])
+    return direct_llm_questions(topic["query"], topic["num_questions"],
+                                target_learning_outcome=topic["learning_outcome"])
+
+def bulk_generate(topics_file: str, output: str, workers: int = 4, requests_per_minute: float = 15) -> Dict[str, int]:
+    """Generate questions for every topic into a JSONL file, resuming an interrupted run
+
+    Output rows use the package import format (package, package_name, tags,
+    question, answer), one row per question, with the topic id as package.
+    Topics that already have rows in the output are skipped on the next run,
+    failed ones are retried; ids depend only on a topic's content, so
+    editing other lines of the topics file does not change them.
+    """
+    done = _finished_topics(output)
+    topics, invalid = read_topics(topics_file)
+    for error in invalid:
+        logger.error(f"Topic on line {error['line']}: {error['error']}")
+    already_done = sum(1 for topic in topics if topic["id"] in done)
+    topics = [topic for topic in topics if topic["id"] not in done]
+    logger.info(f"{len(topics)} topics to generate ({already_done} already done, "
+                f"{len(invalid)} invalid), {workers} workers")
+
+    summary = {"topics": len(topics), "generated": 0, "failed": 0, "invalid": len(invalid), "questions": 0}
+    pacer = RequestPacer(requests_per_minute)
+    start_time = time.time()
+
+    with open(output, "a", encoding="utf-8") as out, \
+         ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(_generate_topic, topic, pacer): topic for topic in topics}
+        for finished, future in enumerate(as_completed(futures), start=1):
+            topic = futures[future]
+            try:
+                result = future.result()
+                metadata = result.get("metadata") or {}
+                if metadata.get("status") == "error" or not result.get("questions"):
+                    raise ValueError(metadata.get("message") or "no questions generated")
+            except Exception as e:
+                summary["failed"] += 1
+                logger.error(f"[{finished}/{len(topics)}] {topic['query']}: {e}")
+                continue
+
+            # One write per topic, so a crash leaves at most a cut-off last line
+            out.write("".join(json.dumps({
+                "package": topic["id"],
+                "package_name": topic["package_name"],
+                "tags": topic["tags"],
+                "question": qa.get("question", ""),
+                "answer": qa.get("answer", ""),
+            }, ensure_ascii=False) + "\n" for qa in result["questions"]))
+            out.flush()
+            os.fsync(out.fileno())
+
+            summary["generated"] += 1
+            summary["questions"] += len(result["questions"])
+            logger.info(f"[{finished}/{len(topics)}] {topic['query']}: {len(result['questions'])} questions")
+
+    logger.info(f"Bulk generation finished in {time.time() - start_time:.1f} seconds: {summary}")
+    return summary
+
 # ====================== CLI Main Function ======================
 def main():
     """Main CLI function"""
     parser = argparse.ArgumentParser(description="RAG Query Assistant")
-    parser.add_argument("query_text", type=str, help="Query text for RAG search")
+    parser.add_argument("query_text", type=str, nargs="?", help="Query text for RAG search")
     parser.add_argument("--num_questions", type=int, default=1, 
                         help="Number of question-answer pairs to generate")
     parser.add_argument("--reset_db", action="store_true",
                         help="Reset the ChromaDB database")
+    parser.add_argument("--build_index", action="store_true",
+                        help="Rebuild the NumPy vector index from ChromaDB")
+    parser.add_argument("--ingest", type=str, metavar="DIR",
+                        help="Ingest every new or changed PDF in a directory")
+    parser.add_argument("--ingest_workers", type=int, default=None,
+                        help="Extraction processes for --ingest (default: CPU count - 1)")
+    parser.add_argument("--topics_file", type=str,
+                        help="CSV/JSONL file of topics to generate in bulk")
+    parser.add_argument("--output", type=str, default="generated_questions.jsonl",
+                        help="JSONL output for --topics_file (importable as packages)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Parallel generations for --topics_file")
+    parser.add_argument("--requests_per_minute", type=float, default=15,
+                        help="Gemini request limit for --topics_file (0 = unlimited)")
     args = parser.parse_args()
     
     if args.reset_db:
         reset_chroma_db()
         return
+
+    if args.build_index:
+        from vector_index import build_index_from_chroma
+        build_index_from_chroma()
+        return
+
+    if args.ingest is not None:
+        if not os.path.isdir(args.ingest):
+            parser.error(f"--ingest: {args.ingest!r} is not a directory")
+        if not DATA_PATH or not CHROMA_PATH:
+            parser.error("--ingest needs DATA_PATH and CHROMA_PATH to be set")
+        ingest_directory(args.ingest, args.ingest_workers)
+        return
+
+    if args.topics_file:
+        bulk_generate(args.topics_file, args.output, args.workers, args.requests_per_minute)
+        return
     
+    if not args.query_text:
+        parser.error("query_text is required")
+
     result = query_rag(args.query_text, args.num_questions)
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
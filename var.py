@@ -8,4 +8,80 @@ DATA_PATH = os.getenv("DATA_PATH")
 URL_PATH = os.getenv("URL_PATH")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
 DATABASE_URL = os.getenv("DATABASE_URL")
-GEMINI_MODEL = os.getenv("GEMINI_MODEL")
\ No newline at end of file
+GEMINI_MODEL = os.getenv("GEMINI_MODEL")
+
+# embedding backend
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))
+EMBEDDING_NORMALIZE = os.getenv("EMBEDDING_NORMALIZE", "false").lower() == "true"
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET")
+
+# vector store
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "vector_index")
+VECTOR_INDEX_DTYPE = os.getenv("VECTOR_INDEX_DTYPE", "float16")
+VECTOR_INDEX_HNSW = os.getenv("VECTOR_INDEX_HNSW", "false").lower() == "true"
+
+# startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+
+# database pool (async engine used by the API routers)
+# pool_size + max_overflow is the per-worker connection ceiling; keep
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the server's max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+# full-text search (Postgres text search configuration, e.g. simple, indonesian)
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+
+# saved question index (duplicate detection)
+QUESTION_INDEX_PATH = os.getenv("QUESTION_INDEX_PATH", "question_index")
+QUESTION_INDEX_MAX_USERS = int(os.getenv("QUESTION_INDEX_MAX_USERS", "16"))
+QUESTION_DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_DUPLICATE_THRESHOLD", "0.92"))
+QUESTION_DEDUP_ON_SAVE = os.getenv("QUESTION_DEDUP_ON_SAVE", "true").lower() == "true"
+
+# LLM completion cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# retrieval cache (query_rag context, invalidated by bumping the corpus version on ingest/delete)
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "512"))
+CORPUS_VERSION_PATH = os.getenv("CORPUS_VERSION_PATH", "corpus_version")
+
+# semantic response cache (/questions/generate reuses results of paraphrased queries)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# rate limiting for /questions/generate (per client, per worker process)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_ADMIN_PER_MINUTE = float(os.getenv("RATE_LIMIT_ADMIN_PER_MINUTE", "60"))
+RATE_LIMIT_ADMIN_CONCURRENCY = int(os.getenv("RATE_LIMIT_ADMIN_CONCURRENCY", "4"))
+RATE_LIMIT_USER_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "10"))
+RATE_LIMIT_USER_CONCURRENCY = int(os.getenv("RATE_LIMIT_USER_CONCURRENCY", "2"))
+RATE_LIMIT_ANON_PER_MINUTE = float(os.getenv("RATE_LIMIT_ANON_PER_MINUTE", "5"))
+RATE_LIMIT_ANON_CONCURRENCY = int(os.getenv("RATE_LIMIT_ANON_CONCURRENCY", "1"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+# background generation jobs (/questions/jobs)
+GENERATION_JOB_WORKERS = int(os.getenv("GENERATION_JOB_WORKERS", "4"))
+GENERATION_JOB_MAX_PENDING = int(os.getenv("GENERATION_JOB_MAX_PENDING", "32"))
+GENERATION_JOB_TTL_SECONDS = float(os.getenv("GENERATION_JOB_TTL_SECONDS", "3600"))
+
+# batch generation (/questions/batch)
+BATCH_MAX_TOPICS = int(os.getenv("BATCH_MAX_TOPICS", "50"))
+BATCH_RETRIEVAL_WORKERS = int(os.getenv("BATCH_RETRIEVAL_WORKERS", "8"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
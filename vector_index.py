@@ -0,0 +1,457 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishes are only serialized within one process
+    fcntl = None
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag_core import VectorStoreManager
+from var import CHROMA_PATH, VECTOR_INDEX_PATH, VECTOR_INDEX_DTYPE, VECTOR_INDEX_HNSW
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+SCAN_BLOCK_ROWS = 65536
+
+# ====================== NumPy Vector Index ======================
+class NumpyVectorIndex:
+    """Read-optimised flat index with float16/int8 storage and optional HNSW graph
+
+    Rows are sorted by source file so every document occupies one contiguous
+    row range; filtered searches only scan the ranges of the selected files.
+    Distances are squared L2, the same metric Chroma uses by default, so scores
+    are interchangeable with ChromaDBManager results.
+    """
+
+    def __init__(self, vectors: np.ndarray, sq_norms: np.ndarray, ids: List[str],
+                 documents: List[str], metadatas: List[dict],
+                 source_ranges: Dict[str, Tuple[int, int]],
+                 scales: Optional[np.ndarray] = None, hnsw=None):
+        self.vectors = vectors
+        self.sq_norms = sq_norms
+        self.scales = scales
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.source_ranges = source_ranges
+        self.hnsw = hnsw
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        total = self.vectors.nbytes + self.sq_norms.nbytes
+        if self.scales is not None:
+            total += self.scales.nbytes
+        return total
+
+    # ---------------------- Build ----------------------
+    @classmethod
+    def build(cls, ids: List[str], embeddings, documents: List[str], metadatas: List[dict],
+              dtype: str = "float16", use_hnsw: bool = False) -> "NumpyVectorIndex":
+        """Build an index from raw float32 embeddings"""
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported index dtype '{dtype}', expected one of {SUPPORTED_DTYPES}")
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(0, 0)
+        metadatas = [metadata or {} for metadata in metadatas]
+        sources = [os.path.basename(metadata.get("source", "")) for metadata in metadatas]
+
+        order = sorted(range(len(ids)), key=lambda i: sources[i])
+        matrix = matrix[order]
+        ids = [ids[i] for i in order]
+        documents = [documents[i] for i in order]
+        metadatas = [metadatas[i] for i in order]
+        sources = [sources[i] for i in order]
+
+        source_ranges: Dict[str, Tuple[int, int]] = {}
+        for row, source in enumerate(sources):
+            start, _ = source_ranges.get(source, (row, row))
+            source_ranges[source] = (start, row + 1)
+
+        vectors, scales = cls._quantize(matrix, dtype)
+        stored = cls._dequantize(vectors, scales)
+        sq_norms = np.einsum("ij,ij->i", stored, stored).astype(np.float32)
+
+        hnsw = cls._build_hnsw(matrix) if use_hnsw else None
+        return cls(vectors, sq_norms, ids, documents, metadatas, source_ranges, scales, hnsw)
+
+    @staticmethod
+    def _quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if dtype == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.round(matrix / scales[:, None]).astype(np.int8)
+            return codes, scales.astype(np.float32)
+        return matrix.astype(dtype), None
+
+    @staticmethod
+    def _dequantize(block: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        block = block.astype(np.float32)
+        if scales is not None:
+            block *= scales[:, None]
+        return block
+
+    @staticmethod
+    def _build_hnsw(matrix: np.ndarray):
+        try:
+            import hnswlib
+        except ImportError:
+            logger.warning("hnswlib is not installed, falling back to flat search")
+            return None
+
+        graph = hnswlib.Index(space="l2", dim=matrix.shape[1])
+        graph.init_index(max_elements=max(1, matrix.shape[0]), ef_construction=200, M=16)
+        if matrix.shape[0]:
+            graph.add_items(matrix, np.arange(matrix.shape[0]))
+        return graph
+
+    # ---------------------- Persistence ----------------------
+    def save(self, path: str):
+        """Write the index as a snapshot directory
+
+        Every file is either a .npy array or a UTF-8 blob with an .npy offset
+        table, so a reader can memory-map all of it instead of parsing.
+        """
+        os.makedirs(path, exist_ok=True)
+
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+        np.save(os.path.join(path, "sq_norms.npy"), self.sq_norms)
+        if self.scales is not None:
+            np.save(os.path.join(path, "scales.npy"), self.scales)
+        if self.hnsw is not None:
+            self.hnsw.save_index(os.path.join(path, "hnsw.bin"))
+
+        _write_blob_column(path, "ids", list(self.ids))
+        _write_blob_column(path, "documents", list(self.documents))
+        _write_blob_column(path, "metadatas", [json.dumps(m, ensure_ascii=False) for m in self.metadatas])
+
+        with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "count": len(self),
+                "dim": self.dim,
+                "dtype": str(self.vectors.dtype),
+                "source_ranges": self.source_ranges,
+                "created_at": time.time(),
+            }, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "NumpyVectorIndex":
+        """Open a snapshot directory, memory-mapping arrays and text columns by default"""
+        mmap_mode = "r" if mmap else None
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode)
+        sq_norms = np.load(os.path.join(path, "sq_norms.npy"), mmap_mode=mmap_mode)
+
+        scales_path = os.path.join(path, "scales.npy")
+        scales = np.load(scales_path, mmap_mode=mmap_mode) if os.path.exists(scales_path) else None
+
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        hnsw = None
+        hnsw_path = os.path.join(path, "hnsw.bin")
+        if os.path.exists(hnsw_path):
+            try:
+                import hnswlib
+                hnsw = hnswlib.Index(space="l2", dim=vectors.shape[1])
+                hnsw.load_index(hnsw_path, max_elements=vectors.shape[0])
+            except ImportError:
+                logger.warning("hnswlib is not installed, ignoring saved HNSW graph")
+
+        source_ranges = {source: tuple(bounds) for source, bounds in manifest["source_ranges"].items()}
+        return cls(
+            vectors, sq_norms,
+            BlobColumn(path, "ids"),
+            BlobColumn(path, "documents"),
+            BlobColumn(path, "metadatas", decode=json.loads),
+            source_ranges, scales, hnsw,
+        )
+
+    # ---------------------- Search ----------------------
+    def search(self, query_vector, k: int,
+               sources: Optional[List[str]] = None) -> List[Tuple[int, float]]:
+        """Return (row, squared L2 distance) pairs for the k nearest rows"""
+        if len(self) == 0 or k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+
+        if sources is None and self.hnsw is not None:
+            k = min(k, len(self))
+            self.hnsw.set_ef(max(64, 2 * k))
+            labels, distances = self.hnsw.knn_query(query, k=k)
+            return [(int(row), float(dist)) for row, dist in zip(labels[0], distances[0])]
+
+        if sources is None:
+            ranges = [(0, len(self))]
+        else:
+            ranges = [self.source_ranges[source] for source in sources if source in self.source_ranges]
+
+        rows = []
+        distances = []
+        query_sq_norm = float(query @ query)
+        for start, end in ranges:
+            for block_start in range(start, end, SCAN_BLOCK_ROWS):
+                block_end = min(end, block_start + SCAN_BLOCK_ROWS)
+                dots = self.vectors[block_start:block_end].astype(np.float32) @ query
+                if self.scales is not None:
+                    dots *= self.scales[block_start:block_end]
+                distances.append(query_sq_norm + self.sq_norms[block_start:block_end] - 2.0 * dots)
+                rows.append(np.arange(block_start, block_end))
+
+        if not rows:
+            return []
+
+        rows = np.concatenate(rows)
+        distances = np.concatenate(distances)
+        k = min(k, distances.shape[0])
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [(int(rows[i]), float(distances[i])) for i in top]
+
+    def document(self, row: int) -> Document:
+        return Document(page_content=self.documents[row], metadata=dict(self.metadatas[row]))
+
+# ====================== Snapshots ======================
+def _write_blob_column(path: str, name: str, values: List[str]):
+    """Store strings as one UTF-8 blob plus an int64 offset table"""
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(os.path.join(path, f"{name}.bin"), "wb") as f:
+        for i, value in enumerate(values):
+            encoded = value.encode("utf-8")
+            f.write(encoded)
+            offsets[i + 1] = offsets[i] + len(encoded)
+    np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+
+class BlobColumn:
+    """Read-only, memory-mapped list of strings written by _write_blob_column"""
+
+    def __init__(self, path: str, name: str, decode=None):
+        self.offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode="r")
+        blob_path = os.path.join(path, f"{name}.bin")
+        if os.path.getsize(blob_path):
+            self.blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+        self.decode = decode
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int):
+        value = self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+        return self.decode(value) if self.decode else value
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".publish.lock"
+TMP_PREFIX = ".tmp-"
+KEEP_SNAPSHOTS = 2
+
+_publish_lock = threading.Lock()
+
+def new_snapshot_version() -> str:
+    """Version name for a snapshot; take it before reading the collection"""
+    return f"v{time.time_ns()}"
+
+def _version_number(version: str) -> int:
+    return int(version[1:])
+
+@contextmanager
+def _publishing(root: str):
+    """Hold the publish lock of root, shared by every thread and worker process"""
+    with _publish_lock, open(os.path.join(root, LOCK_FILE), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield  # closing the file releases the flock
+
+def publish_snapshot(index: NumpyVectorIndex, root: str = VECTOR_INDEX_PATH,
+                     version: Optional[str] = None) -> Optional[str]:
+    """Atomically publish a new snapshot version under root
+
+    The snapshot is written to a hidden temporary directory, renamed into
+    place, and only then is the CURRENT pointer swapped with os.replace, so
+    readers never observe a half-written version. Publishes are serialized
+    with a lock file, and a version older than CURRENT is dropped, so a
+    rebuild that read the collection earlier can never replace a newer one.
+    Returns the published version, or None when it was dropped.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = version or new_snapshot_version()
+    with _publishing(root):
+        current = current_snapshot_version(root)
+        if current is not None and _version_number(current) >= _version_number(version):
+            logger.info(f"Skipping vector index snapshot {version}: {current} is newer")
+            return None
+
+        tmp_path = os.path.join(root, f"{TMP_PREFIX}{version}")
+        index.save(tmp_path)
+        os.rename(tmp_path, os.path.join(root, version))
+
+        pointer_tmp = os.path.join(root, f".{CURRENT_FILE}-{version}")
+        with open(pointer_tmp, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, os.path.join(root, CURRENT_FILE))
+
+        _remove_old_snapshots(root, version)
+    return version
+
+def _remove_old_snapshots(root: str, current: str):
+    """Delete all but the newest snapshots; open mappings stay valid after unlink
+
+    Runs under the publish lock, so any leftover temporary directory or
+    pointer file belongs to a publish that crashed and is removed too.
+    """
+    names = os.listdir(root)
+    for name in names:
+        if name.startswith(TMP_PREFIX) or name.startswith(f".{CURRENT_FILE}-"):
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+    versions = sorted((name for name in names if name.startswith("v") and name != current), key=_version_number)
+    for name in versions[:max(0, len(versions) - (KEEP_SNAPSHOTS - 1))]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+def current_snapshot_version(root: str = VECTOR_INDEX_PATH) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+class SnapshotReader:
+    """Per-process view of the latest published snapshot
+
+    Every worker maps the same files, so the matrix lives once in the OS page
+    cache no matter how many uvicorn workers are running. The CURRENT pointer is
+    re-read at most every ``check_interval`` seconds and a new version is mapped
+    without restarting the worker. HNSW graphs, when present, are loaded per
+    process.
+    """
+
+    def __init__(self, root: str, check_interval: float = 1.0):
+        self.root = root
+        self.check_interval = check_interval
+        self.version: Optional[str] = None
+        self._index: Optional[NumpyVectorIndex] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[NumpyVectorIndex]:
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < self.check_interval:
+            return self._index
+
+        with self._lock:
+            self._checked_at = now
+            version = current_snapshot_version(self.root)
+            if version is None:
+                self._index, self.version = None, None
+            elif version != self.version:
+                start = time.perf_counter()
+                self._index = NumpyVectorIndex.load(os.path.join(self.root, version))
+                self.version = version
+                logger.info(f"Mapped vector index snapshot {version}: {len(self._index)} rows, "
+                            f"{self._index.nbytes / 1e6:.1f} MB in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return self._index
+
+_readers: Dict[str, SnapshotReader] = {}
+_readers_lock = threading.Lock()
+
+def get_snapshot_reader(root: str = VECTOR_INDEX_PATH) -> SnapshotReader:
+    with _readers_lock:
+        if root not in _readers:
+            _readers[root] = SnapshotReader(root)
+        return _readers[root]
+
+# ====================== Index Lifecycle ======================
+def build_index_from_chroma(chroma_path: str = CHROMA_PATH, index_path: str = VECTOR_INDEX_PATH,
+                            dtype: str = VECTOR_INDEX_DTYPE, use_hnsw: bool = VECTOR_INDEX_HNSW,
+                            page_size: int = 5000) -> NumpyVectorIndex:
+    """Export the Chroma collection and publish it as a new index snapshot"""
+    from rag_core import ChromaDBManager
+    from get_embedding_function import get_embedding_function
+
+    # Named before the read so snapshots order by the collection state they contain
+    version = new_snapshot_version()
+    collection = ChromaDBManager(chroma_path, get_embedding_function()).db._collection
+    total = collection.count()
+
+    ids, embeddings, documents, metadatas = [], [], [], []
+    for offset in range(0, total, page_size):
+        page = collection.get(include=["embeddings", "documents", "metadatas"],
+                              limit=page_size, offset=offset)
+        ids.extend(page["ids"])
+        embeddings.extend(page["embeddings"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+
+    index = NumpyVectorIndex.build(ids, embeddings, documents, metadatas, dtype=dtype, use_hnsw=use_hnsw)
+    if publish_snapshot(index, index_path, version):
+        logger.info(f"Published {dtype} vector index snapshot {version} with {len(index)} rows at {index_path}")
+    return index
+
+# ====================== Manager ======================
+class NumpyIndexManager(VectorStoreManager):
+    """Serve search_with_filters from a NumpyVectorIndex built off the Chroma collection"""
+
+    def __init__(self, index_path: str, embedding_function):
+        self.index_path = index_path
+        self.embedding_function = embedding_function
+
+    @property
+    def index(self) -> Optional[NumpyVectorIndex]:
+        return get_snapshot_reader(self.index_path).get()
+
+    def get_collection_count(self) -> int:
+        index = self.index
+        if index is None:
+            logger.error(f"Vector index not found at {self.index_path}, run `python utils.py --build_index`")
+            return 0
+        return len(index)
+
+    def _search(self, query_text: str, k: int,
+                sources: Optional[List[str]] = None) -> List[Tuple[Document, float]]:
+        index = self.index
+        query_vector = self.embedding_function.embed_query(query_text)
+        return [(index.document(row), score) for row, score in index.search(query_vector, k, sources)]
+
+    def _filtered_search(self, query_text: str, k: int,
+                        selected_documents: List[str], collection_count: int) -> List[Tuple[Document, float]]:
+        results = self._search(query_text, k, selected_documents)
+        if not results:
+            logger.warning(f"No results found in selected documents: {selected_documents}")
+            return []
+
+        logger.info(f"Found {len(results)} results from selected documents")
+        return results
+
+    def _regular_search(self, query_text: str, k: int) -> List[Tuple[Document, float]]:
+        return self._search(query_text, k)
+
+    def _fallback_search(self, query_text: str) -> List[Tuple[Document, float]]:
+        return []
@@ -0,0 +1,66 @@
+"""
+Startup warm-up and readiness state.
+
+Heavy dependencies (genai, sklearn, langchain, numpy, torch via the embedding
+model) are imported inside the functions that use them, so importing the app
+only loads FastAPI, SQLAlchemy and the auth stack. The first request that
+needs retrieval pays for those imports unless WARMUP_ON_STARTUP loads them
+here first; testing/bench_startup.py tracks both costs.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from var import WARMUP_ON_STARTUP
+
+logger = logging.getLogger(__name__)
+
+_state: Dict[str, Any] = {
+    "status": "cold" if WARMUP_ON_STARTUP else "lazy",
+    "warmup_enabled": WARMUP_ON_STARTUP,
+    "steps_ms": {},
+}
+_lock = threading.Lock()
+
+def _step(name: str, func):
+    start = time.perf_counter()
+    result = func()
+    _state["steps_ms"][name] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+def warm_up_retrieval():
+    """Load the embedding model, open the vector store and import generation deps"""
+    with _lock:
+        if _state["status"] in ("warming", "ready"):
+            return
+        _state["status"] = "warming"
+        _state.pop("error", None)
+
+    start = time.perf_counter()
+    try:
+        from rag_core import extract_primary_keyword, get_vector_store
+        from get_embedding_function import get_embedding_function
+
+        embedding_function = _step("load_embedding_model", get_embedding_function)
+        _step("embed_query", lambda: embedding_function.embed_query("pemanasan model"))
+        store = get_vector_store(embedding_function)
+        _step("open_vector_store", store.get_collection_count)
+        _step("import_keyword_extractor", lambda: extract_primary_keyword("proses fotosintesis pada tumbuhan"))
+        _step("import_llm_client", lambda: __import__("google.generativeai"))
+
+        _state["status"] = "ready"
+        _state["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(f"Retrieval warm-up finished in {_state['warmup_ms']} ms: {_state['steps_ms']}")
+    except Exception as e:
+        _state["status"] = "failed"
+        _state["error"] = str(e)
+        logger.error(f"Retrieval warm-up failed: {e}")
+
+def readiness() -> Dict[str, Any]:
+    """Snapshot of the warm-up state for the readiness endpoint"""
+    return {**_state, "steps_ms": dict(_state["steps_ms"])}
+
+def is_ready() -> bool:
+    return _state["status"] == "ready" or not WARMUP_ON_STARTUP